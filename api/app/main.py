@@ -3,7 +3,11 @@ import time
 import re
 import sys
 import os
+import base64
 import datetime
+import json
+
+from bson.objectid import ObjectId
 
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware # type: ignore
@@ -11,11 +15,20 @@ from pathlib import Path
 from pydantic import BaseModel
 
 from threading import Thread
+from app.model.blob_store import BlobReader
 from app.model.mongodb import MongoDB
+from app.response_cache import ResponseCache
+from app.rollup import ROLLUP_COLLECTION, follow_posts, rollup_match, rollups_cover
+from app.search import ensure_search_indexes, search_match
 
 client = MongoDB(host=os.environ['MONGO_HOST'], port=int(os.environ['MONGO_PORT']), username=os.environ['MONGO_USER'], password=os.environ['MONGO_PASS'])
 
+# Blobs are written to the crawler's BLOB_DATABASE, not where the API reads posts
+blob_client = MongoDB(dbname=os.environ.get('BLOB_DATABASE', 'allnewdarkweb'))
+blob_reader = BlobReader(blob_client.database())
+
 app = FastAPI(title='API docs for darkweb')
+response_cache = ResponseCache()
 app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_credentials=True,
     allow_methods=["*"], allow_headers=["*"])
 
@@ -69,7 +82,7 @@ count_by_date = [
     {
         '$group': {
             '_id': {
-                'created_date': '$created_date'
+                'created_date': {'$dateToString': {'format': '%Y-%m-%d', 'date': '$created_at'}}
             }, 
             'category': {"$addToSet":'$category'},
             'count': {
@@ -183,29 +196,211 @@ exposure = [
     }
 ]
 
-@app.get("/api/v1/darkweb-api/get-exposures")
-def get_exposure(since: str, until: str, category: str="forum", query: str=None):
-    client.create_db("crawler")
-    client.create_collection("darkweb")
+# The same counts from the daily rollups (app/rollup.py): rows are summed by
+# their post count, and the analytics fields are flat there
+rollup_by_source = [
+    {
+        '$group': {
+            '_id': {
+                'source': '$website',
+            },
+            'alias': {"$addToSet":'$website_alias'},
+            'count': {
+                '$sum': '$count'
+            }
+        }
+    }, {
+        '$project': {
+            '_id': 0,
+            'source': '$_id.source',
+            'alias': '$alias',
+            'count': '$count'
+        }
+    }
+]
+
+rollup_by_category = [
+    {
+        '$match': {
+            'category': {'$ne':None},
+        }
+    }, {
+        '$group': {
+            '_id': {
+                'category': '$category'
+            },
+            'count': {
+                '$sum': '$count'
+            }
+        }
+    }, {
+        '$project': {
+            '_id':0,
+            'category': '$_id.category',
+            'count': '$count'
+        }
+    }
+]
+
+rollup_by_date = [
+    {
+        '$group': {
+            '_id': {
+                'created_date': '$date'
+            },
+            'category': {"$addToSet":'$category'},
+            'count': {
+                '$sum': '$count'
+            }
+        }
+    }, {
+        '$project': {
+            '_id':0,
+            'created_at': '$_id.created_date',
+            'category': '$category',
+            'count': '$count'
+        }
+    }
+]
+
+rollup_by_emotion = [
+    {
+        '$group': {
+            '_id': {
+                'emotion': '$emotion'
+            },
+            'category': {"$addToSet":'$category'},
+            'count': {
+                '$sum': '$count'
+            }
+        }
+    }, {
+        '$project': {
+            '_id':0,
+            'emotion': '$_id.emotion',
+            'category': '$category',
+            'count': '$count'
+        }
+    }
+]
+
+rollup_by_sentiment = [
+    {
+        '$group': {
+            '_id': {
+                'sentiment': '$sentiment'
+            },
+            'category': {"$addToSet":'$category'},
+            'count': {
+                '$sum': '$count'
+            }
+        }
+    }, {
+        '$project': {
+            '_id':0,
+            'sentiment': '$_id.sentiment',
+            'category': '$category',
+            'count': '$count'
+        }
+    }
+]
+
+rollup_by_issues = [
+    {
+        '$group': {
+            '_id': {
+                'issues': '$issue'
+            },
+            'category': {"$addToSet":'$category'},
+            'count': {
+                '$sum': '$count'
+            }
+        }
+    }, {
+        '$project': {
+            '_id':0,
+            'issues': '$_id.issues',
+            'category': '$category',
+            'count': '$count'
+        }
+    }, {
+        '$sort': {
+            'count': -1
+        }
+    }
+]
+
+rollup_exposure = [
+    {
+        '$group': {
+            '_id': '$date',
+            'total': {
+                '$sum': '$count'
+            }
+        }
+    }, {
+        '$project': {
+            '_id': 0,
+            'date': '$_id',
+            'total': '$total'
+        }
+    }, {
+        '$sort': {
+            'date': 1
+        }
+    }
+]
+
+rollup_top_accounts = [
+    {
+        '$group': {
+            '_id': '$poster',
+            'posts': {
+                '$sum': '$count'
+            }
+        }
+    }, {
+        '$sort': {
+            'posts': -1
+        }
+    }
+]
+
+def count_posts(since, until, category, query, raw_agg, rollup_agg, match=None):
+    # Counts without a text query come from the daily rollups, so they cost
+    # a few rows per day; a search needs the posts themselves, and so does a
+    # range the rollups do not cover or while nothing keeps them current
+    if query == None and rollups_cover(client.database(), since):
+        rollups = client.collection(ROLLUP_COLLECTION)
+        stages = [rollup_match(since, until, category)]
+        if match:
+            stages.append({'$match': match})
+        return rollups.aggregate(stages + rollup_agg)
 
     match_agg = [
         {
             '$match': {
-                'created_at': {
-                    '$gte': datetime.datetime.strptime(since, '%Y-%m-%d'),
-                    '$lte': datetime.datetime.strptime(until, '%Y-%m-%d').replace(hour=23, minute=59, second=59)
-                }
+                'created_at':{
+                    "$gte": datetime.datetime.strptime(since, '%Y-%m-%d'),
+                    "$lte": datetime.datetime.strptime(until, '%Y-%m-%d').replace(hour=23, minute=59, second=59),
+                },
+                **search_match(query)
             }
         }
     ]
-
-    if query != None:
-        match_agg[0]['$match']['content'] = re.compile(query, re.IGNORECASE)
-
     if category != None:
         match_agg[0]['$match']['category'] = category
+    if match:
+        match_agg[0]['$match'].update(match)
+    return client.aggregate(match_agg + raw_agg)
 
-    docs = client.aggregate(match_agg + exposure)
+@app.get("/api/v1/darkweb-api/get-exposures")
+@response_cache.cached
+def get_exposure(since: str, until: str, category: str="forum", query: str=None):
+    client.create_db("crawler")
+    client.create_collection("darkweb")
+
+    docs = count_posts(since, until, category, query, exposure, rollup_exposure)
 
     docs = list(docs)
 
@@ -222,16 +417,57 @@ def get_exposure(since: str, until: str, category: str="forum", query: str=None)
         'data': docs
     }
 
+@app.on_event("startup")
+def create_post_indexes():
+    client.create_db("crawler")
+    posts = client.collection("darkweb")
+    # Keyset pagination of get-posts walks these from the cursor position
+    posts.create_index([('created_at', -1), ('_id', -1)], background=True)
+    posts.create_index([('category', 1), ('created_at', -1), ('_id', -1)], background=True)
+    # Text index and content_terms for the query parameter, see app.search
+    ensure_search_indexes(posts)
+
+@app.on_event("startup")
+def maintain_rollups():
+    # Own connection, since the endpoints switch the collection of client.
+    # Cached responses of the recomputed days expire once their new counts
+    # are in the rollups
+    rollup_client = MongoDB(dbname="crawler")
+    Thread(
+        target=follow_posts, args=(rollup_client, response_cache.invalidate_dates), daemon=True
+    ).start()
+
+@app.get("/api/v1/darkweb-api/cache-stats")
+def get_cache_stats():
+    return {
+        'success': True,
+        'message': 'Successfully retrieved cache stats.',
+        'data': response_cache.stats()
+    }
+
+def encode_cursor(doc):
+    # Opaque position after ``doc`` in (created_at, _id) descending order
+    position = {'created_at': doc['created_at'].isoformat(), '_id': str(doc['_id'])}
+    return base64.urlsafe_b64encode(json.dumps(position).encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor):
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return datetime.datetime.fromisoformat(position['created_at']), ObjectId(position['_id'])
+    except Exception:
+        raise HTTPException(400, detail="Invalid cursor")
+
 @app.get("/api/v1/darkweb-api/get-posts")
-def get_posts(since: str, until: str, page_size: int, page_num: int, query: str=None, category: str=None, emotion: str=None, sentiment: str=None, source: str=None, issue: str=None, accounts: str=None):
+def get_posts(since: str, until: str, page_size: int, page_num: int=1, cursor: str=None, query: str=None, category: str=None, emotion: str=None, sentiment: str=None, source: str=None, issue: str=None, accounts: str=None, raw_content: bool=True):
     client.create_db("crawler")
     client.create_collection("darkweb")
 
     if page_size < 1 or page_num < 1:
         raise HTTPException(400, detail="page_size and page_num should be greater than 0")
 
-    skips = page_size * (page_num - 1)
-
+    # Newest first, with _id breaking ties so every post has one position.
+    # A cursor (next_cursor of the previous page) starts right after that
+    # position through the index; page_num still works by skipping.
     posts_agg = [
         {
             '$match': {
@@ -240,22 +476,42 @@ def get_posts(since: str, until: str, page_size: int, page_num: int, query: str=
                     '$lte': datetime.datetime.strptime(until, '%Y-%m-%d').replace(hour=23, minute=59, second=59)
                 }
             }
-        }, {
-            '$addFields': {
-                'post_url': {"$concat":['$website','$post_id']}
-            }
         }, {
             '$sort': {
-                'date': -1
-            }
-        }, {
-            '$project': {
-                '_id': 0
+                'created_at': -1,
+                '_id': -1
             }
+        }
+    ]
+
+    if cursor != None:
+        created_at, last_id = decode_cursor(cursor)
+        posts_agg[0]['$match']['$or'] = [
+            {'created_at': {'$lt': created_at}},
+            {'created_at': created_at, '_id': {'$lt': last_id}}
+        ]
+    elif page_num > 1:
+        posts_agg.append({'$skip': page_size * (page_num - 1)})
+
+    # Bookkeeping and search fields stay out of listings; clients that do
+    # not need the raw markup leave it out with raw_content=false and fetch
+    # it per post from get-raw-content
+    projection = {
+        'content_terms': 0,
+        'content_hash': 0
+    }
+    if not raw_content:
+        projection.update({'raw_content_ref': 0, 'raw_content': 0})
+
+    posts_agg += [
+        {
+            '$limit': page_size
         }, {
-            '$skip': skips
+            '$project': projection
         }, {
-            '$limit': page_size
+            '$addFields': {
+                'post_url': {"$concat":['$website','$post_id']}
+            }
         }
     ]
 
@@ -270,7 +526,7 @@ def get_posts(since: str, until: str, page_size: int, page_num: int, query: str=
     ]
 
     if query != None:
-        posts_agg[0]['$match']['content'] = re.compile(query, re.IGNORECASE)
+        posts_agg[0]['$match'].update(search_match(query))
 
     if category != None:
         print(category)
@@ -302,29 +558,36 @@ def get_posts(since: str, until: str, page_size: int, page_num: int, query: str=
         return {
             'success': True,
             'message': 'Successfully retrieved posts.',
-            'data': []
+            'data': [],
+            'next_cursor': None
         }
 
+    next_cursor = encode_cursor(docs[-1]) if len(docs) == page_size else None
+    for doc in docs:
+        del doc['_id']
+        # Posts whose markup went to the blob store get it back inline
+        ref = doc.pop('raw_content_ref', None)
+        if raw_content and ref:
+            try:
+                doc['raw_content'] = blob_reader.read(ref)
+            except Exception as e:
+                raise HTTPException(500, detail=f"Could not read raw_content: {e}")
+
     return {
         'success': True,
         'message': 'Successfully retrieved posts.',
-        'data': docs
+        'data': docs,
+        'next_cursor': next_cursor
     }
 
 @app.get("/api/v1/darkweb-api/get-top-accounts")
+@response_cache.cached
 def get_top_accounts(since: str, until: str, category: str=None, query: str=None, top_n: int=10):
     client.create_db("crawler")
     client.create_collection("darkweb")
 
-    match_agg = [
+    accounts_agg = [
         {
-            '$match': {
-                'created_at': {
-                    '$gte': datetime.datetime.strptime(since, '%Y-%m-%d'),
-                    '$lte': datetime.datetime.strptime(until, '%Y-%m-%d').replace(hour=23, minute=59, second=59)
-                }
-            }
-        }, {
             '$addFields': {
                 'accounts': '$username', 
                 'accounts': '$poster'
@@ -345,14 +608,7 @@ def get_top_accounts(since: str, until: str, category: str=None, query: str=None
         }
     ]
 
-    if category != None:
-        print(category)
-        match_agg[0]['$match']['category'] = category
-
-    if query != None:
-        match_agg[0]['$match']['content'] = re.compile(query, re.IGNORECASE)
-
-    docs = client.aggregate(match_agg)
+    docs = count_posts(since, until, category, query, accounts_agg, rollup_top_accounts + [{'$limit': top_n}])
 
     docs = list(docs)
 
@@ -379,42 +635,25 @@ def get_top_accounts(since: str, until: str, category: str=None, query: str=None
     }
 
 @app.get("/api/v1/darkweb-api/get-content-by-source")
+@response_cache.cached
 def get_content_by_source(since: str, until: str, category: str=None, query: str=None):
     client.create_db("crawler")
     client.create_collection("darkweb")
 
-    source_agg = count_by_source
-
-    match_agg = [
-        {
-            '$match': {
-                'created_at':{
-                    "$gte": datetime.datetime.strptime(since, '%Y-%m-%d'),
-                    "$lte": datetime.datetime.strptime(until, '%Y-%m-%d').replace(hour=23, minute=59, second=59),
-                }
-            }
-        }
-    ]
-
-    docs_agg = match_agg + source_agg
-
-    if query != None:
-        match_agg[0]['$match']['content'] = re.compile(query, re.IGNORECASE)
-
+    projection = []
     if category != None:
-        match_agg[0]['$match']['category'] = category
-        docs_agg += [
+        projection = [
             {
                 '$project': {
-                    '_id': 0, 
-                    'source': '$source', 
+                    '_id': 0,
+                    'source': '$source',
                     'count': '$count',
-                    'alias':'$alias'
+                    'alias': '$alias'
                 }
             }
         ]
 
-    docs = client.aggregate(docs_agg)
+    docs = count_posts(since, until, category, query, count_by_source + projection, rollup_by_source + projection)
 
     docs = list(docs)
 
@@ -432,41 +671,24 @@ def get_content_by_source(since: str, until: str, category: str=None, query: str
     }
 
 @app.get("/api/v1/darkweb-api/get-content-by-category")
+@response_cache.cached
 def get_content_by_category(since: str, until: str, category: str=None, query: str=None):
     client.create_db("crawler")
     client.create_collection("darkweb")
 
-    category_agg = count_by_category
-
-    match_agg = [
-        {
-            '$match': {
-                'created_at':{
-                    "$gte": datetime.datetime.strptime(since, '%Y-%m-%d'),
-                    "$lte": datetime.datetime.strptime(until, '%Y-%m-%d').replace(hour=23, minute=59, second=59),
-                }
-            }
-        }
-    ]
-
-    docs_agg = match_agg + category_agg
-
-    if query != None:
-        match_agg[0]['$match']['content'] = re.compile(query, re.IGNORECASE)
-
+    projection = []
     if category != None:
-        match_agg[0]['$match']['category'] = category
-        docs_agg += [
+        projection = [
             {
                 '$project': {
-                    '_id': 0, 
-                    'category': '$category', 
+                    '_id': 0,
+                    'category': '$category',
                     'count': '$count'
                 }
             }
         ]
 
-    docs = client.aggregate(docs_agg)
+    docs = count_posts(since, until, category, query, count_by_category + projection, rollup_by_category + projection)
 
     docs = list(docs)
 
@@ -483,89 +705,78 @@ def get_content_by_category(since: str, until: str, category: str=None, query: s
         'data': docs
     }
 
-@app.get("/api/v1/darkweb-api/get-content-by-date")
-def get_content_by_date(since: str, until: str, category: str=None, query: str=None):
-    client.create_db("crawler")
-    client.create_collection("darkweb")
-
-    date_agg = count_by_date
-    
-    match_agg = [
+# Longest range of get-content-by-date; every day is one array entry of the
+# single result document, looked up in the days with posts
+MAX_DATE_SERIES_DAYS = 400
+
+def date_series(since, until, per_day, with_category=True):
+    # Runs ``per_day`` (one row per day with posts) in a $facet, which emits
+    # one document even without posts, then maps every day of the range to
+    # its row or a zero row on the server. $range/$map instead of $densify
+    # keep it working on MongoDB 3.6
+    start = datetime.datetime.strptime(since, '%Y-%m-%d')
+    days = (datetime.datetime.strptime(until, '%Y-%m-%d') - start).days + 1
+    row = {
+        'created_at': '$$day',
+        'published_at': '$$day',
+        'count': {'$ifNull': ['$$found.count', 0]}
+    }
+    if with_category:
+        row['category'] = {'$ifNull': ['$$found.category', []]}
+    return [
         {
-            '$match': {
-                'created_at':{
-                    "$gte": datetime.datetime.strptime(since, '%Y-%m-%d'),
-                    "$lte": datetime.datetime.strptime(until, '%Y-%m-%d').replace(hour=23, minute=59, second=59),
+            '$facet': {
+                'days': per_day
+            }
+        }, {
+            '$project': {
+                'data': {
+                    '$map': {
+                        'input': {'$range': [0, max(days, 0)]},
+                        'as': 'offset',
+                        'in': {
+                            '$let': {
+                                'vars': {
+                                    'day': {'$dateToString': {'format': '%Y-%m-%d', 'date': {'$add': [start, {'$multiply': ['$$offset', 86400000]}]}}}
+                                },
+                                'in': {
+                                    '$let': {
+                                        'vars': {
+                                            'found': {'$arrayElemAt': [{'$filter': {'input': '$days', 'cond': {'$eq': ['$$this.created_at', '$$day']}}}, 0]}
+                                        },
+                                        'in': row
+                                    }
+                                }
+                            }
+                        }
+                    }
                 }
             }
         }
     ]
 
-    all_docs = client.aggregate(match_agg)
-
-    pub_date = []
-    for doc in all_docs:
-        if 'created_date' in doc:
-            pub_date.append(doc['created_date'])
-        elif 'created_at' in doc:
-            # date_obj = datetime.datetime.fromisoformat(doc['published_at'])
-            date_string = doc['created_at'].strftime('%Y-%m-%d')
-            pub_date.append(date_string)
-
-    pub_date = list(set(pub_date))
-
-    print(f"pub_date: {len(pub_date)}")
-
-    docs_agg = match_agg + date_agg + [{'$sort':{"created_at":1}}]
-
-    if query != None:
-        match_agg[0]['$match']['content'] = {"$regex":query}
-
-    if category != None:
-        match_agg[0]['$match']['category'] = category
-        docs_agg += [
-            {
-                '$project': {
-                    '_id': 0, 
-                    'created_at': '$created_at', 
-                    'count': '$count'
-                }
-            }
-        ]
+@app.get("/api/v1/darkweb-api/get-content-by-date")
+@response_cache.cached
+def get_content_by_date(since: str, until: str, category: str=None, query: str=None):
+    client.create_db("crawler")
+    client.create_collection("darkweb")
 
-    # print(docs_agg)
+    days = (datetime.datetime.strptime(until, '%Y-%m-%d') - datetime.datetime.strptime(since, '%Y-%m-%d')).days + 1
+    if days > MAX_DATE_SERIES_DAYS:
+        raise HTTPException(400, detail=f"The date range should be at most {MAX_DATE_SERIES_DAYS} days")
 
-    docs = client.aggregate(docs_agg)
+    # One aggregation, filtered by category and query like the other counts,
+    # with every day of the range in the result
+    with_category = category == None
+    docs = count_posts(
+        since, until, category, query,
+        date_series(since, until, count_by_date, with_category),
+        date_series(since, until, rollup_by_date, with_category)
+    )
 
     docs = list(docs)
 
-    doc_date = []
-
-    for doc in docs:
-        doc_date.append(doc['created_at'])
-
-    print(f"docs: {len(doc_date)}")
-
-    # pub_date_sorted = [datetime.datetime.strptime(date, "%Y-%m-%d") for date in pub_date]
-
-    for date in pub_date:
-        if date not in doc_date:
-            docs.append(
-                {
-                    "created_at": date,
-                    "category": [],
-                    "count":0
-                }
-            )
-
-    sorted_docs = sorted(docs[1:], key=lambda d: datetime.datetime.strptime(d['created_at'], "%Y-%m-%d"))
-
-    sorted_docs = [docs[0]] + sorted_docs
-
-    for doc in sorted_docs:
-        doc['published_at'] = doc['created_at']
-
-    if len(sorted_docs) == 0:
+    if len(docs) == 0 or len(docs[0]['data']) == 0:
         return {
             'success': True,
             'message': 'Successfully retrieved content by date.',
@@ -574,46 +785,29 @@ def get_content_by_date(since: str, until: str, category: str=None, query: str=N
 
     return {
         'success': True,
-        'message': 'Successfully retrieved content by source.',
-        'data': sorted_docs
+        'message': 'Successfully retrieved content by date.',
+        'data': docs[0]['data']
     }
 
 @app.get("/api/v1/darkweb-api/get-content-by-emotion")
+@response_cache.cached
 def get_content_by_emotion(since: str, until: str, category: str=None, query: str=None):
     client.create_db("crawler")
     client.create_collection("darkweb")
 
-    emotion_agg = count_by_emotion
-
-    match_agg = [
-        {
-            '$match': {
-                'created_at':{
-                    "$gte": datetime.datetime.strptime(since, '%Y-%m-%d'),
-                    "$lte": datetime.datetime.strptime(until, '%Y-%m-%d').replace(hour=23, minute=59, second=59),
-                }
-            }
-        }
-    ]
-
-    docs_agg = match_agg + emotion_agg
-
-    if query != None:
-        match_agg[0]['$match']['content'] = re.compile(query, re.IGNORECASE)
-
+    projection = []
     if category != None:
-        match_agg[0]['$match']['category'] = category
-        docs_agg += [
+        projection = [
             {
                 '$project': {
-                    '_id': 0, 
-                    'emotion': '$emotion', 
+                    '_id': 0,
+                    'emotion': '$emotion',
                     'count': '$count'
                 }
             }
         ]
 
-    docs = client.aggregate(docs_agg)
+    docs = count_posts(since, until, category, query, count_by_emotion + projection, rollup_by_emotion + projection)
 
     docs = list(docs)
 
@@ -631,41 +825,24 @@ def get_content_by_emotion(since: str, until: str, category: str=None, query: st
     }
 
 @app.get("/api/v1/darkweb-api/get-content-by-sentiment")
+@response_cache.cached
 def get_content_by_sentiment(since: str, until: str, category: str=None, query: str=None):
     client.create_db("crawler")
     client.create_collection("darkweb")
 
-    sentiment_agg = count_by_sentiment
-
-    match_agg = [
-        {
-            '$match': {
-                'created_at':{
-                    "$gte": datetime.datetime.strptime(since, '%Y-%m-%d'),
-                    "$lte": datetime.datetime.strptime(until, '%Y-%m-%d').replace(hour=23, minute=59, second=59),
-                }
-            }
-        }
-    ]
-
-    docs_agg = match_agg + sentiment_agg
-
-    if query != None:
-        match_agg[0]['$match']['content'] = re.compile(query, re.IGNORECASE)
-
+    projection = []
     if category != None:
-        match_agg[0]['$match']['category'] = category
-        docs_agg += [
+        projection = [
             {
                 '$project': {
-                    '_id': 0, 
-                    'sentiment': '$sentiment', 
+                    '_id': 0,
+                    'sentiment': '$sentiment',
                     'count': '$count'
                 }
             }
         ]
 
-    docs = client.aggregate(docs_agg)
+    docs = count_posts(since, until, category, query, count_by_sentiment + projection, rollup_by_sentiment + projection)
 
     docs = list(docs)
 
@@ -683,40 +860,24 @@ def get_content_by_sentiment(since: str, until: str, category: str=None, query:
     }
 
 @app.get("/api/v1/darkweb-api/get-content-by-issues")
+@response_cache.cached
 def get_content_by_issues(since: str, until: str, category: str=None, query: str=None):
     client.create_db("crawler")
     client.create_collection("darkweb")
 
-    issues_agg = count_by_issues
-
-    match_agg = [
-        {
-            '$match': {
-                'created_at':{
-                    "$gte": datetime.datetime.strptime(since, '%Y-%m-%d'),
-                    "$lte": datetime.datetime.strptime(until, '%Y-%m-%d').replace(hour=23, minute=59, second=59),
-                },
-                'issue.keyword': {'$ne':None}
-            }
-        }
-    ]
-
-    docs_agg = match_agg + issues_agg
-
-    if query != None:
-        match_agg[0]['$match']['content'] = re.compile(query, re.IGNORECASE)
-
+    projection = []
     if category != None:
-        match_agg[0]['$match']['category'] = category
-        docs_agg += [{
-            '$project': {
-                '_id': 0, 
-                'issues': '$issues', 
-                'count': '$count'
+        projection = [
+            {
+                '$project': {
+                    '_id': 0,
+                    'issues': '$issues',
+                    'count': '$count'
+                }
             }
-        }]
+        ]
 
-    docs = client.aggregate(docs_agg)
+    docs = count_posts(since, until, category, query, count_by_issues + projection, rollup_by_issues + projection, match={'issue.keyword': {'$ne':None}})
 
     docs = list(docs)
 
@@ -733,6 +894,30 @@ def get_content_by_issues(since: str, until: str, category: str=None, query: str
         'data': docs
     }
 
+@app.get("/api/v1/darkweb-api/get-raw-content")
+def get_raw_content(post_id: str):
+    client.create_db("crawler")
+    client.create_collection("darkweb")
+
+    # raw_content is large and kept out of the listings; fetch it per post
+    post = client.find_one({'post_id': post_id}, {'_id': 0, 'post_id': 1, 'raw_content': 1, 'raw_content_ref': 1})
+    if post is None:
+        raise HTTPException(404, detail="Post not found")
+
+    try:
+        raw_content = blob_reader.raw_content(post)
+    except Exception as e:
+        raise HTTPException(500, detail=f"Could not read raw_content: {e}")
+
+    return {
+        'success': True,
+        'message': 'Successfully retrieved raw content.',
+        'data': {
+            'post_id': post_id,
+            'raw_content': raw_content
+        }
+    }
+
 # @app.get("/api/v1/darkweb-api/python-check")
 def python_check():
     return {
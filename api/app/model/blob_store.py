@@ -0,0 +1,61 @@
+import gzip
+import os
+
+try:
+    import gridfs
+except ImportError:
+    raise ImportError("PyMongo is not installed in your machine.")
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class BlobReader(object):
+    """
+    Reads the ``raw_content`` the crawler moved out of post documents.
+
+    A post keeps ``raw_content_ref`` ({store, sha256, codec, size}) instead
+    of the markup; the blob lives in the ``raw_content`` GridFS bucket of
+    ``database``, the crawler's ``BLOB_DATABASE``, or under ``BLOB_STORE_DIR``
+    for the local store.
+    """
+
+    def __init__(
+        self,
+        database,
+        bucket_name="raw_content",
+        local_dir=os.environ.get("BLOB_STORE_DIR"),
+    ):
+        self._bucket = gridfs.GridFSBucket(database, bucket_name=bucket_name)
+        self._local_dir = local_dir
+
+    def read(self, ref):
+        digest, codec = ref["sha256"], ref["codec"]
+        if ref["store"] == "gridfs":
+            data = self._bucket.open_download_stream_by_name(digest).read()
+        elif ref["store"] == "local" and self._local_dir:
+            path = os.path.join(
+                self._local_dir, digest[:2], digest[2:4], f"{digest}.{codec}"
+            )
+            with open(path, "rb") as f:
+                data = f.read()
+        else:
+            raise ValueError(f"Blob store {ref['store']} is not readable from the API")
+
+        if codec == "zstd":
+            if zstandard is None:
+                raise ValueError("zstandard is not installed in your machine.")
+            data = zstandard.ZstdDecompressor().decompress(data)
+        else:
+            data = gzip.decompress(data)
+        return data.decode("utf-8")
+
+    def raw_content(self, post):
+        # Posts written before the blob store still carry it inline
+        if post.get("raw_content") is not None:
+            return post["raw_content"]
+        if post.get("raw_content_ref"):
+            return self.read(post["raw_content_ref"])
+        return None
@@ -94,6 +94,20 @@ class MongoDB(object):
         self.check_db()
         self._collection = self._database[collname]
 
+    def database(self):
+        # the database itself, for callers working on several collections
+        self.check_db()
+        return self._database
+
+    def collection(self, collname):
+        # a collection of the current database, leaving the selected one as is
+        self.check_db()
+        return self._database[collname].with_options(
+            codec_options=CodecOptions(
+                tz_aware=True, tzinfo=pytz.timezone("Asia/Jakarta")
+            )
+        )
+
     def get_dbnames(self):
         # get the database name you are currently connected too
         return self._connection.dbnames()
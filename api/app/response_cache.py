@@ -0,0 +1,152 @@
+"""
+Response cache of the analytics endpoints.
+
+Dashboards poll the same (since, until, category, query) combinations, so
+responses are kept per endpoint and normalized parameters:
+
+- younger than ``ttl`` seconds, the response is served as is
+- up to ``stale_ttl`` seconds later it is still served, and one background
+  refresh recomputes it (stale-while-revalidate)
+- older than that, or never computed, the request computes it
+
+At most ``max_size`` responses are kept, least recently used first out.
+The rollup consumer (``app.rollup.watch``) calls ``invalidate_dates`` with
+the days it recomputed, so responses covering them are refreshed on their
+next request with the new counts. Without a replica set there is no
+consumer and responses only expire by age.
+"""
+import functools
+import inspect
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from threading import Thread
+
+logger = logging.getLogger(__name__)
+
+
+class _Entry(object):
+    __slots__ = ("value", "since", "until", "fresh_until", "stale_until", "refreshing")
+
+    def __init__(self, value, since, until, fresh_until, stale_until):
+        self.value = value
+        self.since = since
+        self.until = until
+        self.fresh_until = fresh_until
+        self.stale_until = stale_until
+        self.refreshing = False
+
+
+class ResponseCache(object):
+    def __init__(
+        self,
+        ttl=int(os.environ.get("RESPONSE_CACHE_TTL", 60)),
+        stale_ttl=int(os.environ.get("RESPONSE_CACHE_STALE_TTL", 300)),
+        max_size=int(os.environ.get("RESPONSE_CACHE_SIZE", 512)),
+    ):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {
+            "hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "refreshes": 0,
+            "evictions": 0,
+            "invalidations": 0,
+        }
+
+    def cached(self, func):
+        """Cache the responses of endpoint ``func``, taking ``since`` and ``until``."""
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            params = bound.arguments
+            key = (func.__name__,) + tuple(
+                (name, value.strip() if isinstance(value, str) else value)
+                for name, value in sorted(params.items())
+            )
+            compute = functools.partial(func, *bound.args, **bound.kwargs)
+            return self.get(key, params["since"], params["until"], compute)
+
+        return wrapper
+
+    def get(self, key, since, until, compute):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now < entry.stale_until:
+                self._entries.move_to_end(key)
+                if now < entry.fresh_until:
+                    self.counters["hits"] += 1
+                    return entry.value
+                self.counters["stale_hits"] += 1
+                if not entry.refreshing:
+                    entry.refreshing = True
+                    Thread(
+                        target=self._refresh,
+                        args=(key, since, until, compute),
+                        daemon=True,
+                    ).start()
+                return entry.value
+            self.counters["misses"] += 1
+
+        value = compute()
+        self._store(key, since, until, value)
+        return value
+
+    def _refresh(self, key, since, until, compute):
+        try:
+            value = compute()
+        except Exception:
+            logger.exception("Response cache refresh failed")
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry.refreshing = False
+            return
+        self._store(key, since, until, value)
+        with self._lock:
+            self.counters["refreshes"] += 1
+
+    def _store(self, key, since, until, value):
+        now = time.monotonic()
+        entry = _Entry(
+            value, since, until, now + self.ttl, now + self.ttl + self.stale_ttl
+        )
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.counters["evictions"] += 1
+
+    def invalidate_dates(self, dates):
+        """Expire the responses whose date range covers one of ``dates``."""
+        with self._lock:
+            for entry in self._entries.values():
+                if entry.fresh_until and any(
+                    entry.since <= date <= entry.until for date in dates
+                ):
+                    # Kept as stale, so the next request still gets an answer
+                    # right away and refreshes it in the background
+                    entry.fresh_until = 0
+                    self.counters["invalidations"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters, size=len(self._entries), max_size=self.max_size)
+        requests = stats["hits"] + stats["stale_hits"] + stats["misses"]
+        stats["hit_ratio"] = (stats["hits"] + stats["stale_hits"]) / max(1, requests)
+        return stats
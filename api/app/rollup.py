@@ -0,0 +1,217 @@
+"""
+Daily rollups of the darkweb collection for the analytics endpoints.
+
+``darkweb_daily`` holds one document per (date, website, website_alias,
+category, emotion, sentiment, issue, poster) with the number of posts, so
+the endpoints group a few rows per day instead of scanning every post in
+the range.
+
+A day is always recomputed as a whole from its posts. That also covers
+posts whose category or analytics are filled in after they were crawled.
+Rows get a ``refreshed_at`` stamp and rows of the day left from an older
+refresh are deleted afterwards, so readers never see a half-empty day.
+Everything runs on MongoDB 3.6 (no ``$merge``).
+
+The API runs the change-stream consumer itself. Readers only use the
+rollups for ranges a rebuild up to today has covered, and while a consumer
+keeps stamping ``rollup_state``; otherwise they count the posts.
+
+    $ python -m app.rollup rebuild --since 2024-01-01
+    $ python -m app.rollup watch        # follow darkweb through a change stream
+"""
+import argparse
+import datetime
+import logging
+import os
+import time
+
+from app.model.mongodb import MongoDB
+from pymongo import ReplaceOne
+
+logger = logging.getLogger(__name__)
+
+POSTS_COLLECTION = "darkweb"
+ROLLUP_COLLECTION = "darkweb_daily"
+STATE_COLLECTION = "rollup_state"
+# Seconds without a stamp from the consumer before readers stop trusting it
+STALE_SECONDS = int(os.environ.get("ROLLUP_STALE_SECONDS", 120))
+
+DIMENSIONS = {
+    "website": "$website",
+    "website_alias": "$website_alias",
+    "category": "$category",
+    "emotion": "$analytics.emotion",
+    "sentiment": "$analytics.sentiment",
+    "issue": "$issue",
+    "poster": "$poster",
+}
+
+
+def day_bounds(date):
+    start = datetime.datetime.strptime(date, "%Y-%m-%d")
+    return start, start + datetime.timedelta(days=1)
+
+
+def dates_between(since, until):
+    start = datetime.datetime.strptime(since, "%Y-%m-%d")
+    end = datetime.datetime.strptime(until, "%Y-%m-%d")
+    return [
+        (start + datetime.timedelta(days=n)).strftime("%Y-%m-%d")
+        for n in range((end - start).days + 1)
+    ]
+
+
+def ensure_indexes(database):
+    rollup = database[ROLLUP_COLLECTION]
+    rollup.create_index([("date", 1), ("category", 1)])
+    rollup.create_index([("date", 1), ("refreshed_at", 1)])
+
+
+def refresh_day(database, date):
+    """Recompute the rollup rows of one day from its posts."""
+    start, end = day_bounds(date)
+    groups = database[POSTS_COLLECTION].aggregate(
+        [
+            {"$match": {"created_at": {"$gte": start, "$lt": end}}},
+            {"$group": {"_id": DIMENSIONS, "count": {"$sum": 1}}},
+        ],
+        allowDiskUse=True,
+    )
+
+    refreshed_at = datetime.datetime.utcnow()
+    rollup = database[ROLLUP_COLLECTION]
+    operations = []
+    for group in groups:
+        key = dict(group["_id"], date=date)
+        row = dict(key, count=group["count"], refreshed_at=refreshed_at)
+        # Field order of the key is fixed by DIMENSIONS, so it is a stable _id
+        operations.append(ReplaceOne({"_id": key}, dict(row, _id=key), upsert=True))
+        if len(operations) >= 1000:
+            rollup.bulk_write(operations, ordered=False)
+            operations = []
+    if operations:
+        rollup.bulk_write(operations, ordered=False)
+
+    rollup.delete_many({"date": date, "refreshed_at": {"$lt": refreshed_at}})
+
+
+def refresh_days(database, dates):
+    for date in sorted(set(dates)):
+        refresh_day(database, date)
+
+
+def rollup_match(since, until, category=None):
+    """``$match`` stage selecting the rollup rows of a date range."""
+    match = {"date": {"$gte": since, "$lte": until}}
+    if category is not None:
+        match["category"] = category
+    return {"$match": match}
+
+
+def rollups_cover(database, since):
+    """Whether the rollups are complete and current from ``since`` (YYYY-MM-DD) on."""
+    state = database[STATE_COLLECTION].find_one({"_id": ROLLUP_COLLECTION}) or {}
+    if not state.get("rebuilt_since") or not state.get("updated_at"):
+        return False
+    age = datetime.datetime.utcnow() - state["updated_at"]
+    return since >= state["rebuilt_since"] and age.total_seconds() <= STALE_SECONDS
+
+
+def watch(database, flush_seconds=10, on_refresh=None):
+    """
+    Keep the rollups current from a change stream on the posts.
+
+    Changed posts mark their day dirty; dirty days are recomputed at most
+    every ``flush_seconds``, then passed to ``on_refresh``. The resume token
+    is saved after each refresh, and at least every ``flush_seconds`` while
+    idle, so a restarted consumer continues where it stopped and readers see
+    it is alive. Deletes carry no document and are picked up by the next
+    ``rebuild``.
+    """
+    ensure_indexes(database)
+    state = database[STATE_COLLECTION]
+    saved = state.find_one({"_id": ROLLUP_COLLECTION}) or {}
+
+    dirty = set()
+    last_flush = time.monotonic()
+    with database[POSTS_COLLECTION].watch(
+        [{"$match": {"operationType": {"$in": ["insert", "update", "replace"]}}}],
+        full_document="updateLookup",
+        resume_after=saved.get("resume_token"),
+        max_await_time_ms=1000,
+    ) as stream:
+        while stream.alive:
+            change = stream.try_next()
+            if change is not None:
+                created_at = (change.get("fullDocument") or {}).get("created_at")
+                if isinstance(created_at, datetime.datetime):
+                    dirty.add(created_at.strftime("%Y-%m-%d"))
+
+            due = time.monotonic() - last_flush >= flush_seconds
+            refresh = dirty and (change is None or due)
+            if refresh:
+                refresh_days(database, dirty)
+                if on_refresh is not None:
+                    on_refresh(dirty)
+                dirty.clear()
+            if refresh or due:
+                last_flush = time.monotonic()
+                state.update_one(
+                    {"_id": ROLLUP_COLLECTION},
+                    {
+                        "$set": {
+                            "resume_token": stream.resume_token,
+                            "updated_at": datetime.datetime.utcnow(),
+                        }
+                    },
+                    upsert=True,
+                )
+
+
+def follow_posts(client, on_refresh=None):
+    """``watch`` on a background thread; ``client`` is a ``MongoDB`` on the posts."""
+    try:
+        watch(client.database(), on_refresh=on_refresh)
+    except Exception:
+        # E.g. a standalone server without change streams; the state goes
+        # stale and readers count the posts
+        logger.exception("Rollup consumer stopped")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the darkweb daily rollups")
+    parser.add_argument("command", choices=["rebuild", "watch"])
+    parser.add_argument(
+        "--db",
+        default=os.environ.get("ROLLUP_DB", "crawler"),
+        help="Database of the posts",
+    )
+    parser.add_argument("--since", help="First day to rebuild (YYYY-MM-DD)")
+    parser.add_argument("--until", help="Last day to rebuild, default today")
+    args = parser.parse_args()
+
+    client = MongoDB(dbname=args.db)
+    database = client.database()
+    if args.command == "watch":
+        watch(database)
+        return
+
+    if not args.since:
+        parser.error("rebuild needs --since")
+    until = args.until or datetime.datetime.utcnow().strftime("%Y-%m-%d")
+    ensure_indexes(database)
+    for date in dates_between(args.since, until):
+        refresh_day(database, date)
+        print(f"Rolled up {date}")
+
+    # Only a rebuild up to today leaves no gap before what the consumer follows
+    if until >= datetime.datetime.utcnow().strftime("%Y-%m-%d"):
+        database[STATE_COLLECTION].update_one(
+            {"_id": ROLLUP_COLLECTION},
+            {"$min": {"rebuilt_since": args.since}},
+            upsert=True,
+        )
+
+
+if __name__ == "__main__":
+    main()
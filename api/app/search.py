@@ -0,0 +1,61 @@
+"""
+Keyword search over post content, backed by indexes.
+
+``query`` is split into terms:
+
+- ``word``: the post contains the word (text index, case-insensitive)
+- ``"some phrase"``: the post contains the phrase
+- ``pref*``: the post has a word starting with ``pref``, through the
+  ``content_terms`` array the crawler writes next to ``content``
+
+Every term is required. Word and phrase terms become one ``$text`` search;
+each quoted term of a ``$search`` string is mandatory, so quoting single
+words gives them the same all-terms semantics. Prefix terms are anchored
+regexes on ``content_terms``, which its index answers with a range scan.
+"""
+import re
+
+TEXT_INDEX = "content_text"
+
+_TERM_PATTERN = re.compile(r'"([^"]+)"|(\S+)')
+_WORD_PATTERN = re.compile(r"\w+")
+
+
+def ensure_search_indexes(collection):
+    # The language "none" skips stemming and stop words; posts are not all
+    # English and exact words are what analysts search for
+    collection.create_index(
+        [("content", "text")], name=TEXT_INDEX, default_language="none", background=True
+    )
+    collection.create_index([("content_terms", 1)], background=True)
+
+
+def parse_query(query):
+    """Split ``query`` into (words, phrases, prefixes), lowercased."""
+    words, phrases, prefixes = [], [], []
+    for phrase, term in _TERM_PATTERN.findall(query or ""):
+        if phrase:
+            phrases.append(phrase.strip().lower())
+        elif term.endswith("*") and _WORD_PATTERN.fullmatch(term[:-1]):
+            prefixes.append(term[:-1].lower())
+        else:
+            words.extend(word.lower() for word in _WORD_PATTERN.findall(term))
+    return words, phrases, prefixes
+
+
+def search_match(query):
+    """``$match`` conditions for ``query``, to merge into an endpoint's first stage."""
+    words, phrases, prefixes = parse_query(query)
+    match = {}
+    required = [f'"{term}"' for term in words + phrases]
+    if required:
+        match["$text"] = {"$search": " ".join(required)}
+    if prefixes:
+        match["$and"] = [
+            {"content_terms": {"$regex": "^" + re.escape(prefix)}}
+            for prefix in prefixes
+        ]
+    if not match:
+        # Nothing searchable, e.g. only punctuation: match no post
+        match["_id"] = {"$exists": False}
+    return match
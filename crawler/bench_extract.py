@@ -0,0 +1,206 @@
+"""
+Replay recorded pages through every site module, offline.
+
+Record a corpus by crawling with ``DWC_RECORD_CORPUS_DIR=corpus``, then:
+
+    $ python bench_extract.py --corpus corpus              # timings + golden diffs
+    $ python bench_extract.py --corpus corpus --update     # accept current output
+    $ python bench_extract.py --corpus corpus --sites breach,leftychan
+
+``fixtures/corpus`` is a small tracked corpus (a few pages of breach,
+endchan and leftychan with their expected output) that the pre-commit
+hooks replay, so parser regressions show up without a network:
+
+    $ python bench_extract.py --corpus fixtures/corpus
+
+For each site the page extractors (``_get_page_context``/``_get_body_html``,
+``_get_posts`` and ``_scrape_post``) run against a ``ReplayDriver``; nothing
+touches Tor or MongoDB. Exits with status 1 when any site's output differs
+from its ``expected.json``.
+"""
+import argparse
+import contextlib
+import hashlib
+import importlib
+import io
+import json
+import logging
+import os
+import sys
+import time
+import tracemalloc
+
+from src.replay import EXPECTED, ReplayDriver, load_pages
+
+# Crawler modules import their siblings by top-level name
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+
+def load_crawler(site, driver):
+    module = importlib.import_module(site)
+    crawler_class = getattr(module, "DarkwebCrawler")
+    # Skip __init__: it would start a browser and connect to MongoDB
+    crawler = crawler_class.__new__(crawler_class)
+    crawler.driver = driver
+    crawler.driver_pool = None
+    crawler.mongodb_client = None
+    return crawler
+
+
+def extract_page(crawler, url):
+    crawler.driver.get(url)
+    if hasattr(crawler, "_get_thread_topic") and hasattr(
+        crawler, "_get_thread_section"
+    ):
+        context = crawler._get_page_context()
+        soup = context.soup
+    else:
+        context = None
+        soup = crawler._get_body_html()
+
+    posts = crawler._get_posts(soup)
+    return [crawler._scrape_post(post, i, context) for i, post in enumerate(posts)]
+
+
+def serialize(item):
+    if item is None:
+        return None
+    data = dict(item.__dict__)
+    raw_content = data.pop("raw_content", None)
+    if raw_content is not None:
+        data["raw_content_sha1"] = hashlib.sha1(raw_content.encode("utf-8")).hexdigest()
+    return json.loads(json.dumps(data, default=str))
+
+
+def run_site(site, pages):
+    crawler = load_crawler(site, ReplayDriver(pages))
+    if not hasattr(crawler, "_get_posts") or not hasattr(crawler, "_scrape_post"):
+        return None
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        output = {url: extract_page(crawler, url) for url, _ in pages}
+        elapsed = time.perf_counter() - started
+
+        # Separate pass so tracing does not skew the timings
+        tracemalloc.start()
+        for url, _ in pages:
+            extract_page(crawler, url)
+        _, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+
+    items = sum(len(posts) for posts in output.values())
+    return {
+        "pages": len(pages),
+        "items": items,
+        "failed": sum(post is None for posts in output.values() for post in posts),
+        "seconds": elapsed,
+        "peak_kib": peak / 1024,
+        "blocks": sum(stat.count for stat in snapshot.statistics("filename")),
+        "output": {
+            url: [serialize(post) for post in posts] for url, posts in output.items()
+        },
+    }
+
+
+def diff_output(expected, actual):
+    diffs = []
+    for url in sorted(set(expected) | set(actual)):
+        old, new = expected.get(url), actual.get(url)
+        if old is None or new is None:
+            diffs.append(f"{url}: page {'added' if old is None else 'removed'}")
+            continue
+        if len(old) != len(new):
+            diffs.append(f"{url}: {len(old)} -> {len(new)} items")
+        for index, (old_item, new_item) in enumerate(zip(old, new)):
+            if old_item == new_item:
+                continue
+            if old_item is None or new_item is None:
+                change = "now extracted" if old_item is None else "no longer extracted"
+                diffs.append(f"{url} #{index}: {change}")
+                continue
+            fields = sorted(
+                k
+                for k in set(old_item) | set(new_item)
+                if old_item.get(k) != new_item.get(k)
+            )
+            diffs.append(f"{url} #{index}: {', '.join(fields)} changed")
+    return diffs
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Offline extraction benchmark over a recorded corpus"
+    )
+    parser.add_argument("--corpus", default="corpus", help="Corpus directory")
+    parser.add_argument(
+        "--sites", help="Comma-separated site modules (default: every recorded site)"
+    )
+    parser.add_argument(
+        "--update",
+        action="store_true",
+        help="Overwrite expected.json with the current output",
+    )
+    args = parser.parse_args()
+
+    # The site modules log every post at INFO
+    logging.disable(logging.INFO)
+
+    sites = (
+        args.sites.split(",")
+        if args.sites
+        else sorted(
+            name
+            for name in os.listdir(args.corpus)
+            if os.path.isdir(os.path.join(args.corpus, name))
+        )
+    )
+
+    failed_sites = []
+    print(
+        f"{'site':<22} {'pages':>6} {'items':>6} {'failed':>6} "
+        f"{'pages/s':>9} {'items/s':>9} {'peak KiB':>9} {'blocks':>8}  diff"
+    )
+    for site in sites:
+        site_dir = os.path.join(args.corpus, site)
+        try:
+            result = run_site(site, load_pages(site_dir))
+        except Exception as e:
+            print(f"{site:<22} error: {e}")
+            failed_sites.append(site)
+            continue
+        if result is None:
+            print(f"{site:<22} skipped: no _get_posts/_scrape_post extractor")
+            continue
+
+        expected_path = os.path.join(site_dir, EXPECTED)
+        if args.update or not os.path.exists(expected_path):
+            with open(expected_path, "w", encoding="utf-8") as f:
+                json.dump(result["output"], f, indent=2, sort_keys=True)
+                f.write("\n")
+            diffs, status = [], "golden written"
+        else:
+            with open(expected_path, encoding="utf-8") as f:
+                diffs = diff_output(json.load(f), result["output"])
+            status = f"{len(diffs)} differences" if diffs else "ok"
+
+        seconds = result["seconds"] or 1e-9
+        print(
+            f"{site:<22} {result['pages']:>6} {result['items']:>6} "
+            f"{result['failed']:>6} "
+            f"{result['pages'] / seconds:>9.1f} {result['items'] / seconds:>9.1f} "
+            f"{result['peak_kib']:>9.0f} {result['blocks']:>8}  {status}"
+        )
+        for diff in diffs[:20]:
+            print(f"    {diff}")
+        if diffs:
+            failed_sites.append(site)
+
+    if failed_sites:
+        print(f"\nExtraction changed or failed for: {', '.join(failed_sites)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Compare the HTML parser backends on saved pages.
+
+Save thread pages (the body innerHTML, e.g. from ``_get_body_html``) as
+``.html`` files in a directory, then run:
+
+    $ python bench_parsers.py --fixtures fixtures/ --repeat 20
+"""
+import argparse
+import glob
+import os
+import statistics
+import time
+
+from src.parsing import html_to_text, parse_html, parser_available, selectolax_available
+
+BACKENDS = ("html.parser", "lxml", "html5lib")
+
+
+def time_call(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000
+
+
+def bench_page(markup, backends, repeat):
+    results = {}
+    for backend in backends:
+        soup = parse_html(markup, backend)
+        results[backend] = {
+            "parse_ms": time_call(lambda: parse_html(markup, backend), repeat),
+            "find_all_ms": time_call(lambda: soup.find_all(True), repeat),
+            "text_ms": time_call(lambda: soup.get_text(), repeat),
+            "elements": len(soup.find_all(True)),
+        }
+    if selectolax_available():
+        results["selectolax"] = {
+            "parse_ms": None,
+            "find_all_ms": None,
+            "text_ms": time_call(lambda: html_to_text(markup), repeat),
+            "elements": None,
+        }
+    return results
+
+
+def format_ms(value):
+    return "-" if value is None else f"{value:8.2f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark HTML parser backends on saved pages"
+    )
+    parser.add_argument(
+        "--fixtures", default="fixtures", help="Directory of saved .html pages"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=10, help="Runs per page and backend"
+    )
+    args = parser.parse_args()
+
+    pages = sorted(
+        glob.glob(os.path.join(args.fixtures, "**", "*.html"), recursive=True)
+    )
+    if not pages:
+        print(f"No .html fixtures found in {args.fixtures}")
+        return
+
+    backends = [backend for backend in BACKENDS if parser_available(backend)]
+    totals = {}
+
+    for page in pages:
+        with open(page, encoding="utf-8", errors="replace") as f:
+            markup = f.read()
+        print(f"\n{page} ({len(markup) / 1024:.0f} KiB)")
+        print(
+            f"  {'backend':<12} {'parse ms':>9} {'find_all':>9} "
+            f"{'get_text':>9} {'elements':>9}"
+        )
+
+        for backend, result in bench_page(markup, backends, args.repeat).items():
+            elements = result["elements"] if result["elements"] is not None else "-"
+            print(
+                f"  {backend:<12} {format_ms(result['parse_ms']):>9} "
+                f"{format_ms(result['find_all_ms']):>9} "
+                f"{format_ms(result['text_ms']):>9} {elements:>9}"
+            )
+            total = totals.setdefault(backend, {"parse_ms": 0.0, "text_ms": 0.0})
+            total["parse_ms"] += result["parse_ms"] or 0
+            total["text_ms"] += result["text_ms"] or 0
+
+    print(f"\nTotal over {len(pages)} pages")
+    baseline = totals.get("html.parser", {}).get("parse_ms")
+    for backend, total in totals.items():
+        speedup = (
+            f"  ({baseline / total['parse_ms']:.1f}x html.parser)"
+            if baseline and total["parse_ms"]
+            else ""
+        )
+        print(
+            f"  {backend:<12} parse {total['parse_ms']:9.1f} ms  "
+            f"get_text {total['text_ms']:9.1f} ms{speedup}"
+        )
+
+
+if __name__ == "__main__":
+    main()
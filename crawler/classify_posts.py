@@ -0,0 +1,132 @@
+"""
+Label stored posts with the content classifier.
+
+Posts in ``darkweb`` without a ``category`` are read in ``_id`` order, one
+chunk at a time, classified with ``ContentClassifier.predict_batch`` and
+written back with one ``bulk_write`` per chunk:
+
+    $ python classify_posts.py
+    $ python classify_posts.py --website http://... --limit 5000
+    $ python classify_posts.py --cache          # reuse results of repeated content
+
+The forum type given to the classifier is the post's ``thread_section``.
+"""
+import argparse
+import logging
+import time
+
+from config import (
+    CLASSIFIER_BATCH_SIZE,
+    CLASSIFIER_ENCODER_PATH,
+    CLASSIFIER_GLOVE_PATH,
+    CLASSIFIER_MODEL_PATH,
+)
+from inference.content_classifier import ContentClassifier
+from pymongo import UpdateOne
+from src.mongo import MongoDBClient
+
+logging.basicConfig(
+    level=logging.INFO, format="[%(asctime)s] [%(levelname)s] %(message)s"
+)
+
+FIELDS = {"content": 1, "website": 1, "thread_section": 1}
+
+
+def forum_type(post):
+    section = post.get("thread_section")
+    if isinstance(section, list):
+        return " ".join(str(part) for part in section if part)
+    return section or ""
+
+
+def unlabeled_chunks(collection, chunk_size, website=None, limit=None):
+    query = {"category": {"$exists": False}}
+    if website:
+        query["website"] = website
+    last_id = None
+    read = 0
+    while limit is None or read < limit:
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        size = chunk_size if limit is None else min(chunk_size, limit - read)
+        chunk = list(collection.find(query, FIELDS).sort("_id", 1).limit(size))
+        if not chunk:
+            return
+        last_id = chunk[-1]["_id"]
+        read += len(chunk)
+        yield chunk
+
+
+def classify(classifier, collection, chunk_size, website=None, limit=None):
+    labeled = 0
+    started = time.monotonic()
+    for chunk in unlabeled_chunks(collection, chunk_size, website, limit):
+        items = [
+            (post.get("content"), post.get("website"), forum_type(post))
+            for post in chunk
+        ]
+        try:
+            categories = classifier.predict_batch(items)
+        except Exception as e:
+            # E.g. a website the encoder was not fitted on; the chunk stays unlabeled
+            logging.error(f"Could not classify chunk ending at {chunk[-1]['_id']}: {e}")
+            continue
+
+        collection.bulk_write(
+            [
+                UpdateOne({"_id": post["_id"]}, {"$set": {"category": str(category)}})
+                for post, category in zip(chunk, categories)
+            ],
+            ordered=False,
+        )
+        labeled += len(chunk)
+        elapsed = time.monotonic() - started
+        logging.info(f"Labeled {labeled} posts ({labeled / elapsed:.1f} posts/s)")
+        if classifier.cache is not None:
+            stats = classifier.cache.stats()
+            logging.info(
+                f"Cache hit ratio: predictions {stats['prediction_hit_ratio']:.1%}, "
+                f"embeddings {stats['embedding_hit_ratio']:.1%}"
+            )
+    return labeled
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Classify unlabeled posts in batches")
+    parser.add_argument(
+        "--glove", default=CLASSIFIER_GLOVE_PATH, help="GloVe vectors file"
+    )
+    parser.add_argument(
+        "--model", default=CLASSIFIER_MODEL_PATH, help="Saved RandomForest model"
+    )
+    parser.add_argument(
+        "--encoder", default=CLASSIFIER_ENCODER_PATH, help="Saved website OneHotEncoder"
+    )
+    parser.add_argument(
+        "--chunk-size", type=int, default=CLASSIFIER_BATCH_SIZE, help="Posts per batch"
+    )
+    parser.add_argument(
+        "--website", default=None, help="Only classify posts of this website"
+    )
+    parser.add_argument(
+        "--limit", type=int, default=None, help="Stop after this many posts"
+    )
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="Cache embeddings and predictions by content",
+    )
+    args = parser.parse_args()
+
+    classifier = ContentClassifier(
+        args.glove, args.model, args.encoder, use_cache=args.cache
+    )
+    collection = MongoDBClient().database["darkweb"]
+    labeled = classify(
+        classifier, collection, args.chunk_size, args.website, args.limit
+    )
+    print(f"Labeled {labeled} posts")
+
+
+if __name__ == "__main__":
+    main()
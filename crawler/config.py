@@ -17,6 +17,109 @@ GECKO_DRIVER_PATH = remove_quotes(f"{os.getenv('DWC_GECKO_DRIVER_PATH')}" or "")
 # PROFILE_PATH = "/opt/homebrew/Caskroom/tor-browser/14.0.4/Tor Browser.app/Contents/Resources/TorBrowser/Tor"
 # GECKO_DRIVER_PATH = "/opt/homebrew/opt/geckodriver/bin/geckodriver"
 
+# Browser pool shared by the queue workers: number of warm Tor Browsers and
+# the number of page loads after which a browser is recycled
+DRIVER_POOL_SIZE = int(os.getenv("DWC_DRIVER_POOL_SIZE") or 1)
+DRIVER_POOL_MAX_PAGES = int(os.getenv("DWC_DRIVER_POOL_MAX_PAGES") or 200)
+
+# Politeness: minimum seconds between two page loads on the same host, per
+# site name ("default" applies to every other site)
+SITE_MIN_INTERVAL = {
+    "default": 5,
+}
+
+# Scheduler (run.py --workers): crawls allowed at once against one .onion host
+MAX_CONCURRENT_PER_HOST = 1
+
+# Bounds of the adaptive page-ready timeout (seconds)
+PAGE_WAIT_MIN_TIMEOUT = 10
+PAGE_WAIT_MAX_TIMEOUT = 60
+
+# Crawl queue (script_new.py): a claimed record is leased for
+# QUEUE_LEASE_SECONDS and renewed by heartbeats while it runs. Failed records
+# are retried with exponential backoff and dead-lettered after
+# QUEUE_MAX_ATTEMPTS attempts.
+QUEUE_LEASE_SECONDS = int(os.getenv("DWC_QUEUE_LEASE_SECONDS") or 300)
+QUEUE_MAX_ATTEMPTS = int(os.getenv("DWC_QUEUE_MAX_ATTEMPTS") or 5)
+QUEUE_RETRY_BASE_SECONDS = 60
+QUEUE_RETRY_MAX_SECONDS = 3600
+
+# Per-site bloom filters of post ids and profiles already stored in MongoDB,
+# so crawlers only query Mongo for possible duplicates
+SEEN_INDEX_DIR = os.getenv("DWC_SEEN_INDEX_DIR") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "seen_index")
+SEEN_INDEX_CAPACITY = 1_000_000
+SEEN_INDEX_ERROR_RATE = 0.001
+
+# Where the raw_content of posts is kept instead of inline in the darkweb
+# documents: "gridfs" (a bucket in BLOB_DATABASE, which the API reads with
+# its BLOB_DATABASE set to the same name), "local" (files under
+# BLOB_STORE_DIR) or "" to keep it inline.
+# Blobs are compressed with zstd when zstandard is installed, gzip otherwise.
+BLOB_STORE = os.getenv("DWC_BLOB_STORE", "")
+BLOB_DATABASE = os.getenv("DWC_BLOB_DATABASE") or "allnewdarkweb"
+BLOB_STORE_DIR = os.getenv("DWC_BLOB_STORE_DIR") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "blobs")
+BLOB_COMPRESSION = os.getenv("DWC_BLOB_COMPRESSION") or "auto"
+
+# BeautifulSoup tree builder: "auto" uses lxml when it is installed and
+# html.parser otherwise
+HTML_PARSER = os.getenv("DWC_HTML_PARSER") or "auto"
+
+# When set, every page body a crawler reads is saved to this corpus directory
+# for offline replay with bench_extract.py
+RECORD_CORPUS_DIR = os.getenv("DWC_RECORD_CORPUS_DIR") or None
+
+# How each site module fetches pages: "selenium" (default) drives Tor Browser,
+# "http" fetches static HTML over the Tor SOCKS proxy, and "http_seeded" does
+# the same with cookies taken once from a browser session. HTTP is opt-in per
+# site and needs a tor listening on TOR_SOCKS_PROXY (or TOR_INSTANCES); the
+# static chans work with it, e.g.
+#   DWC_FETCH_BACKENDS=endchan=http,leftychan=http,ptchan=http,balkanchan=http,foxdick=http
+FETCH_BACKENDS = dict(
+    entry.strip().split("=", 1)
+    for entry in (os.getenv("DWC_FETCH_BACKENDS") or "").split(",")
+    if "=" in entry
+)
+TOR_SOCKS_PROXY = os.getenv("DWC_TOR_SOCKS_PROXY") or "socks5h://127.0.0.1:9150"
+HTTP_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; rv:128.0) Gecko/20100101 Firefox/128.0"
+HTTP_TIMEOUT = 60
+HTTP_POOL_SIZE = 4
+
+# Page pipeline: pages fetched ahead of the one being parsed, threads running
+# the extractors, and concurrent fetches per onion host and per Tor circuit
+PIPELINE_PREFETCH = 2
+PIPELINE_EXTRACT_WORKERS = 2
+PIPELINE_MAX_PER_HOST = 2
+PIPELINE_MAX_PER_CIRCUIT = 4
+
+# Local tor instances shared out to crawl workers. Each entry attaches to a
+# running tor, or starts one with "launch": True. Empty keeps every crawler
+# on the Tor Browser's own tor.
+#   {"socks": "127.0.0.1:9050", "control": "127.0.0.1:9051", "password": "..."},
+#   {"socks": "127.0.0.1:9060", "control": "127.0.0.1:9061", "launch": True},
+TOR_INSTANCES = []
+TOR_BINARY = os.getenv("DWC_TOR_BINARY") or "tor"
+TOR_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tor_data")
+# Seconds to wait for a launched tor to finish bootstrapping
+TOR_BOOTSTRAP_TIMEOUT = int(os.getenv("DWC_TOR_BOOTSTRAP_TIMEOUT") or 180)
+# A circuit is rotated (NEWNYM) when it is this many times slower than the
+# median circuit, or when its failure rate passes the threshold
+TOR_CIRCUIT_SLOW_FACTOR = 2.0
+TOR_CIRCUIT_FAILURE_RATE = 0.5
+TOR_CIRCUIT_MIN_ROTATE_SECONDS = 60
+
+# Content classifier (classify_posts.py): GloVe vectors, RandomForest model
+# and website OneHotEncoder, and the number of posts classified per batch
+CLASSIFIER_GLOVE_PATH = os.getenv("DWC_CLASSIFIER_GLOVE_PATH") or "glove.6B.50d.txt"
+CLASSIFIER_MODEL_PATH = os.getenv("DWC_CLASSIFIER_MODEL_PATH") or "model.joblib"
+CLASSIFIER_ENCODER_PATH = os.getenv("DWC_CLASSIFIER_ENCODER_PATH") or "encoder.joblib"
+CLASSIFIER_BATCH_SIZE = 1000
+# Embeddings and predictions of classified content (--cache), kept in an
+# in-memory LRU of CLASSIFIER_CACHE_SIZE entries and a SQLite file per model
+CLASSIFIER_CACHE_DIR = os.getenv("DWC_CLASSIFIER_CACHE_DIR") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "classifier_cache")
+CLASSIFIER_CACHE_SIZE = 100_000
+# Binary, memory-mappable copies of the GloVe vectors, one per source hash
+GLOVE_CACHE_DIR = os.getenv("DWC_GLOVE_CACHE_DIR") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "glove_cache")
+
 # MongoDB connection string
 # MONGO_HOST = remove_quotes(os.getenv("DWC_MONGO_HOST") or '')
 # MONGO_PORT =  int(remove_quotes(os.getenv("DWC_MONGO_PORT")) or 0)
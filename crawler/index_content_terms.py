@@ -0,0 +1,76 @@
+"""
+Fill ``content_terms`` on posts stored before the writer added it.
+
+The API's prefix search (``pref*``) only finds posts that have the field.
+Posts are read in ``_id`` order, one chunk at a time, and written back with
+one ``bulk_write`` per chunk:
+
+    $ python index_content_terms.py
+    $ python index_content_terms.py --website http://... --chunk-size 2000
+"""
+import argparse
+import logging
+import time
+
+from pymongo import UpdateOne
+from src.mongo import MongoDBClient, content_terms
+
+logging.basicConfig(
+    level=logging.INFO, format="[%(asctime)s] [%(levelname)s] %(message)s"
+)
+
+
+def missing_chunks(collection, chunk_size, website=None):
+    query = {"content_terms": {"$exists": False}, "content": {"$type": "string"}}
+    if website:
+        query["website"] = website
+    last_id = None
+    while True:
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        chunk = list(
+            collection.find(query, {"content": 1}).sort("_id", 1).limit(chunk_size)
+        )
+        if not chunk:
+            return
+        last_id = chunk[-1]["_id"]
+        yield chunk
+
+
+def backfill(collection, chunk_size, website=None):
+    indexed = 0
+    started = time.monotonic()
+    for chunk in missing_chunks(collection, chunk_size, website):
+        collection.bulk_write(
+            [
+                UpdateOne(
+                    {"_id": post["_id"]},
+                    {"$set": {"content_terms": content_terms(post["content"])}},
+                )
+                for post in chunk
+            ],
+            ordered=False,
+        )
+        indexed += len(chunk)
+        elapsed = time.monotonic() - started
+        logging.info(f"Indexed {indexed} posts ({indexed / elapsed:.1f} posts/s)")
+    return indexed
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Backfill content_terms for prefix search"
+    )
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Posts per batch")
+    parser.add_argument(
+        "--website", default=None, help="Only index posts of this website"
+    )
+    args = parser.parse_args()
+
+    collection = MongoDBClient().database["darkweb"]
+    indexed = backfill(collection, args.chunk_size, args.website)
+    print(f"Indexed {indexed} posts")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from config import CLASSIFIER_CACHE_DIR, CLASSIFIER_CACHE_SIZE
+
+# Parameters per SQLite statement stay below the default limit of 999
+_SQL_CHUNK = 400
+
+
+def content_key(cleaned_content, cleaned_forum_type):
+    """Cache key of a document: hash of its cleaned content and forum type."""
+    data = f"{cleaned_content}\x1f{cleaned_forum_type}".encode("utf-8")
+    return hashlib.sha1(data).hexdigest()
+
+
+def model_fingerprint(*paths):
+    # Identifies the model files by path, size and modification time, so a
+    # retrained model or new vectors start a fresh cache
+    digest = hashlib.sha1()
+    for path in paths:
+        stat = os.stat(path)
+        digest.update(
+            f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}\x1e".encode(
+                "utf-8"
+            )
+        )
+    return digest.hexdigest()[:16]
+
+
+class _LRU:
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._items = OrderedDict()
+
+    def get(self, key):
+        value = self._items.get(key)
+        if value is not None:
+            self._items.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self._items[key] = value
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+
+class ClassificationCache:
+    """
+    Embeddings and predictions of already classified content.
+
+    Chan threads repeat boilerplate, quoted replies and cross-posts, and
+    recrawls classify the same text again. Documents are keyed by
+    ``content_key`` of their cleaned content and forum type. The embedding
+    only depends on that key; the prediction also depends on the website,
+    which is a model feature, so it is cached per (key, website). A cross-post
+    on another site skips the embedding, and an exact repeat also skips the
+    model.
+
+    Lookups go to an in-memory LRU first and then to a SQLite file, which
+    persists across runs and is shared by workers on one host. Each model
+    fingerprint has its own file. ``stats`` reports hit ratios.
+    """
+
+    def __init__(
+        self,
+        fingerprint,
+        cache_dir=CLASSIFIER_CACHE_DIR,
+        memory_size=CLASSIFIER_CACHE_SIZE,
+    ):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, f"{fingerprint}.sqlite")
+        self._db = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS predictions "
+            # No type on category, so labels keep whatever type the model returns
+            "(key TEXT, website TEXT, category, PRIMARY KEY (key, website))"
+        )
+        self._db.commit()
+        self._lock = threading.Lock()
+
+        self._embeddings = _LRU(memory_size)
+        self._predictions = _LRU(memory_size)
+        self.counters = {
+            "lookups": 0,
+            "prediction_hits": 0,
+            "embedding_lookups": 0,
+            "embedding_hits": 0,
+        }
+
+    def _select(self, query, params):
+        rows = []
+        for start in range(0, len(params), _SQL_CHUNK):
+            end = start + _SQL_CHUNK
+            chunk = params[start:end]
+            placeholders = ",".join("?" * len(chunk))
+            rows.extend(self._db.execute(query.format(placeholders), chunk).fetchall())
+        return rows
+
+    def get_predictions(self, keys):
+        """Cached categories of ``keys``, a list of (key, website), as a dict."""
+        with self._lock:
+            found = {}
+            for key in keys:
+                category = self._predictions.get(key)
+                if category is not None:
+                    found[key] = category
+
+            missing = [key for key in dict.fromkeys(keys) if key not in found]
+            if missing:
+                candidates = set(missing)
+                rows = self._select(
+                    "SELECT key, website, category FROM predictions WHERE key IN ({})",
+                    list(dict.fromkeys(key for key, _ in missing)),
+                )
+                for key, website, category in rows:
+                    if (key, website) in candidates:
+                        found[(key, website)] = category
+                        self._predictions.put((key, website), category)
+
+            self.counters["lookups"] += len(keys)
+            self.counters["prediction_hits"] += sum(1 for key in keys if key in found)
+            return found
+
+    def get_embeddings(self, keys):
+        """Cached feature embeddings of content ``keys`` as a dict of arrays."""
+        with self._lock:
+            found = {}
+            for key in keys:
+                vector = self._embeddings.get(key)
+                if vector is not None:
+                    found[key] = vector
+
+            missing = [key for key in dict.fromkeys(keys) if key not in found]
+            if missing:
+                for key, blob in self._select(
+                    "SELECT key, vector FROM embeddings WHERE key IN ({})", missing
+                ):
+                    vector = np.frombuffer(blob, dtype=np.float32)
+                    found[key] = vector
+                    self._embeddings.put(key, vector)
+
+            self.counters["embedding_lookups"] += len(keys)
+            self.counters["embedding_hits"] += sum(1 for key in keys if key in found)
+            return found
+
+    def put(self, embeddings, predictions):
+        """Store embeddings by key and predictions by (key, website)."""
+        with self._lock:
+            embedding_rows = []
+            for key, vector in embeddings.items():
+                vector = np.asarray(vector, dtype=np.float32)
+                self._embeddings.put(key, vector)
+                embedding_rows.append((key, vector.tobytes()))
+            prediction_rows = []
+            for (key, website), category in predictions.items():
+                self._predictions.put((key, website), category)
+                prediction_rows.append((key, website, category))
+
+            self._db.executemany(
+                "INSERT OR REPLACE INTO embeddings VALUES (?, ?)", embedding_rows
+            )
+            self._db.executemany(
+                "INSERT OR REPLACE INTO predictions VALUES (?, ?, ?)", prediction_rows
+            )
+            self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self.counters)
+        counters["prediction_hit_ratio"] = counters["prediction_hits"] / max(
+            1, counters["lookups"]
+        )
+        counters["embedding_hit_ratio"] = counters["embedding_hits"] / max(
+            1, counters["embedding_lookups"]
+        )
+        return counters
+
+    def close(self):
+        with self._lock:
+            self._db.close()
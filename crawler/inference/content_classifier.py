@@ -1,12 +1,87 @@
+import hashlib
+import html
+import json
+import logging
+import os
 import re
+import shutil
+import tempfile
 
 import joblib
 import numpy as np
 import pandas as pd
-from bs4 import BeautifulSoup
 from gensim.models import KeyedVectors
-from gensim.scripts.glove2word2vec import glove2word2vec
-from gensim.test.utils import datapath, get_tmpfile
+from gensim.test.utils import datapath
+from scipy import sparse
+
+from config import GLOVE_CACHE_DIR
+from inference.classification_cache import ClassificationCache, content_key, model_fingerprint
+
+GLOVE_CACHE_FILE = "vectors.kv"
+# Source file (path, size, mtime) -> sha256, so a cached conversion is found
+# without hashing the whole source again on every start
+GLOVE_HASH_INDEX = "hashes.json"
+
+# Tags are dropped and entities decoded like the text of an HTML parse, then
+# every other non-alphanumeric character goes; the text is only tokenized
+# afterwards, so a full HTML parse is not needed
+_TAG_PATTERN = re.compile(r"<[a-zA-Z/!][^>]*>")
+_CLEAN_PATTERN = re.compile(r"[^a-zA-Z0-9\s]")
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _source_hash(path, cache_dir):
+    stat = os.stat(path)
+    key = f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+    index_path = os.path.join(cache_dir, GLOVE_HASH_INDEX)
+    try:
+        with open(index_path, encoding="utf-8") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        index = {}
+
+    if key not in index:
+        index[key] = _file_sha256(path)
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=cache_dir)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+        os.replace(temp_path, index_path)
+    return index[key]
+
+
+def load_glove_vectors(glove_path, cache_dir=GLOVE_CACHE_DIR):
+    """
+    Load GloVe vectors memory-mapped from a binary copy of ``glove_path``.
+
+    The text file is converted once into gensim's native format, in a cache
+    directory named after the sha256 of the source, and every later load
+    maps the vector matrix read-only. Worker processes loading the same
+    vectors then share one copy in the page cache, and start without parsing
+    text. A changed source file gets a new hash and a new conversion.
+    """
+    target_dir = os.path.join(cache_dir, _source_hash(glove_path, cache_dir))
+    target = os.path.join(target_dir, GLOVE_CACHE_FILE)
+    if not os.path.exists(target):
+        logging.info(f"Converting {glove_path} to {target_dir}, done once per source file")
+        vectors = KeyedVectors.load_word2vec_format(glove_path, binary=False, no_header=True)
+        # Convert into a private directory and rename it into place, so
+        # concurrent workers never load a half-written copy
+        temp_dir = tempfile.mkdtemp(dir=cache_dir)
+        vectors.save(os.path.join(temp_dir, GLOVE_CACHE_FILE), separately=["vectors"])
+        try:
+            os.rename(temp_dir, target_dir)
+        except OSError:
+            # Another worker finished the same conversion first
+            shutil.rmtree(temp_dir, ignore_errors=True)
+    return KeyedVectors.load(target, mmap="r")
 
 
 class ContentClassifier:
@@ -29,67 +104,141 @@ class ContentClassifier:
     prediction = classifier.predict(content, website, forum_type)
     print("Prediction:", prediction)
 
+    # Or many at once, with one encoder and one model call per batch
+    predictions = classifier.predict_batch([(content, website, forum_type), ...])
+
     Parameters:
     - glove_path (str): Path to the GloVe model file.
     - model_path (str): Path to the saved RandomForestClassifier model file.
     - encoder_path (str): Path to the saved OneHotEncoder model file.
+    - use_cache (bool): Reuse embeddings and predictions of content seen before
+      (see ClassificationCache).
     """
 
-    def __init__(self, glove_path, model_path, encoder_path):
+    def __init__(self, glove_path, model_path, encoder_path, use_cache=False):
         # Load models and encoder
         self.glove_model = self._load_glove_model(glove_path)
         self.model = joblib.load(model_path)
         self.encoder = joblib.load(encoder_path)
+        self.cache = None
+        if use_cache:
+            self.cache = ClassificationCache(model_fingerprint(datapath(glove_path), model_path, encoder_path))
 
     def _load_glove_model(self, glove_path):
-        # Load the GloVe model
-        glove_file = datapath(glove_path)
-        word2vec_glove_file = get_tmpfile("glove.6B.50d.word2vec.txt")
-        glove2word2vec(glove_file, word2vec_glove_file)
-        return KeyedVectors.load_word2vec_format(word2vec_glove_file)
+        # Load the GloVe model, memory-mapped from its cached binary copy
+        return load_glove_vectors(datapath(glove_path))
 
     @staticmethod
     def _clean_text(text):
         # Clean and preprocess the text data
         if isinstance(text, str):
-            text = BeautifulSoup(text, "html.parser").get_text()
-            text = re.sub(r"[^a-zA-Z0-9\s]", "", text)
-            return text.lower()
+            text = html.unescape(_TAG_PATTERN.sub("", text))
+            return _CLEAN_PATTERN.sub("", text).lower()
         return ""
 
-    def _text_to_embedding(self, text):
-        # Convert text to embeddings using the GloVe model
-        words = text.split()
-        word_vectors = [
-            self.glove_model[word]
-            for word in words
-            if word in self.glove_model.key_to_index
-        ]
-        if len(word_vectors) == 0:
-            return np.zeros(self.glove_model.vector_size)
-        return np.mean(word_vectors, axis=0)
+    def _token_ids(self, texts):
+        # Vocabulary ids of the known words of every text, concatenated in
+        # text order, and the text each id belongs to. Each distinct word is
+        # looked up once and its id spread back to every occurrence
+        lookup = self.glove_model.key_to_index.get
+        tokens = [text.split() for text in texts]
+        flat = np.array([word for words in tokens for word in words], dtype=str)
+        distinct, occurrences = np.unique(flat, return_inverse=True)
+        distinct_ids = np.array([lookup(word, -1) for word in distinct.tolist()], dtype=np.int64)
+        ids = distinct_ids[occurrences.reshape(-1)]
+        rows = np.repeat(np.arange(len(texts)), [len(words) for words in tokens])
+        known = ids >= 0
+        return ids[known], rows[known]
+
+    def _embed_batch(self, texts):
+        # Mean embedding per text as a segment reduction: a sparse
+        # (texts x vocabulary) count matrix times the vector matrix sums every
+        # text's word vectors without materializing one row per token
+        vectors = self.glove_model.vectors
+        ids, rows = self._token_ids(texts)
+        counts = sparse.csr_matrix(
+            (np.ones(ids.size, dtype=vectors.dtype), (rows, ids)),
+            shape=(len(texts), vectors.shape[0]),
+        )
+        words = np.bincount(rows, minlength=len(texts))
+        return (counts @ vectors) / np.maximum(words, 1)[:, None]
+
+    def _embed_documents(self, contents, forum_types):
+        # Content and forum type embeddings side by side, one row per document
+        return np.hstack([self._embed_batch(contents), self._embed_batch(forum_types)])
+
+    def _features(self, websites, embeddings):
+        websites_encoded = self.encoder.transform([[website] for website in websites]).toarray()
+        return np.hstack([websites_encoded, embeddings])
+
+    def _preprocess_batch(self, items):
+        contents, websites, forum_types = zip(*items)
+        embeddings = self._embed_documents(
+            [self._clean_text(text) for text in contents],
+            [self._clean_text(text) for text in forum_types],
+        )
+        return self._features(websites, embeddings)
 
     def _preprocess_data(self, content, website, forum_type):
         # Preprocess the input data and convert to features
-        cleaned_content = self._clean_text(content)
-        cleaned_forum_type = self._clean_text(forum_type)
-
-        content_embedding = self._text_to_embedding(cleaned_content)
-        forum_type_embedding = self._text_to_embedding(cleaned_forum_type)
-
-        website_encoded = self.encoder.transform([[website]]).toarray()
-
-        X_new = np.hstack(
-            [
-                website_encoded,
-                content_embedding.reshape(1, -1),
-                forum_type_embedding.reshape(1, -1),
-            ]
-        )
-        return X_new
+        return self._preprocess_batch([(content, website, forum_type)])
 
     def predict(self, content, website, forum_type):
         # Predict the category based on content, website, and forum type
         X_new = self._preprocess_data(content, website, forum_type)
         prediction = self.model.predict(X_new)
         return prediction[0]
+
+    def predict_batch(self, items):
+        """
+        Predict the categories of an iterable of (content, website, forum_type).
+
+        Features of the whole batch are built as one matrix, so the encoder
+        and the model run once per batch instead of once per document.
+        """
+        items = list(items)
+        if not items:
+            return []
+        if self.cache is not None:
+            return self._predict_cached(items)
+        X_new = self._preprocess_batch(items)
+        return list(self.model.predict(X_new))
+
+    def _predict_cached(self, items):
+        # Repeated documents skip the model, repeated content skips embedding
+        contents = [self._clean_text(content) for content, _, _ in items]
+        forum_types = [self._clean_text(forum_type) for _, _, forum_type in items]
+        keys = [
+            (content_key(content, forum_type), website or "")
+            for content, forum_type, (_, website, _) in zip(contents, forum_types, items)
+        ]
+        predictions = self.cache.get_predictions(keys)
+
+        pending = [row for row, key in enumerate(keys) if key not in predictions]
+        if pending:
+            embeddings = self.cache.get_embeddings([keys[row][0] for row in pending])
+            to_embed = list({keys[row][0]: row for row in pending if keys[row][0] not in embeddings}.items())
+            if to_embed:
+                computed = self._embed_documents(
+                    [contents[row] for _, row in to_embed],
+                    [forum_types[row] for _, row in to_embed],
+                )
+                new_embeddings = {key: vector for (key, _), vector in zip(to_embed, computed)}
+                embeddings.update(new_embeddings)
+            else:
+                new_embeddings = {}
+
+            # Each distinct (content, website) goes through the model once
+            unique = list(dict.fromkeys(keys[row] for row in pending))
+            X_new = self._features(
+                [website for _, website in unique],
+                np.vstack([embeddings[key] for key, _ in unique]),
+            )
+            new_predictions = {
+                key: category.item() if hasattr(category, "item") else category
+                for key, category in zip(unique, self.model.predict(X_new))
+            }
+            predictions.update(new_predictions)
+            self.cache.put(new_embeddings, new_predictions)
+
+        return [predictions[key] for key in keys]
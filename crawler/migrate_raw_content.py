@@ -0,0 +1,99 @@
+"""
+Move the inline ``raw_content`` of stored posts to the blob store.
+
+New posts are offloaded by ``BulkPostWriter`` as they are written; this
+moves the ones written before:
+
+    $ python migrate_raw_content.py                      # every post
+    $ python migrate_raw_content.py --limit 1000 --dry-run
+
+Posts are processed in ``_id`` order, one batch at a time. Each batch is
+written to the configured ``BLOB_STORE`` before its documents swap
+``raw_content`` for ``raw_content_ref``, so the script can be stopped and
+run again at any point.
+"""
+import argparse
+import logging
+
+from config import BLOB_STORE
+from pymongo import UpdateOne
+from src.blob_store import get_blob_store
+from src.mongo import MongoDBClient
+
+logging.basicConfig(
+    level=logging.INFO, format="[%(asctime)s] [%(levelname)s] %(message)s"
+)
+
+
+def migrate(mongodb_client, collection_name, batch_size, limit=None, dry_run=False):
+    store = get_blob_store(mongodb_client)
+    collection = mongodb_client.database[collection_name]
+
+    query = {"raw_content": {"$type": "string"}}
+    last_id = None
+    moved = inline_bytes = 0
+    while limit is None or moved < limit:
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        size = batch_size if limit is None else min(batch_size, limit - moved)
+        batch = list(
+            collection.find(query, {"raw_content": 1}).sort("_id", 1).limit(size)
+        )
+        if not batch:
+            break
+        last_id = batch[-1]["_id"]
+
+        inline_bytes += sum(len(doc["raw_content"].encode("utf-8")) for doc in batch)
+        moved += len(batch)
+        if dry_run:
+            continue
+
+        refs = store.put_many([doc["raw_content"] for doc in batch])
+        collection.bulk_write(
+            [
+                UpdateOne(
+                    # Skip posts a crawler rewrote since they were read
+                    {"_id": doc["_id"], "raw_content": doc["raw_content"]},
+                    {"$set": {"raw_content_ref": ref}, "$unset": {"raw_content": ""}},
+                )
+                for doc, ref in zip(batch, refs)
+            ],
+            ordered=False,
+        )
+        logging.info(
+            f"Moved {moved} posts ({inline_bytes / 2**20:.1f} MiB of raw_content)"
+        )
+
+    return moved, inline_bytes
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Move inline raw_content to the blob store"
+    )
+    parser.add_argument(
+        "--collection", default="darkweb", help="Collection holding the posts"
+    )
+    parser.add_argument("--batch-size", type=int, default=500, help="Posts per batch")
+    parser.add_argument(
+        "--limit", type=int, default=None, help="Stop after this many posts"
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="Only count what would be moved"
+    )
+    args = parser.parse_args()
+
+    if not BLOB_STORE:
+        parser.error("BLOB_STORE is disabled, set DWC_BLOB_STORE to gridfs or local")
+
+    moved, inline_bytes = migrate(
+        MongoDBClient(), args.collection, args.batch_size, args.limit, args.dry_run
+    )
+    action = "Would move" if args.dry_run else "Moved"
+    print(
+        f"{action} raw_content of {moved} posts ({inline_bytes / 2**20:.1f} MiB inline)"
+    )
+
+
+if __name__ == "__main__":
+    main()
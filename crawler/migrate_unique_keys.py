@@ -0,0 +1,81 @@
+"""
+Create the unique indexes ``MongoDBClient.upsert_document`` relies on.
+
+With a unique index on its query fields, ``upsert_document`` skips writing
+documents whose ``content_hash`` is already stored; without one it writes
+every upsert. Run once per database, and again after adding a key:
+
+    $ python migrate_unique_keys.py
+    $ python migrate_unique_keys.py --dry-run
+
+A key whose collection already holds duplicates is left without an index;
+the duplicates are listed so they can be merged by hand first.
+"""
+import argparse
+import logging
+
+from src.mongo import UNIQUE_KEYS, MongoDBClient
+
+logging.basicConfig(
+    level=logging.INFO, format="[%(asctime)s] [%(levelname)s] %(message)s"
+)
+
+
+def duplicates(collection, fields, limit=10):
+    """Up to ``limit`` values of ``fields`` shared by several documents."""
+    return list(
+        collection.aggregate(
+            [
+                {
+                    "$group": {
+                        "_id": {field: f"${field}" for field in fields},
+                        "count": {"$sum": 1},
+                    }
+                },
+                {"$match": {"count": {"$gt": 1}}},
+                {"$limit": limit},
+            ],
+            allowDiskUse=True,
+        )
+    )
+
+
+def migrate(mongodb_client, dry_run=False):
+    created = 0
+    for collection_name, keys in UNIQUE_KEYS.items():
+        collection = mongodb_client.database[collection_name]
+        for fields in keys:
+            found = duplicates(collection, fields)
+            if found:
+                logging.error(
+                    f"{collection_name} {fields} has duplicates, not indexed: {found}"
+                )
+                continue
+            if dry_run:
+                logging.info(
+                    f"Would create a unique index on {collection_name} {fields}"
+                )
+                continue
+            collection.create_index(
+                [(field, 1) for field in fields], unique=True, background=True
+            )
+            logging.info(f"Created a unique index on {collection_name} {fields}")
+            created += 1
+    return created
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Create the unique indexes of upserted collections"
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="Only check the keys for duplicates"
+    )
+    args = parser.parse_args()
+
+    created = migrate(MongoDBClient(), args.dry_run)
+    print(f"Created {created} unique indexes")
+
+
+if __name__ == "__main__":
+    main()
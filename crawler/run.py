@@ -1,32 +1,51 @@
 import argparse
 import importlib
 import logging
+import multiprocessing.util
 import os
 import sys
 import traceback
+from collections import Counter, defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from urllib.parse import urlparse
 
-from config import SITES, PROFILES, LINKS
+from config import SITES, PROFILES, LINKS, MAX_CONCURRENT_PER_HOST
 
 logging.basicConfig(
     level=logging.INFO, format="[%(asctime)s] [%(levelname)s] %(message)s"
 )
 
+# Browser pool owned by a scheduler worker process
+worker_driver_pool = None
+# Crawlers of a scheduler worker process by site name, reused across its
+# jobs like run_site reuses one crawler for every url of a site
+worker_crawlers = {}
+
+
+def add_src_path():
+    dir_path = os.path.dirname(os.path.realpath(__file__))
+    src_path = os.path.join(dir_path, "src")
+    if src_path not in sys.path:
+        sys.path.append(src_path)
+
+
+def run_crawler(crawler_instance, url, idpost=None):
+    # Pastikan idpost dikirim jika diperlukan
+    if idpost is not None:
+        return crawler_instance.run(url, idpost)
+    return crawler_instance.run(url)
+
+
 def run_site(site_name, urls, idpost=None):
     try:
-        dir_path = os.path.dirname(os.path.realpath(__file__))
-        src_path = os.path.join(dir_path, "src")
-        sys.path.append(src_path)
-        
+        add_src_path()
+
         module = importlib.import_module(site_name)
         crawler_class = getattr(module, "DarkwebCrawler")
         
         crawler_instance = crawler_class()
         for url in urls:
-            # Pastikan idpost dikirim jika diperlukan
-            if idpost is not None:
-                crawler_instance.run(url, idpost)
-            else:
-                crawler_instance.run(url)
+            run_crawler(crawler_instance, url, idpost)
     
     except ModuleNotFoundError:
         logging.error(f"Module {site_name} not found.")
@@ -36,6 +55,103 @@ def run_site(site_name, urls, idpost=None):
     except TypeError as e:
         logging.error(f"TypeError: {e}")
 
+
+def init_worker():
+    global worker_driver_pool
+
+    add_src_path()
+    from src.driver_pool import DriverPool
+
+    # Every worker process owns exactly one browser, reused across its jobs
+    worker_driver_pool = DriverPool(max_size=1)
+    multiprocessing.util.Finalize(None, worker_driver_pool.close, exitpriority=10)
+
+
+def crawl_job(site_name, url, idpost=None):
+    crawler_instance = worker_crawlers.get(site_name)
+    if crawler_instance is None:
+        module = importlib.import_module(site_name)
+        crawler_class = getattr(module, "DarkwebCrawler")
+        crawler_instance = crawler_class(driver_pool=worker_driver_pool)
+        worker_crawlers[site_name] = crawler_instance
+    else:
+        crawler_instance.ensure_driver()
+
+    try:
+        return run_crawler(crawler_instance, url, idpost) or 0
+    finally:
+        # The worker's one browser goes back to the pool between jobs
+        crawler_instance.release_driver()
+
+
+def run_scheduled(entries, workers):
+    """
+    Crawl independent sites in parallel worker processes.
+
+    Jobs are handed out round-robin across sites so one long site cannot
+    starve the others, and never more than MAX_CONCURRENT_PER_HOST jobs run
+    against the same .onion host at once.
+    """
+    if MAX_CONCURRENT_PER_HOST < 1:
+        # No job could ever start
+        raise ValueError(
+            f"MAX_CONCURRENT_PER_HOST must be at least 1, got {MAX_CONCURRENT_PER_HOST}"
+        )
+
+    queues = defaultdict(deque)
+    for site_name, urls, idpost in entries:
+        for url in urls:
+            if url:
+                queues[site_name].append((url, idpost))
+
+    rotation = deque(queues)
+    running = {}
+    running_per_host = Counter()
+    totals = Counter()
+    failures = Counter()
+
+    def next_job():
+        for _ in range(len(rotation)):
+            site_name = rotation[0]
+            rotation.rotate(-1)
+            url, idpost = queues[site_name][0]
+            host = urlparse(url).netloc
+            if running_per_host[host] < MAX_CONCURRENT_PER_HOST:
+                queues[site_name].popleft()
+                if not queues[site_name]:
+                    rotation.remove(site_name)
+                return site_name, url, idpost, host
+        return None
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as executor:
+        while rotation or running:
+            while rotation and len(running) < workers:
+                job = next_job()
+                if job is None:
+                    break
+                site_name, url, idpost, host = job
+                logging.info(f"Scheduling {site_name}: {url}")
+                future = executor.submit(crawl_job, site_name, url, idpost)
+                running[future] = (site_name, url, host)
+                running_per_host[host] += 1
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                site_name, url, host = running.pop(future)
+                running_per_host[host] -= 1
+                try:
+                    totals[site_name] += future.result()
+                except Exception as e:
+                    failures[site_name] += 1
+                    logging.error(f"{site_name} failed on {url}: {e}")
+
+    for site_name in sorted(set(totals) | set(failures)):
+        logging.info(
+            f"{site_name}: {totals[site_name]} items, {failures[site_name]} failed urls"
+        )
+    return totals
+
+
 def main():
     parser = argparse.ArgumentParser(description="Web crawler for various sites.")
     parser.add_argument(
@@ -53,6 +169,13 @@ def main():
         help="Links names to crawl, \
             separated by comma. If not specified, all links will be crawled.",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of worker processes. With more than one, independent \
+            sites are crawled in parallel, each worker with its own browser.",
+    )
     
     args = parser.parse_args()
     
@@ -82,39 +205,31 @@ def main():
         logging.error(f"Invalid link names provided: {', '.join(invalid_links)}")
         return
     
-    if selected_sites:
-        for site in SITES:
-            if site["name"] in selected_sites:
-                logging.info(f"Running {site['name']}")
-                run_site(site["name"], site["urls"], site.get("idpost"))
-    
-    if selected_profiles:
-        for profile in PROFILES:
-            if profile["name"] in selected_profiles:
-                logging.info(f"Running {profile['name']}")
-                run_site(profile["name"], profile["profile_urls"], profile.get("idpost"))
-    
-    if selected_links:
-        for link in LINKS:
-            if link["name"] in selected_links:
-                logging.info(f"Running {link['name']}")
-                run_site(link["name"], link["link_urls"], link.get("idpost"))
-    
-    # If no specific arguments are provided, run everything
-    if not (selected_sites or selected_profiles or selected_links):
+    run_all = not (selected_sites or selected_profiles or selected_links)
+    entries = []
+
+    for site in SITES:
+        if run_all or site["name"] in selected_sites:
+            entries.append((site["name"], site["urls"], site.get("idpost")))
+
+    for profile in PROFILES:
+        if run_all or profile["name"] in selected_profiles:
+            entries.append((profile["name"], profile["profile_urls"], profile.get("idpost")))
+
+    for link in LINKS:
+        if run_all or link["name"] in selected_links:
+            entries.append((link["name"], link["link_urls"], link.get("idpost")))
+
+    if run_all:
         logging.info("Running all sites, profiles, and links")
-        
-        for site in SITES:
-            logging.info(f"Running {site['name']}")
-            run_site(site["name"], site["urls"], site.get("idpost"))
-        
-        for profile in PROFILES:
-            logging.info(f"Running {profile['name']}")
-            run_site(profile["name"], profile["profile_urls"], profile.get("idpost"))
-        
-        for link in LINKS:
-            logging.info(f"Running {link['name']}")
-            run_site(link["name"], link["link_urls"], link.get("idpost"))
+
+    if args.workers > 1:
+        run_scheduled(entries, args.workers)
+        return
+
+    for name, urls, idpost in entries:
+        logging.info(f"Running {name}")
+        run_site(name, urls, idpost)
 
 if __name__ == "__main__":
     main()
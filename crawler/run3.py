@@ -3,7 +3,6 @@ import importlib
 import logging
 import os
 import sys
-import traceback
 import csv
 from pymongo import MongoClient
 from bson.objectid import ObjectId
@@ -28,72 +27,67 @@ logging.basicConfig(
     level=logging.INFO, format="[%(asctime)s] [%(levelname)s] %(message)s"
 )
 
-def run_site(site_name, urls, idpost, userid):
-    try:
-        # Set up path and import crawler module
-        dir_path = os.path.dirname(os.path.realpath(__file__))
-        src_path = os.path.join(dir_path, "src")
+def load_crawler(site_name):
+    """Import src/<site_name>.py and return its DarkwebCrawler class"""
+    dir_path = os.path.dirname(os.path.realpath(__file__))
+    src_path = os.path.join(dir_path, "src")
+    if src_path not in sys.path:
         sys.path.append(src_path)
+
+    try:
         module = importlib.import_module(site_name)
+    except ModuleNotFoundError:
+        logging.error(f"Module {site_name} not found.")
+        raise
+    try:
+        return getattr(module, "DarkwebCrawler")
+    except AttributeError:
+        logging.error(f"DarkwebCrawler class not found in {site_name} module.")
+        raise
 
-        # Initialize and run crawler
-        crawler_class = getattr(module, "DarkwebCrawler")
-        crawler_instance = crawler_class()
-        result_count = crawler_instance.run(urls, idpost)
+def crawl_site(site_name, urls, idpost, driver_pool=None):
+    """Run the crawler of `site_name` and return its result count"""
+    crawler_instance = load_crawler(site_name)(driver_pool=driver_pool)
+    try:
+        return crawler_instance.run(urls, idpost)
+    finally:
+        crawler_instance.release_driver()
 
-        try:
-            # Check if document exists
-            document = collection.find_one({"_id": ObjectId(idpost)})
+def summary_fields(site_name, result_count, userid):
+    """Fields recording a finished crawl on its `crawling` record"""
+    formatted_time = datetime.now(jakarta_tz).strftime("%Y-%m-%d %H:%M:%S")
 
-            if document:
-                # Determine action type based on site name
-                action_type = "profile" if len(site_name.split("_")) > 1 else "crawling"
-                current_time = datetime.now(jakarta_tz)
+    # Determine action type based on site name
+    if len(site_name.split("_")) > 1:
+        return {
+            "status": '2',
+            "send_profile_summary": True,
+            "total_profile_real": result_count,
+            "finish_date_profile": formatted_time,
+            "user_id_profile": userid
+        }
+    return {
+        "status": '1',
+        "send_post_summary": True,
+        "total_post_real": result_count,
+        "finish_date_post": formatted_time,
+        "user_id": userid
+    }
 
-                if action_type == "crawling":
-                    # Update for crawling action
-                    formatted_time = current_time.strftime("%Y-%m-%d %H:%M:%S")
-                    update_result = collection.update_one(
-                        {"_id": ObjectId(idpost)},
-                        {
-                            "$set": {
-                                "status": '1',
-                                "send_post_summary": True,
-                                "total_post_real": result_count,
-                                "finish_date_post": formatted_time,
-                                "user_id": userid
-                            }
-                        }
-                    )
-                else:
-                    # Update for profile action
-                    formatted_time_profile = current_time.strftime("%Y-%m-%d %H:%M:%S")
-                    update_result = collection.update_one(
-                        {"_id": ObjectId(idpost)},
-                        {
-                            "$set": {
-                                "status": '2',
-                                "send_profile_summary": True,
-                                "total_profile_real": result_count,
-                                "finish_date_profile": formatted_time_profile,
-                                "user_id_profile": userid
-                            }
-                        }
-                    )
+def run_site(site_name, urls, idpost, userid, driver_pool=None):
+    result_count = crawl_site(site_name, urls, idpost, driver_pool=driver_pool)
 
-                print("Document updated successfully" if update_result.matched_count > 0 
-                      else "No document found to update")
-            else:
-                print("No document found with the given _id")
+    try:
+        update_result = collection.update_one(
+            {"_id": ObjectId(idpost)},
+            {"$set": summary_fields(site_name, result_count, userid)}
+        )
+        print("Document updated successfully" if update_result.matched_count > 0
+              else "No document found with the given _id")
+    except Exception as e:
+        print(f"Error updating document: {e}")
 
-        except Exception as e:
-            print(f"Error updating document: {e}")
-            
-    except ModuleNotFoundError:
-        logging.error(f"Module {site_name} not found.")
-    except AttributeError:
-        logging.error(f"DarkwebCrawler class not found in {site_name} module.")
-        logging.error(traceback.format_exc())
+    return result_count
 
 def main():
     parser = argparse.ArgumentParser(description="Web crawler for various sites.")
@@ -1,6 +1,5 @@
 import csv
 import os
-import subprocess
 import sys
 import bson
 import bson.objectid
@@ -8,14 +7,20 @@ from pymongo import MongoClient
 import argparse
 from datetime import datetime
 import pytz
+import threading
 import time
+from collections import Counter
 
+import run3
 from config import (
+    DRIVER_POOL_SIZE,
     MONGO_USER,
     MONGO_PASS,
     MONGO_HOST,
     MONGO_PORT,
 )
+from src.driver_pool import DriverPool
+from src.job_queue import CrawlQueue
 
 jakarta_tz = pytz.timezone('Asia/Jakarta')
 
@@ -48,93 +53,73 @@ def get_oldest_site():
         return oldest_profile['name_site']
     return None
 
-def get_next_record(action_type, userid, site=None):
-    """Get next unprocessed record"""
-    query = {}
-    if action_type == "update_posts":
-        query["status"] = "0"
-        query["completed"] = {"$ne": True}
-    else:  # update_profiles
-        query["status"] = "1"
-    
-    if site:
-        query["name_site"] = site
-    
-    # Atomic update to mark as processing
-    record = collection.find_one_and_update(
-        query,
-        {
-            "$set": {
-                "status": "3",  # Temporary status during processing
-                "running_user_id": userid
-            }
-        },
-        sort=[("created_date", 1)],
-        return_document=True
-    )
-    
-    return record
+def process_record(queue, record, action_type, userid, driver_pool):
+    """Process a single leased record with a browser borrowed from the pool"""
+    name_site = record['name_site']
+    urlpost = record['url']
+    idpost = record['_id']
 
-def process_record(record, action_type, userid):
-    """Process a single record"""
     try:
-        name_site = record['name_site']
-        urlpost = record['url']
-        idpost = record['_id']
-        
         name_param = f"{name_site}_profile" if action_type == "update_profiles" else name_site
-        print(f"Processing {action_type} for {name_site}, ID: {idpost}")
-
-        result = subprocess.run(
-            ["python", "run3.py", 
-             "--sites", urlpost,
-             '--name', name_param,
-             '--idpost', str(idpost),
-             '--userid', userid],
-            text=True,
-            env=os.environ.copy()
-        )
-        
-        if result.returncode == 0:
-            print(f"Successfully processed {idpost} for site: {name_site}")
-            new_status = "2" if action_type == "update_profiles" else "1"
-            collection.update_one({"_id": idpost}, {"$set": {"status": new_status}})
-            return True
-        else:
-            print(f"Error processing {idpost} for site: {name_site}")
-            new_status = "1" if action_type == "update_profiles" else "0"
-            collection.update_one({"_id": idpost}, {"$set": {"status": new_status}})
-            return False
-            
+        print(f"Processing {action_type} for {name_site}, ID: {idpost} (attempt {record.get('attempts', 1)})")
+
+        result_count = run3.crawl_site(name_param, urlpost, str(idpost), driver_pool=driver_pool)
+
+        print(f"Successfully processed {idpost} for site: {name_site}")
+        # The summary goes in the same update that marks the record done
+        queue.complete(record, run3.summary_fields(name_param, result_count, userid))
+        return True
+
     except Exception as e:
         print(f"Error processing record {idpost}: {str(e)}")
-        new_status = "1" if action_type == "update_profiles" else "0"
-        collection.update_one({"_id": idpost}, {"$set": {"status": new_status}})
+        queue.fail(record, e)
         return False
 
-def process_continuously(action_type, userid, site=None):
-    """Process records continuously until none remain"""
-    total_processed = 0
+def consume(queue, action_type, userid, site, driver_pool, counts):
+    """Claim and process records until the queue stays empty"""
     consecutive_empty = 0
-    
+
     while True:
-        record = get_next_record(action_type, userid, site)
-        
+        record = queue.claim(userid, site)
+
         if not record:
             consecutive_empty += 1
             if consecutive_empty >= 3:  # Check 3 times before giving up
                 break
             time.sleep(1)  # Wait a bit before checking again
             continue
-            
+
         consecutive_empty = 0
-        success = process_record(record, action_type, userid)
-        if success:
-            total_processed += 1
-        
-        # Optional: Add a small delay to prevent overwhelming the system
-        time.sleep(0.1)
-    
+        if process_record(queue, record, action_type, userid, driver_pool):
+            counts["processed"] += 1
+
+def process_continuously(action_type, userid, site=None, concurrency=1):
+    """Process records with `concurrency` consumers until none remain"""
+    queue = CrawlQueue(collection, action_type)
+    # Browsers stay warm across records instead of being started per record
+    driver_pool = DriverPool(max_size=max(concurrency, DRIVER_POOL_SIZE))
+    # One counter per consumer so threads never share a counter
+    counts = [Counter() for _ in range(concurrency)]
+
+    queue.start()
+    try:
+        consumers = [
+            threading.Thread(
+                target=consume,
+                args=(queue, action_type, userid, site, driver_pool, counts[index]),
+                name=f"consumer-{index}",
+            )
+            for index in range(concurrency)
+        ]
+        for consumer in consumers:
+            consumer.start()
+        for consumer in consumers:
+            consumer.join()
+    finally:
+        queue.stop()
+        driver_pool.close()
+
+    total_processed = sum(count["processed"] for count in counts)
     print(f"\nFinished processing. Total records successfully processed: {total_processed}")
     return total_processed
 
@@ -164,6 +149,8 @@ def main():
                         help="Action to perform")
     parser.add_argument('--userid', required=True, help="User ID")
     parser.add_argument('--file', help="CSV file path for import_csv action")
+    parser.add_argument('--concurrency', type=int, default=1,
+                        help="Number of records crawled at once on this machine")
 
     args = parser.parse_args()
 
@@ -173,7 +160,7 @@ def main():
             sys.exit(1)
         import_csv(args.file, args.userid)
     elif args.action in ['update_posts', 'update_profiles']:
-        process_continuously(args.action, args.userid, args.sites)
+        process_continuously(args.action, args.userid, args.sites, args.concurrency)
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -1,9 +1,8 @@
 import datetime
 import logging
 import re
-import time
 
-from bs4 import BeautifulSoup
+from src.parsing import parse_html
 from config import (
     BINARY_PATH,
     GECKO_DRIVER_PATH,
@@ -14,9 +13,9 @@ from config import (
     PROFILE_PATH,
 )
 from src.base import BaseCrawler, DarkPost
-from src.mongo import MongoDBClient
+from src.mongo import BulkPostWriter, MongoDBClient
 from src.selenium_config import SeleniumConfig
-from utils import clean_html, fill_date
+from utils import clean_html
 
 logging.basicConfig(
     level=logging.INFO, format="[%(asctime)s] [%(levelname)s] %(message)s"
@@ -25,12 +24,14 @@ logging.basicConfig(
 
 class DarkwebCrawler(BaseCrawler):
     base_url = "http://qyvjopwdgjq52ehsx6paonv2ophy3p4ivfkul4svcaw6qxlzsaboyjid.onion"
+    ready_selector = "div[class*='has-profile']"
 
-    def __init__(self):
-        super().__init__()
+    def __init__(self, driver_pool=None):
+        super().__init__(driver_pool)
         self.mongodb_client = MongoDBClient(
             host=MONGO_HOST, port=MONGO_PORT, username=MONGO_USER, password=MONGO_PASS, database_name="allnewdarkweb"
         )
+        self.post_writer = BulkPostWriter(self.mongodb_client, website=self.base_url)
 
     def init_driver(self):
         driver_config = SeleniumConfig(GECKO_DRIVER_PATH, BINARY_PATH, PROFILE_PATH)
@@ -44,7 +45,7 @@ class DarkwebCrawler(BaseCrawler):
         abyss_body = self.driver.find_element_by_tag_name("body").get_attribute(
             "innerHTML"
         )
-        return BeautifulSoup(abyss_body, "html.parser")
+        return parse_html(abyss_body)
 
     def _get_thread_topic(self, soup):
         return soup.find("h2", {"class": "topic-title"})
@@ -58,18 +59,14 @@ class DarkwebCrawler(BaseCrawler):
     # ------ Utility methods for saving the data ------
 
     def _save_post(self, data):
-        query = {"post_id": data.post_id}
-
-        data_dict = fill_date(data.__dict__, data.post_id, self.mongodb_client)
-
-        self.mongodb_client.upsert_document("darkweb", data_dict, query)
+        self.post_writer.add(data.__dict__)
 
     # ------ Main methods to scrape the content ------
 
-    def _scrape_post(self, post, i):
+    def _scrape_post(self, post, i=None, context=None):
         try:
-            thread_topic = self._get_thread_topic(self._get_body_html())
-            thread_section = self._get_thread_section(self._get_body_html())
+            thread_topic = context.thread_topic
+            thread_section = context.thread_section
 
             poster = post.find("a", {"class": "username"})
             pub_str = (
@@ -88,7 +85,7 @@ class DarkwebCrawler(BaseCrawler):
 
             return DarkPost(
                 website=self.base_url,
-                thread_url=self.driver.current_url,
+                thread_url=context.url,
                 thread_topic=thread_topic.text,
                 thread_section=list(filter(None, thread_section.text.split("\n"))),
                 poster=poster.text,
@@ -107,27 +104,26 @@ class DarkwebCrawler(BaseCrawler):
             return None
 
     def scrape(self, url):
-        self.driver.get(self.base_url)
-        time.sleep(10)
+        self._load_page(self.base_url, wait_for_content=False)
 
-        self.driver.get(url)
-        time.sleep(10)
+        self._load_page(url)
 
-        posts = self._get_posts(self._get_body_html())
+        context = self._get_page_context()
+        posts = self._get_posts(context.soup)
 
         total = 0
         for i, post in enumerate(posts):
-            data = self._scrape_post(post, i)
+            data = self._scrape_post(post, i, context)
             if data:
                 logging.info(f"Saving post: {data.post_id}")
                 self._save_post(data)
 
                 total += 1
+        self.post_writer.flush()
 
         logging.info(f"Total posts scraped: {total}")
 
     def run(self, url):
         logging.info(f"Starting the scraper for {url}")
-        time.sleep(7)
         self.scrape(url)
         logging.info(f"Scraping finished for {url}!")
@@ -1,9 +1,24 @@
+import logging
+import time
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
-from typing import List
+from typing import Any, List
+from urllib.parse import urlparse
 
-from config import BINARY_PATH, GECKO_DRIVER_PATH, PROFILE_PATH
+from config import (
+    BINARY_PATH,
+    FETCH_BACKENDS,
+    GECKO_DRIVER_PATH,
+    PROFILE_PATH,
+    RECORD_CORPUS_DIR,
+)
+from crawl_state import ThreadCrawlState
+from http_fetch import HttpDriver, browser_cookies
+from parsing import parse_html
+from replay import RecordingDriver
 from selenium_config import SeleniumConfig
+from tor_circuits import assign_circuit, circuit_manager
+from wait import page_waiter
 
 
 @dataclass
@@ -38,9 +53,39 @@ class DarkProfile:
     additional: dict
 
 
+class ExtractedPage(list):
+    """
+    Scraped posts of one page, with the fingerprint of the page's post
+    markup. ``unchanged`` pages matched a known fingerprint and were not
+    extracted, so they hold no posts.
+    """
+
+    def __init__(self, posts=(), fingerprint=None, unchanged=False):
+        super().__init__(posts)
+        self.fingerprint = fingerprint
+        self.unchanged = unchanged
+
+
+@dataclass
+class PageContext:
+    soup: Any
+    url: str
+    thread_topic: Any
+    thread_section: Any
+
+
 class BaseCrawler(ABC):
-    def __init__(self):
-        self.driver = self.init_driver()
+    # Whether ``_get_thread_section`` reads the parsed page ("soup") or the
+    # current page URL ("url").
+    thread_section_source = "soup"
+    # CSS selector present once a thread page has rendered its posts. Without
+    # one, page loads wait for the DOM to stop changing.
+    ready_selector = None
+
+    def __init__(self, driver_pool=None):
+        self.driver_pool = driver_pool
+        self.circuit = None
+        self.driver = self._acquire_driver()
 
     @abstractmethod
     def init_driver(self):
@@ -54,3 +99,176 @@ class BaseCrawler(ABC):
     @abstractmethod
     def run(self):
         pass
+
+    @property
+    def site_name(self):
+        return type(self).__module__.rsplit(".", 1)[-1]
+
+    @property
+    def fetch_backend(self):
+        return FETCH_BACKENDS.get(self.site_name, "selenium")
+
+    def _acquire_browser(self):
+        # Borrow a warm browser when a pool is shared with us; quitting it
+        # hands it back to the pool. Otherwise start a private one.
+        if self.driver_pool is not None:
+            return self.driver_pool.acquire(self.site_name, self.init_driver)
+        return self.init_driver()
+
+    def _acquire_circuit_browser(self):
+        # A new browser is started on the assigned circuit; a pooled one
+        # stays on the circuit it was started on.
+        circuit = circuit_manager.acquire()
+        with assign_circuit(circuit):
+            driver = self._acquire_browser()
+        self.circuit = getattr(driver, "tor_circuit", None) or circuit
+        if self.circuit is not circuit:
+            circuit_manager.release(circuit)
+            circuit_manager.claim(self.circuit)
+        return driver
+
+    def _acquire_driver(self):
+        # A crawler holds one circuit at a time; give back the one of the
+        # driver this replaces
+        if self.circuit is not None:
+            circuit_manager.release(self.circuit)
+            self.circuit = None
+        if self.fetch_backend in ("http", "http_seeded"):
+            if circuit_manager.enabled:
+                self.circuit = circuit_manager.acquire()
+                driver = HttpDriver(proxy=self.circuit.proxy_url)
+            else:
+                driver = HttpDriver()
+            if self.fetch_backend == "http_seeded":
+                for cookie in browser_cookies(self.site_name, self.base_url, self._acquire_browser):
+                    driver.add_cookie(cookie)
+        elif circuit_manager.enabled:
+            driver = self._acquire_circuit_browser()
+        else:
+            driver = self._acquire_browser()
+        if RECORD_CORPUS_DIR:
+            driver = RecordingDriver(driver, RECORD_CORPUS_DIR, self.site_name)
+        return driver
+
+    def release_driver(self):
+        # Crawlers that keep their browser open until the end of ``scrape``
+        # must give it back, or a pooled browser would never be reused.
+        # Buffered posts are written too, also when ``scrape`` failed.
+        post_writer = getattr(self, "post_writer", None)
+        if post_writer is not None:
+            try:
+                post_writer.flush()
+            except Exception as e:
+                logging.error(f"Error while flushing posts of {self.site_name}: {e}")
+        if self.driver is not None:
+            self.driver.quit()
+            self.driver = None
+        if self.circuit is not None:
+            circuit_manager.release(self.circuit)
+            self.circuit = None
+
+    def ensure_driver(self):
+        # A crawler reused for another job gets a driver again after
+        # ``release_driver``
+        if self.driver is None:
+            self.driver = self._acquire_driver()
+
+    def _recycle_driver(self, more_pages=True):
+        # Some crawlers restart their browser between pages. An HTTP driver
+        # keeps its session, and so its keep-alive connections, until the
+        # last page.
+        if more_pages and self.fetch_backend in ("http", "http_seeded"):
+            return
+        self.release_driver()
+        if more_pages:
+            logging.info("Reinitializing the driver for the next page")
+            self.driver = self._acquire_driver()
+
+    def _record_circuit(self, started, ok):
+        if self.circuit is not None:
+            circuit_manager.record(self.circuit, time.monotonic() - started, ok)
+
+    def _load_page(self, url, wait_for_content=True):
+        # Navigate politely and return as soon as the page is usable instead
+        # of sleeping for a fixed time.
+        page_waiter.throttle(self.site_name, urlparse(url).netloc)
+        started = time.monotonic()
+        try:
+            self.driver.get(url)
+        except Exception:
+            self._record_circuit(started, ok=False)
+            raise
+
+        selector = self.ready_selector if wait_for_content else None
+        elapsed = page_waiter.wait_until_ready(self.driver, self.site_name, selector)
+        self._record_circuit(started, ok=True)
+        logging.info(f"Loaded {url} in {elapsed:.1f}s")
+        return elapsed
+
+    def _get_page_context(self, soup=None):
+        # Capture everything the posts of one page share so that
+        # ``_scrape_post`` never has to touch the driver or re-parse the page.
+        if soup is None:
+            soup = self._get_body_html()
+        return self._build_page_context(soup, self.driver.current_url)
+
+    def _build_page_context(self, soup, url):
+        section_source = url if self.thread_section_source == "url" else soup
+
+        return PageContext(
+            soup=soup,
+            url=url,
+            thread_topic=self._extract_page_field(self._get_thread_topic, soup),
+            thread_section=self._extract_page_field(
+                self._get_thread_section, section_source
+            ),
+        )
+
+    def _current_body(self):
+        # (url, body innerHTML) of the page the driver is on
+        body = self.driver.find_element_by_tag_name("body").get_attribute("innerHTML")
+        return self.driver.current_url, body
+
+    def _fetch_body(self, url):
+        # HTTP drivers fetch without touching shared driver state, so several
+        # pages can be in flight; a browser has to load them one at a time.
+        if hasattr(self.driver, "fetch_body"):
+            page_waiter.throttle(self.site_name, urlparse(url).netloc)
+            started = time.monotonic()
+            try:
+                body = self.driver.fetch_body(url)
+            except Exception:
+                self._record_circuit(started, ok=False)
+                raise
+            self._record_circuit(started, ok=True)
+            return body
+        self._load_page(url)
+        return self._current_body()
+
+    def _extract_page(self, url, body_html, known_fingerprint=None):
+        # Pure extraction of one fetched page, safe to run in a worker thread
+        soup = parse_html(body_html)
+        posts = self._get_posts(soup)
+        fingerprint = ThreadCrawlState.page_fingerprint(posts)
+        if known_fingerprint is not None and fingerprint == known_fingerprint:
+            return ExtractedPage(fingerprint=fingerprint, unchanged=True)
+
+        if hasattr(self, "_get_thread_topic") and hasattr(self, "_get_thread_section"):
+            context = self._build_page_context(soup, url)
+        else:
+            context = None
+
+        # Every crawler's ``_scrape_post(post, i=None, context=None)`` takes
+        # the post's position and the page context, used or not
+        results = [self._scrape_post(post, i, context) for i, post in enumerate(posts)]
+        return ExtractedPage([data for data in results if data], fingerprint)
+
+    @staticmethod
+    def _extract_page_field(extractor, source):
+        # Let ``_scrape_post`` decide what to do with a page that has no topic
+        # or section instead of failing the whole page here.
+        try:
+            return extractor(source)
+        except Exception as e:
+            logging.error(f"Error while extracting {extractor.__name__}: {e}")
+            return None
@@ -0,0 +1,200 @@
+import gzip
+import hashlib
+import importlib.util
+import logging
+import os
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+
+from config import BLOB_COMPRESSION, BLOB_DATABASE, BLOB_STORE, BLOB_STORE_DIR
+
+_zstd = None
+if importlib.util.find_spec("zstandard") is not None:
+    import zstandard as _zstd
+
+GRIDFS_BUCKET = "raw_content"
+
+
+def zstd_available():
+    return _zstd is not None
+
+
+def resolve_codec(name=BLOB_COMPRESSION):
+    """Return the codec to compress with ("auto" picks zstd when installed)."""
+    if name == "auto":
+        return "zstd" if zstd_available() else "gzip"
+    if name == "zstd" and not zstd_available():
+        logging.warning("zstandard is not installed, compressing blobs with gzip")
+        return "gzip"
+    return name
+
+
+def compress(data, codec):
+    if codec == "zstd":
+        return _zstd.ZstdCompressor(level=10).compress(data)
+    return gzip.compress(data, compresslevel=6)
+
+
+def decompress(data, codec):
+    if codec == "zstd":
+        if _zstd is None:
+            raise RuntimeError("zstandard is needed to read zstd blobs")
+        return _zstd.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+class BlobStore(ABC):
+    """
+    Compressed, content-addressed storage for large text fields.
+
+    A blob is addressed by the sha256 of its uncompressed bytes, so the same
+    markup is stored once however many documents refer to it. ``put_many``
+    returns the references kept in the documents instead of the text:
+    ``{"store", "sha256", "codec", "size"}``; the codec travels with the
+    reference so blobs written with gzip stay readable after switching to
+    zstd. Subclasses implement ``_existing``, ``_write`` and ``_read``.
+    """
+
+    name = None
+
+    def __init__(self, codec=None):
+        self.codec = resolve_codec(codec or BLOB_COMPRESSION)
+
+    def put_many(self, values):
+        blobs = {}
+        refs = []
+        for value in values:
+            data = value.encode("utf-8")
+            digest = hashlib.sha256(data).hexdigest()
+            blobs[digest] = data
+            refs.append(
+                {
+                    "store": self.name,
+                    "sha256": digest,
+                    "codec": self.codec,
+                    "size": len(data),
+                }
+            )
+
+        missing = set(blobs) - self._existing(list(blobs))
+        for digest in missing:
+            self._write(digest, compress(blobs[digest], self.codec))
+        if missing:
+            stored = len(blobs) - len(missing)
+            logging.info(f"Stored {len(missing)} new blobs ({stored} already stored)")
+        return refs
+
+    def put(self, value):
+        return self.put_many([value])[0]
+
+    def get(self, ref):
+        return decompress(self._read(ref), ref["codec"]).decode("utf-8")
+
+    @abstractmethod
+    def _existing(self, digests):
+        pass
+
+    @abstractmethod
+    def _write(self, digest, data):
+        pass
+
+    @abstractmethod
+    def _read(self, ref):
+        pass
+
+
+class LocalBlobStore(BlobStore):
+    """Blobs as files under ``root``, fanned out by the first bytes of the hash."""
+
+    name = "local"
+
+    def __init__(self, root=BLOB_STORE_DIR, codec=None):
+        super().__init__(codec)
+        self.root = root
+
+    def _path(self, digest, codec):
+        return os.path.join(self.root, digest[:2], digest[2:4], f"{digest}.{codec}")
+
+    def _existing(self, digests):
+        return {
+            digest
+            for digest in digests
+            if os.path.exists(self._path(digest, self.codec))
+        }
+
+    def _write(self, digest, data):
+        path = self._path(digest, self.codec)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename, so a reader never sees half a blob
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
+    def _read(self, ref):
+        with open(self._path(ref["sha256"], ref["codec"]), "rb") as f:
+            return f.read()
+
+
+class GridFSBlobStore(BlobStore):
+    """
+    Blobs in a GridFS bucket of ``BLOB_DATABASE``, readable by the API.
+
+    The file name is the sha256. Two writers racing on the same new blob may
+    both store it; reads take whichever copy they find, so the duplicate is
+    harmless.
+    """
+
+    name = "gridfs"
+
+    def __init__(self, database, bucket_name=GRIDFS_BUCKET, codec=None):
+        import gridfs
+
+        super().__init__(codec)
+        self.files = database[f"{bucket_name}.files"]
+        self.bucket = gridfs.GridFSBucket(database, bucket_name=bucket_name)
+        self.files.create_index("filename")
+
+    def _existing(self, digests):
+        return {
+            row["filename"]
+            for row in self.files.find({"filename": {"$in": digests}}, {"filename": 1})
+        }
+
+    def _write(self, digest, data):
+        self.bucket.upload_from_stream(digest, data, metadata={"codec": self.codec})
+
+    def _read(self, ref):
+        return self.bucket.open_download_stream_by_name(ref["sha256"]).read()
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_blob_store(mongodb_client, store=BLOB_STORE):
+    """Return the process-wide store of kind ``store``, None when blobs are disabled."""
+    if not store:
+        return None
+    with _stores_lock:
+        if store not in _stores:
+            if store == "local":
+                _stores[store] = LocalBlobStore()
+            elif store == "gridfs":
+                _stores[store] = GridFSBlobStore(mongodb_client.client[BLOB_DATABASE])
+            else:
+                raise ValueError(f"Unknown blob store {store}")
+        return _stores[store]
+
+
+def load_raw_content(mongodb_client, document):
+    """``raw_content`` of a post, fetched from the blob store when it was offloaded."""
+    if document is None:
+        return None
+    if document.get("raw_content") is not None:
+        return document["raw_content"]
+    ref = document.get("raw_content_ref")
+    if not ref:
+        return None
+    return get_blob_store(mongodb_client, ref["store"]).get(ref)
@@ -8,7 +8,7 @@ import time
 from pymongo import MongoClient
 from bson.objectid import ObjectId
 
-from bs4 import BeautifulSoup
+from src.parsing import parse_html
 from config import (
     BINARY_PATH,
     GECKO_DRIVER_PATH,
@@ -19,9 +19,12 @@ from config import (
     PROFILE_PATH,
 )
 from src.base import BaseCrawler, DarkPost
-from src.mongo import MongoDBClient
+from src.checkpoint import JobCheckpoint
+from src.crawl_state import ThreadCrawlState
+from src.mongo import BulkPostWriter, MongoDBClient
+from src.page_pipeline import PagePipeline
 from src.selenium_config import SeleniumConfig
-from utils import clean_html, fill_date
+from utils import clean_html
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
@@ -32,13 +35,15 @@ logging.basicConfig(
 
 class DarkwebCrawler(BaseCrawler):
     base_url = "http://breached26tezcofqla4adzyn22notfqwcac7gpbrleg4usehljwkgqd.onion"
+    ready_selector = "div.post"
 
-    def __init__(self):
-        super().__init__()
+    def __init__(self, driver_pool=None):
+        super().__init__(driver_pool)
         self.mongodb_client = MongoDBClient(
             host=MONGO_HOST, port=MONGO_PORT, username=MONGO_USER, password=MONGO_PASS, database_name="allnewdarkweb"
         )
-        self.processed_posts = set() 
+        self.post_writer = BulkPostWriter(self.mongodb_client, website=self.base_url)
+        self.crawl_state = ThreadCrawlState(self.mongodb_client)
 
     def init_driver(self):
         driver_config = SeleniumConfig(GECKO_DRIVER_PATH, BINARY_PATH, PROFILE_PATH)
@@ -53,7 +58,7 @@ class DarkwebCrawler(BaseCrawler):
         bbad_body = self.driver.find_element_by_tag_name("body").get_attribute(
             "innerHTML"
         )
-        return BeautifulSoup(bbad_body, "html.parser")
+        return parse_html(bbad_body)
 
     def _get_thread_topic(self, soup):
         return soup.find("span", {"class": "thread-info__name rounded"})
@@ -98,16 +103,11 @@ class DarkwebCrawler(BaseCrawler):
         return soup.find('a', class_='b-post__count js-show-post-link')
 
     def _save_post(self, data):
-        query = {"post_id": data.post_id}
-
-        data_dict = fill_date(data.__dict__, data.post_id, self.mongodb_client)
-        # logging.error(f"data_dict: {data_dict}")
-
-        self.mongodb_client.upsert_document('darkweb', data_dict, query)
+        self.post_writer.add(data.__dict__)
 
     # ------ Main methods to scrape the content ------
 
-    def _scrape_post(self, post):
+    def _scrape_post(self, post, i=None, context=None):
         try:
             # Extract poster information
             poster_div = post.find("div", {"class": "post__user-profile largetext"})
@@ -122,7 +122,7 @@ class DarkwebCrawler(BaseCrawler):
             if not post_id:
                 # Fallback if no ID found - use same logic as Suprbay
                 number = int(data.strip('#'))
-                post_id = f"{self.driver.current_url}_{number}"
+                post_id = f"{context.url}_{number}"
             
             # Determine if post is OP using same logic as Suprbay
             number = int(data.strip('#').replace(',', ''))
@@ -144,13 +144,13 @@ class DarkwebCrawler(BaseCrawler):
             # Get the BeautifulSoup element first, then extract text and images
             post_content = post_body_div.text if post_body_div else ""
             post_media = [x["src"] for x in post_body_div.find_all("img")] if post_body_div else []
-            
-            thread_topic = self._get_thread_topic(self._get_body_html())
-            thread_section = self._get_thread_section(self._get_body_html())
+
+            thread_topic = context.thread_topic
+            thread_section = context.thread_section
 
             return DarkPost(
                 website=self.base_url,
-                thread_url=self.driver.current_url,
+                thread_url=context.url,
                 thread_topic=thread_topic.text if thread_topic else "",
                 thread_section=list(filter(None, thread_section.text.split("\n"))) if thread_section else [],
                 poster=poster,
@@ -166,7 +166,16 @@ class DarkwebCrawler(BaseCrawler):
             logging.error(f"Error while scraping post: {e}")
             return None
 
+    def _page_url(self, url, page):
+        return url + f"?page={page}"
+
     def scrape(self, url, idpost):
+        # Pick up where the last crawl of this thread stopped
+        state = self.crawl_state.load(url)
+        checkpoint = JobCheckpoint(self.mongodb_client, idpost, url)
+        start_page = checkpoint.resume_page(self.crawl_state.start_page(state))
+        logging.info(f"Resuming from page {start_page}")
+
         self.driver.get(self.base_url)
 
         window_opened = False
@@ -195,7 +204,7 @@ class DarkwebCrawler(BaseCrawler):
 
                 except Exception as e:
                     print("No captcha")
-                    self.driver.get(url)
+                    self.driver.get(self._page_url(url, start_page))
                     break
                 time.sleep(1)
                 
@@ -203,44 +212,49 @@ class DarkwebCrawler(BaseCrawler):
             soup = self._get_body_html()
             last_page = self._get_last_page_number(soup)
             logging.info(f"Total pages: {last_page}")
+            loaded_page, start_page = start_page, min(start_page, int(last_page))
 
-            total = 0
-            retry_count = 3
+            # Posts saved by earlier attempts of this job count too
+            total = checkpoint.posts_saved
 
-            for page in range(int(last_page)):
-                page_url = url + f"?page={page+1}"
-                
-                for attempt in range(retry_count):
-                    try:
-                        logging.info(f"Navigating to page {page+1}, attempt {attempt+1}")
-                        self.driver.get(page_url)
-                        time.sleep(15)
-                        
-                        soup = self._get_body_html()
-                        posts = self._get_posts(soup)
-                        
-                        if not posts:
-                            logging.warning(f"No posts found on page {page+1}, attempt {attempt+1}")
-                            continue
-                            
-                        logging.info(f"Found {len(posts)} posts on page {page+1}")
-                        
-                        for post in posts:
-                            data = self._scrape_post(post)
-                            if data:
-                                logging.info(f"Saving post: {data.post_id}")
-                                self._save_post(data)
-                                logging.info(f"data: {data}")
-
-                                total += 1
-                                logging.info(f"Total posts: {total}")
-                        
-                        break  # If successful, break retry loop
-                        
-                    except Exception as e:
-                        logging.error(f"Error on page {page+1}, attempt {attempt+1}: {e}")
-                        if attempt == retry_count - 1:
-                            logging.error(f"Failed to scrape page {page+1} after {retry_count} attempts")
+            def save_page(page, scraped):
+                nonlocal total
+                if scraped is None:
+                    return
+                if scraped.unchanged:
+                    logging.info(f"Page {page} markup unchanged since the last crawl, skipped extraction")
+                    checkpoint.save(page, self._page_url(url, page), total)
+                    return
+
+                logging.info(f"Found {len(scraped)} posts on page {page}")
+                page_hash = self.crawl_state.page_hash(scraped)
+                if self.crawl_state.is_unchanged(state, page, page_hash):
+                    logging.info(f"Page {page} unchanged since the last crawl")
+                else:
+                    for data in scraped:
+                        logging.info(f"Saving post: {data.post_id}")
+                        self._save_post(data)
+                        logging.info(f"data: {data}")
+
+                        total += 1
+                        logging.info(f"Total posts: {total}")
+                    self.post_writer.flush()
+                # Also stores a new fingerprint of a page whose posts did not change
+                self.crawl_state.record_page(
+                    state, self.site_name, url, page, page_hash,
+                    scraped[-1].post_id, scraped.fingerprint,
+                )
+                checkpoint.save(page, self._page_url(url, page), total, scraped[-1].post_id)
+
+            # Page N+1 loads while page N is parsed and saved. The first page
+            # was already loaded to read the pagination.
+            pages = ((page, self._page_url(url, page)) for page in range(start_page, int(last_page) + 1))
+            preloaded = {self._page_url(url, loaded_page): self._current_body()}
+            fingerprints = {
+                page: self.crawl_state.known_fingerprint(state, page)
+                for page in range(start_page, int(last_page) + 1)
+            }
+            PagePipeline(self).run(pages, save_page, preloaded, fingerprints)
 
             logging.info(f"Total posts scraped: {total}")
             return total
@@ -248,14 +262,11 @@ class DarkwebCrawler(BaseCrawler):
         finally:
             # Cleanup: close the driver
             logging.info("Closing browser")
-            if self.driver:
-                self.driver.quit()
-                self.driver = None
+            self.release_driver()
                 
     def run(self, url, idpost):
         print("Post")
         logging.info(f"Starting the scraper for {url}")
-        time.sleep(5)
         total = self.scrape(url, idpost)
         logging.info(f"Scraping finished for {url}!")
         return total
\ No newline at end of file
@@ -4,7 +4,7 @@ import time
 import traceback
 import csv
 
-from bs4 import BeautifulSoup
+from src.parsing import parse_html
 from config import (
     BINARY_PATH,
     GECKO_DRIVER_PATH,
@@ -30,8 +30,8 @@ logging.basicConfig(
 class DarkwebCrawler(BaseCrawler):
     base_url = "http://breached26tezcofqla4adzyn22notfqwcac7gpbrleg4usehljwkgqd.onion"
 
-    def __init__(self):
-        super().__init__()
+    def __init__(self, driver_pool=None):
+        super().__init__(driver_pool)
         self.mongodb_client = MongoDBClient(
             host=MONGO_HOST, port=MONGO_PORT, username=MONGO_USER, password=MONGO_PASS, database_name="allnewdarkweb"
         )
@@ -114,7 +114,7 @@ class DarkwebCrawler(BaseCrawler):
         Get the innerHTML of the body and parse with BeautifulSoup
         """
         bbad_body = self.driver.find_element(By.TAG_NAME, "body").get_attribute("innerHTML")
-        return BeautifulSoup(bbad_body, "html.parser")
+        return parse_html(bbad_body)
 
     def scrape(self, url):
         """
@@ -137,8 +137,7 @@ class DarkwebCrawler(BaseCrawler):
                     for current_page in range(1, total_pages + 1):
                         if current_page > 1:
                             page_url = f"{url}/page{current_page}"
-                            self.driver.get(page_url)
-                            time.sleep(5)
+                            self._load_page(page_url)
                             soup = self._get_body_html()
 
                         inline_rows = soup.find_all('tr', class_='inline_row')
@@ -183,7 +182,6 @@ class DarkwebCrawler(BaseCrawler):
                                                     logging.info(f"Link {total_links}: {full_link}, Post: {td_post_text}, Page: {current_page}")
                         
                         logging.info(f"Found {total_links} unique links through page {current_page}")
-                        time.sleep(2)
 
                     logging.info(f"Total unique links found: {total_links}")
                     return total_links
@@ -204,7 +202,7 @@ class DarkwebCrawler(BaseCrawler):
         try:
             # Initialize the driver if not already done
             if not self.driver:
-                self.init_driver()
+                self.driver = self._acquire_driver()
 
             total = self.scrape(url)
             logging.info(f"Crawler completed for {url}!")
@@ -8,7 +8,7 @@ import traceback
 from pymongo import MongoClient
 from bson.objectid import ObjectId
 
-from bs4 import BeautifulSoup
+from src.parsing import parse_html
 from config import (
     BINARY_PATH,
     GECKO_DRIVER_PATH,
@@ -33,8 +33,8 @@ logging.basicConfig(
 class DarkwebCrawler(BaseCrawler):
     base_url = "http://breached26tezcofqla4adzyn22notfqwcac7gpbrleg4usehljwkgqd.onion"
 
-    def __init__(self):
-        super().__init__()
+    def __init__(self, driver_pool=None):
+        super().__init__(driver_pool)
         self.mongodb_client = MongoDBClient(
             host=MONGO_HOST, port=MONGO_PORT, username=MONGO_USER, password=MONGO_PASS, database_name="allnewdarkweb"
         )
@@ -53,7 +53,7 @@ class DarkwebCrawler(BaseCrawler):
         bbad_body = self.driver.find_element_by_tag_name("body").get_attribute(
             "innerHTML"
         )
-        return BeautifulSoup(bbad_body, "html.parser")
+        return parse_html(bbad_body)
 
     def _get_member_username(self, soup):
         username_find = soup.find("div", class_="post__user-profile largetext")
@@ -181,7 +181,7 @@ class DarkwebCrawler(BaseCrawler):
     #     for doc in distinct_docs:
     #         raw_content = self.mongodb_client.find_one(
     #             'darkweb', {'poster': doc}, {'raw_content': 1, '_id': 0})
-    #         raw_content_bs = BeautifulSoup(raw_content['raw_content'], "html.parser")
+    #         raw_content_bs = parse_html(raw_content['raw_content'])
     #         profile_url = raw_content_bs.find("div", class_="post__user-profile largetext")
     #         profile_urls.append(profile_url.find("a")["href"])
 
@@ -189,7 +189,7 @@ class DarkwebCrawler(BaseCrawler):
 
     # ------ Main methods to scrape the content ------
 
-    def _scrape_post(self, post):
+    def _scrape_post(self, post, i=None, context=None):
         try:    
             username = self._get_member_username(post)
             user_title, date_joined, additional = self._get_member_detail(post)
@@ -268,8 +268,7 @@ class DarkwebCrawler(BaseCrawler):
                 page_url = url + f"?page={page+1}"
                 logging.info(f"Navigating to page: {page_url}")
 
-                self.driver.get(page_url)
-                time.sleep(15)
+                self._load_page(page_url)
                 
                 # Check for captcha/thank you page on each pagination
                 try:
@@ -305,6 +304,5 @@ class DarkwebCrawler(BaseCrawler):
     def run(self, url, idpost):
         print("Profile")
         logging.info(f"Starting the scraper for {url}")
-        time.sleep(5)
         total = self.scrape(url, idpost)
         return total
\ No newline at end of file
@@ -1,9 +1,8 @@
 import datetime
 import logging
 import re
-import time
 
-from bs4 import BeautifulSoup
+from src.parsing import parse_html
 from config import (
     BINARY_PATH,
     GECKO_DRIVER_PATH,
@@ -14,9 +13,9 @@ from config import (
     PROFILE_PATH,
 )
 from src.base import BaseCrawler, DarkPost
-from src.mongo import MongoDBClient
+from src.mongo import BulkPostWriter, MongoDBClient
 from src.selenium_config import SeleniumConfig
-from utils import clean_html, fill_date
+from utils import clean_html
 
 logging.basicConfig(
     level=logging.INFO, format="[%(asctime)s] [%(levelname)s] %(message)s"
@@ -25,12 +24,14 @@ logging.basicConfig(
 
 class DarkwebCrawler(BaseCrawler):
     base_url = "http://bbzzzsvqcrqtki6umym6itiixfhni37ybtt7mkbjyxn2pgllzxf2qgyd.onion"
+    ready_selector = "div.js-replyNewMessageContainer article"
 
-    def __init__(self):
-        super().__init__()
+    def __init__(self, driver_pool=None):
+        super().__init__(driver_pool)
         self.mongodb_client = MongoDBClient(
             host=MONGO_HOST, port=MONGO_PORT, username=MONGO_USER, password=MONGO_PASS, database_name="allnewdarkweb"
         )
+        self.post_writer = BulkPostWriter(self.mongodb_client, website=self.base_url)
 
     def init_driver(self):
         driver_config = SeleniumConfig(GECKO_DRIVER_PATH, BINARY_PATH, PROFILE_PATH)
@@ -44,7 +45,7 @@ class DarkwebCrawler(BaseCrawler):
         bbad_body = self.driver.find_element_by_tag_name("body").get_attribute(
             "innerHTML"
         )
-        return BeautifulSoup(bbad_body, "html.parser")
+        return parse_html(bbad_body)
 
     def _get_thread_topic(self, soup):
         return soup.find("h1", {"class": "p-title-value"})
@@ -66,15 +67,11 @@ class DarkwebCrawler(BaseCrawler):
     # ------ Utility methods for saving the data ------
 
     def _save_post(self, data):
-        query = {"post_id": data.post_id}
-
-        data_dict = fill_date(data.__dict__, data.post_id, self.mongodb_client)
-
-        self.mongodb_client.upsert_document('darkweb', data_dict, query)
+        self.post_writer.add(data.__dict__)
 
     # ------ Main methods to scrape the content ------
 
-    def _scrape_post(self, post):
+    def _scrape_post(self, post, i=None, context=None):
         try:
             poster = post.get("data-author")
 
@@ -97,12 +94,12 @@ class DarkwebCrawler(BaseCrawler):
             except:
                 published_at = datetime.datetime.now()
 
-            thread_topic = self._get_thread_topic(self._get_body_html())
-            thread_section = self._get_thread_section(self._get_body_html())
+            thread_topic = context.thread_topic
+            thread_section = context.thread_section
 
             return DarkPost(
                 website=self.base_url,
-                thread_url=self.driver.current_url,
+                thread_url=context.url,
                 thread_topic=thread_topic.text,
                 thread_section=list(filter(None, thread_section.text.split("\n"))),
                 poster=poster,
@@ -119,10 +116,8 @@ class DarkwebCrawler(BaseCrawler):
             return None
 
     def scrape(self, url):
-        self.driver.get(self.base_url)
-        time.sleep(10)
-        self.driver.get(url)
-        time.sleep(15)
+        self._load_page(self.base_url, wait_for_content=False)
+        self._load_page(url)
 
         soup = self._get_body_html()
         last_page = self._get_last_page_number(soup)
@@ -132,22 +127,22 @@ class DarkwebCrawler(BaseCrawler):
             page_url = url + f"/page-{page + 1}"
             logging.info(f"Navigating to page: {page_url}")
 
-            self.driver.get(page_url)
-            time.sleep(15)
+            self._load_page(page_url)
 
-            posts = self._get_posts(self._get_body_html())
+            context = self._get_page_context()
+            posts = self._get_posts(context.soup)
             for post in posts:
-                data = self._scrape_post(post)
+                data = self._scrape_post(post, context=context)
                 if data:
                     logging.info(f"Saving post: {data.post_id}")
                     self._save_post(data)
                     total += 1
                     logging.info(f"Total posts: {total}")
+            self.post_writer.flush()
 
         logging.info(f"Total posts scraped: {total}")
 
     def run(self, url):
         logging.info(f"Starting the scraper for {url}")
-        time.sleep(5)
         self.scrape(url)
         logging.info(f"Scraping finished for {url}!")
@@ -1,9 +1,8 @@
 import logging
 import re
-import time
 import traceback
 
-from bs4 import BeautifulSoup
+from src.parsing import parse_html
 from config import (
     BINARY_PATH,
     GECKO_DRIVER_PATH,
@@ -14,6 +13,7 @@ from config import (
     PROFILE_PATH,
 )
 from src.base import BaseCrawler, DarkProfile
+from src.blob_store import load_raw_content
 from src.mongo import MongoDBClient
 from src.selenium_config import SeleniumConfig
 from utils import fill_date_profile
@@ -26,8 +26,8 @@ logging.basicConfig(
 class DarkwebCrawler(BaseCrawler):
     base_url = "http://bbzzzsvqcrqtki6umym6itiixfhni37ybtt7mkbjyxn2pgllzxf2qgyd.onion"
 
-    def __init__(self):
-        super().__init__()
+    def __init__(self, driver_pool=None):
+        super().__init__(driver_pool)
         self.mongodb_client = MongoDBClient(
             host=MONGO_HOST, port=MONGO_PORT, username=MONGO_USER, password=MONGO_PASS, database_name="allnewdarkweb"
         )
@@ -44,7 +44,7 @@ class DarkwebCrawler(BaseCrawler):
         bbad_body = self.driver.find_element_by_tag_name("body").get_attribute(
             "innerHTML"
         )
-        return BeautifulSoup(bbad_body, "html.parser")
+        return parse_html(bbad_body)
 
     def _get_member_header(self, soup):
         return soup.find("div", {"class": "memberHeader-content"})
@@ -116,8 +116,8 @@ class DarkwebCrawler(BaseCrawler):
         profile_urls = []
         for doc in distinct_docs:
             raw_content = self.mongodb_client.find_one(
-                'darkweb', {'poster': doc}, {'raw_content': 1, '_id': 0})
-            raw_content_bs = BeautifulSoup(raw_content['raw_content'], "html.parser")
+                'darkweb', {'poster': doc}, {'raw_content': 1, 'raw_content_ref': 1, '_id': 0})
+            raw_content_bs = parse_html(load_raw_content(self.mongodb_client, raw_content))
             profile_url = raw_content_bs.find("a", {"class": re.compile(r"avatar")})
             profile_urls.append(profile_url['href'])
 
@@ -125,7 +125,7 @@ class DarkwebCrawler(BaseCrawler):
 
     # ------ Main methods to scrape the content ------
 
-    def _scrape_post(self, post):
+    def _scrape_post(self, post, i=None, context=None):
         try:
             username = self._get_member_username(post)
             user_title, date_joined, last_seen = self._get_member_detail(post)
@@ -153,8 +153,7 @@ class DarkwebCrawler(BaseCrawler):
             return None
 
     def scrape(self, url):
-        self.driver.get(self.base_url)
-        time.sleep(10)
+        self._load_page(self.base_url, wait_for_content=False)
 
         usernames = self._get_distinct_usernames({"thread_url": url})
         logging.info(f"{len(usernames)} profiles will be scraped from {url} thread")
@@ -162,8 +161,7 @@ class DarkwebCrawler(BaseCrawler):
         for user in usernames:
             user_url = self.base_url + user
             logging.info(f"Scraping profile for {user}")
-            self.driver.get(user_url)
-            time.sleep(15)
+            self._load_page(user_url)
             soup = self._get_body_html()
             data = self._scrape_post(soup)
             if data:
@@ -172,6 +170,5 @@ class DarkwebCrawler(BaseCrawler):
 
     def run(self, url):
         logging.info(f"Starting the scraper for {url}")
-        time.sleep(5)
         self.scrape(url)
         logging.info(f"Scraping finished for {url}!")
@@ -0,0 +1,71 @@
+import datetime
+import logging
+
+from bson.objectid import ObjectId
+
+
+class JobCheckpoint:
+    """
+    Progress of one crawl job, stored on its record in ``crawling``.
+
+    Thread crawlers save the checkpoint (page, page URL, posts saved so far
+    and the last post_id as cursor) after each page is flushed. When the job
+    is retried after a crash or a failed attempt, the crawl resumes from the
+    checkpointed page and keeps counting from the posts already saved. The
+    queue clears the checkpoint once the job completes. Crawls without a job
+    record (``run.py``) get an inactive checkpoint.
+    """
+
+    def __init__(self, mongodb_client, idpost, url):
+        self.collection = mongodb_client.database["crawling"]
+        self.job_id = (
+            ObjectId(idpost) if idpost and ObjectId.is_valid(str(idpost)) else None
+        )
+        self.url = url
+        self.data = self._load()
+        if self.data:
+            logging.info(
+                f"Resuming job {idpost} from page {self.page} "
+                f"({self.posts_saved} posts already saved)"
+            )
+
+    def _load(self):
+        if self.job_id is None:
+            return {}
+        try:
+            record = self.collection.find_one({"_id": self.job_id}, {"checkpoint": 1})
+        except Exception as e:
+            logging.error(f"Could not load checkpoint for job {self.job_id}: {e}")
+            return {}
+        checkpoint = (record or {}).get("checkpoint") or {}
+        # A checkpoint only applies to the URL it was taken for
+        return checkpoint if checkpoint.get("url") == self.url else {}
+
+    @property
+    def page(self):
+        return self.data.get("page", 0)
+
+    @property
+    def posts_saved(self):
+        return self.data.get("posts_saved", 0)
+
+    def resume_page(self, start_page):
+        return max(start_page, self.page)
+
+    def save(self, page, page_url, posts_saved, cursor=None):
+        if self.job_id is None:
+            return
+        self.data = {
+            "url": self.url,
+            "page": page,
+            "page_url": page_url,
+            "posts_saved": posts_saved,
+            "cursor": cursor or self.data.get("cursor"),
+            "updated_at": datetime.datetime.now(),
+        }
+        try:
+            self.collection.update_one(
+                {"_id": self.job_id}, {"$set": {"checkpoint": self.data}}
+            )
+        except Exception as e:
+            logging.error(f"Could not save checkpoint for job {self.job_id}: {e}")
@@ -0,0 +1,92 @@
+import datetime
+import hashlib
+import logging
+import re
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+class ThreadCrawlState:
+    """
+    Remembers how far each thread has been crawled.
+
+    One document per ``thread_url`` in the ``crawl_state`` collection holds
+    the last page seen, the last post_id saved and, for every crawled page,
+    a fingerprint of its post markup and a hash of its scraped posts. A
+    recrawl starts from the last known page instead of page 1. A page whose
+    fingerprint has not changed is not even extracted, and one whose posts
+    hash has not changed is not saved again, so an unchanged thread costs a
+    single page load.
+    """
+
+    def __init__(self, mongodb_client, collection_name="crawl_state"):
+        self.collection = mongodb_client.database[collection_name]
+        self.collection.create_index("thread_url", unique=True)
+
+    def load(self, thread_url):
+        try:
+            return self.collection.find_one({"thread_url": thread_url}) or {}
+        except Exception as e:
+            # Without state the thread is simply crawled from the start
+            logging.error(f"Could not load crawl state for {thread_url}: {e}")
+            return {}
+
+    @staticmethod
+    def start_page(state):
+        return max(1, state.get("last_page", 1))
+
+    @staticmethod
+    def page_hash(posts):
+        digest = hashlib.sha1()
+        for post in posts:
+            digest.update(f"{post.post_id}\x1f{post.content}\x1e".encode("utf-8"))
+        return digest.hexdigest()
+
+    @staticmethod
+    def is_unchanged(state, page, page_hash):
+        return state.get("page_hashes", {}).get(str(page)) == page_hash
+
+    @staticmethod
+    def page_fingerprint(post_elements):
+        # Taken from the post containers before extraction; whitespace is
+        # normalized so re-indented markup does not count as a change
+        digest = hashlib.sha1()
+        for element in post_elements:
+            digest.update(_WHITESPACE.sub(" ", str(element)).strip().encode("utf-8"))
+            digest.update(b"\x1e")
+        return digest.hexdigest()
+
+    @staticmethod
+    def known_fingerprint(state, page):
+        return state.get("page_fingerprints", {}).get(str(page))
+
+    def record_page(
+        self, state, site, thread_url, page, page_hash, last_post_id, fingerprint=None
+    ):
+        # Only called once the page's posts have been flushed, so a crash
+        # never marks unsaved posts as known
+        update = {
+            "site": site,
+            "last_page": max(page, state.get("last_page", 1)),
+            f"page_hashes.{page}": page_hash,
+            "updated_at": datetime.datetime.now(),
+        }
+        if last_post_id and page >= state.get("last_page", 1):
+            update["last_post_id"] = last_post_id
+        if fingerprint:
+            update[f"page_fingerprints.{page}"] = fingerprint
+
+        try:
+            self.collection.update_one(
+                {"thread_url": thread_url}, {"$set": update}, upsert=True
+            )
+        except Exception as e:
+            logging.error(f"Could not save crawl state for {thread_url}: {e}")
+            return
+
+        state["last_page"] = update["last_page"]
+        state.setdefault("page_hashes", {})[str(page)] = page_hash
+        if fingerprint:
+            state.setdefault("page_fingerprints", {})[str(page)] = fingerprint
+        if "last_post_id" in update:
+            state["last_post_id"] = last_post_id
@@ -1,8 +1,7 @@
 import logging
 import re
-import time
 import traceback
-from bs4 import BeautifulSoup
+from src.parsing import parse_html
 from pymongo import MongoClient
 from bson.objectid import ObjectId
 from urllib.parse import urljoin
@@ -28,8 +27,8 @@ logging.basicConfig(
 class DarkwebCrawler(BaseCrawler):
     base_url = "http://dna777qa6clkmklj2yx5qamr3ge3c2wljuoyju6eav6qs45svpjlxzyd.onion"
 
-    def __init__(self):
-        super().__init__()
+    def __init__(self, driver_pool=None):
+        super().__init__(driver_pool)
         self.mongodb_client = MongoDBClient(
             host=MONGO_HOST, port=MONGO_PORT, username=MONGO_USER, password=MONGO_PASS, database_name="allnewdarkweb"
         )
@@ -46,7 +45,7 @@ class DarkwebCrawler(BaseCrawler):
         leftychan_body = self.driver.find_element_by_tag_name("body").get_attribute(
             "innerHTML"
         )
-        return BeautifulSoup(leftychan_body, "html.parser")
+        return parse_html(leftychan_body)
 
     def _get_member_username(self, post):
         """Extract username from a post"""
@@ -117,7 +116,7 @@ class DarkwebCrawler(BaseCrawler):
     #     for doc in distinct_docs:
     #         raw_content = self.mongodb_client.find_one(
     #             'darkweb', {'poster': doc}, {'raw_content': 1, '_id': 0})
-    #         raw_content_bs = BeautifulSoup(raw_content['raw_content'], "html.parser")
+    #         raw_content_bs = parse_html(raw_content['raw_content'])
     #         profile_url = raw_content_bs.find("a", class_="imgLink")
     #         profile_urls.append(profile_url['href'])
 
@@ -181,7 +180,7 @@ class DarkwebCrawler(BaseCrawler):
         else:
             return 1
         
-    def _scrape_post(self, post, i):
+    def _scrape_post(self, post, i=None, context=None):
         try:
             # Extract username
             username = self._get_member_username(post)
@@ -222,8 +221,7 @@ class DarkwebCrawler(BaseCrawler):
 
     def scrape(self, url, idpost):
         # Start with the index page
-        self.driver.get(url)
-        time.sleep(10)
+        self._load_page(url)
         
         soup = self._get_body_html()
         last_page = self._get_last_page_number(soup)
@@ -236,8 +234,7 @@ class DarkwebCrawler(BaseCrawler):
             page_url = self._format_page_url(url, page)
             logging.info(f"Navigating to page: {page_url}")
 
-            self.driver.get(page_url)
-            time.sleep(15)
+            self._load_page(page_url)
 
             soup = self._get_body_html()
             posts = self._get_posts(soup)
@@ -257,7 +254,6 @@ class DarkwebCrawler(BaseCrawler):
     def run(self, url, idpost):
         print("Profile")
         logging.info(f"Starting the scraper for {url}")
-        time.sleep(5)
         total = self.scrape(url, idpost)
         logging.info(f"Scraping finished for {url}!")
         return total
@@ -1,9 +1,8 @@
 import datetime
 import logging
 import re
-import time
 
-from bs4 import BeautifulSoup
+from src.parsing import parse_html
 from selenium.common.exceptions import TimeoutException
 from config import (
     BINARY_PATH,
@@ -15,17 +14,20 @@ from config import (
     PROFILE_PATH,
 )
 from src.base import BaseCrawler, DarkPost
-from src.mongo import MongoDBClient
+from src.checkpoint import JobCheckpoint
+from src.crawl_state import ThreadCrawlState
+from src.mongo import BulkPostWriter, MongoDBClient
 from src.selenium_config import SeleniumConfig
-from utils import clean_html, fill_date
+from utils import clean_html
 
 logging.basicConfig(level=logging.INFO, format='[%(asctime)s] [%(levelname)s] %(message)s')
 
 class DarkwebCrawler(BaseCrawler):
     base_url = "https://ezdhgsy2aw7zg54z6dqsutrduhl22moami5zv2zt6urr6vub7gs6wfad.onion"
+    ready_selector = "ul.conversation-list"
 
-    def __init__(self):
-        super().__init__()
+    def __init__(self, driver_pool=None):
+        super().__init__(driver_pool)
         self.mongodb_client = MongoDBClient(
             host=MONGO_HOST,
             port=MONGO_PORT,
@@ -33,6 +35,8 @@ class DarkwebCrawler(BaseCrawler):
             password=MONGO_PASS,
             database_name="allnewdarkweb"
         )
+        self.post_writer = BulkPostWriter(self.mongodb_client, website=self.base_url)
+        self.crawl_state = ThreadCrawlState(self.mongodb_client)
 
     def init_driver(self):
         driver_config = SeleniumConfig(GECKO_DRIVER_PATH, BINARY_PATH, PROFILE_PATH)
@@ -45,7 +49,7 @@ class DarkwebCrawler(BaseCrawler):
     
     def _get_body_html(self):
         bbad_body = self.driver.find_element_by_tag_name("body").get_attribute("innerHTML")
-        return BeautifulSoup(bbad_body, 'html.parser')
+        return parse_html(bbad_body)
 
     def _get_thread_topic(self, soup):
         return soup.find('h1', class_="main-title js-main-title hide-on-editmode")
@@ -85,15 +89,10 @@ class DarkwebCrawler(BaseCrawler):
     # ------ Utility methods for saving the data ------
 
     def _save_post(self, data):
-        query = {"post_id": data.post_id}
-
-        data_dict = fill_date(data.__dict__, data.post_id, self.mongodb_client)
-        # logging.error(f"data_dict: {data_dict}")
-
-        self.mongodb_client.upsert_document('darkweb', data_dict, query)
+        self.post_writer.add(data.__dict__)
     # ------ Main methods to scrape the content ------
 
-    def _scrape_post(self, post):
+    def _scrape_post(self, post, i=None, context=None):
         try:
             # Tambahkan logging untuk debug
             # logging.info("Starting to scrape post...")
@@ -146,9 +145,8 @@ class DarkwebCrawler(BaseCrawler):
 
             # Get thread info with better error handling
             try:
-                soup = self._get_body_html()
-                thread_topic = self._get_thread_topic(soup)
-                thread_section = self._get_thread_section(soup)
+                thread_topic = context.thread_topic
+                thread_section = context.thread_section
                 
                 if thread_topic and thread_section:
                     topic_text = thread_topic.text.strip()
@@ -166,7 +164,7 @@ class DarkwebCrawler(BaseCrawler):
             # Create post object
             dark_post = DarkPost(
                 website=self.base_url,
-                thread_url=self.driver.current_url,
+                thread_url=context.url,
                 thread_topic=topic_text,
                 thread_section=section_rapi,
                 poster=poster,
@@ -174,7 +172,7 @@ class DarkwebCrawler(BaseCrawler):
                 content=post_content,
                 raw_content=str(post),
                 post_media=None,
-                post_id=f"{self.driver.current_url}#{poster}_{time}",  # More unique post_id
+                post_id=f"{context.url}#{poster}_{time}",  # More unique post_id
                 is_op=is_op
             )
             
@@ -185,39 +183,65 @@ class DarkwebCrawler(BaseCrawler):
             logging.error(f"Critical error in _scrape_post: {str(e)}", exc_info=True)
             return None
         
+    def _page_url(self, url, page):
+        return url + f'/page{page}'
+
     def scrape(self, url, idpost):
         try:
-            self.driver.get(self.base_url)
-            time.sleep(10)
-            self.driver.get(url)
-            time.sleep(15)
+            # Pick up where the last crawl of this thread stopped
+            state = self.crawl_state.load(url)
+            checkpoint = JobCheckpoint(self.mongodb_client, idpost, url)
+            start_page = checkpoint.resume_page(self.crawl_state.start_page(state))
+
+            self._load_page(self.base_url, wait_for_content=False)
+            self._load_page(self._page_url(url, start_page))
 
             # Coba menangani timeout pada proses pengambilan halaman
             try:
                 soup = self._get_body_html()
                 last_page = self._get_last_page_number(soup)
-                total = 0
+                logging.info(f"Resuming from page {start_page} of {last_page}")
+                loaded_page, start_page = start_page, min(start_page, last_page)
+                # Posts saved by earlier attempts of this job count too
+                total = checkpoint.posts_saved
 
-                for page in range(last_page):
-                    page_url = url + f'/page{page + 1}'
+                for page in range(start_page, last_page + 1):
+                    page_url = self._page_url(url, page)
                     logging.info(f'Navigating to page: {page_url}')
 
-                    self.driver.get(page_url)
-                    time.sleep(15)
+                    if page != loaded_page:  # The first page is already loaded
+                        self._load_page(page_url)
 
-                    posts = self._get_posts(self._get_body_html())
+                    context = self._get_page_context()
+                    posts = self._get_posts(context.soup)
 
                     logging.info(f"posts: {len(posts)}")
 
-                    for post in posts:
-                        data = self._scrape_post(post)
-                        if data:
+                    fingerprint = self.crawl_state.page_fingerprint(posts)
+                    if fingerprint == self.crawl_state.known_fingerprint(state, page):
+                        logging.info(f"Page {page} markup unchanged since the last crawl, skipped extraction")
+                        checkpoint.save(page, page_url, total)
+                        continue
+
+                    scraped = [data for data in (self._scrape_post(post, context=context) for post in posts) if data]
+                    page_hash = self.crawl_state.page_hash(scraped)
+                    if self.crawl_state.is_unchanged(state, page, page_hash):
+                        logging.info(f"Page {page} unchanged since the last crawl")
+                    else:
+                        for data in scraped:
                             logging.info(f"Saving post: {data.post_id}")
                             self._save_post(data)
                             logging.info(f"data: {data}")
 
                             total += 1
                             logging.info(f"Total posts: {total}")
+                        self.post_writer.flush()
+                    # Also stores a new fingerprint of a page whose posts did not change
+                    self.crawl_state.record_page(
+                        state, self.site_name, url, page, page_hash,
+                        scraped[-1].post_id if scraped else None, fingerprint,
+                    )
+                    checkpoint.save(page, page_url, total, scraped[-1].post_id if scraped else None)
 
                 logging.info(f'Total posts scraped: {total}')
                 return total
@@ -230,14 +254,11 @@ class DarkwebCrawler(BaseCrawler):
         finally:
             # Close Tor browser even if an error occurs
             logging.info("Closing Tor browser")
-            if self.driver:
-                self.driver.quit()
-                self.driver = None
+            self.release_driver()
         
     def run(self, url, idpost):
         print("Post")
         logging.info(f"Starting the scraper for {url}")
-        time.sleep(5)
         total = self.scrape(url, idpost)
         logging.info(f"Scraping finished for {url}!")
         return total
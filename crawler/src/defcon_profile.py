@@ -1,8 +1,7 @@
 import logging
 import re
-import time
 import traceback
-from bs4 import BeautifulSoup
+from src.parsing import parse_html
 
 from config import(
     BINARY_PATH,
@@ -25,8 +24,8 @@ logging.basicConfig(
 class DarkwebCrawler(BaseCrawler):
     base_url = "https://ezdhgsy2aw7zg54z6dqsutrduhl22moami5zv2zt6urr6vub7gs6wfad.onion/"
 
-    def __init__(self):
-        super().__init__()
+    def __init__(self, driver_pool=None):
+        super().__init__(driver_pool)
         self.mongodb_client = MongoDBClient(
             host=MONGO_HOST, port=MONGO_PORT, username=MONGO_USER, password=MONGO_PASS, database_name="allnewdarkweb"
         )
@@ -45,7 +44,7 @@ class DarkwebCrawler(BaseCrawler):
         bbad_body = self.driver.find_element_by_tag_name("body").get_attribute(
             "innerHTML"
         )
-        return BeautifulSoup(bbad_body, "html.parser")
+        return parse_html(bbad_body)
 
     def _get_member_username(self, soup):
         username_find = soup.find("div", class_="b-userinfo__details")
@@ -212,7 +211,7 @@ class DarkwebCrawler(BaseCrawler):
     #     for doc in distinct_docs:
     #         raw_content = self.mongodb_client.find_one(
     #             'darkweb', {'poster': doc}, {'raw_content': 1, '_id': 0})
-    #         raw_content_bs = BeautifulSoup(raw_content['raw_content'], "html.parser")
+    #         raw_content_bs = parse_html(raw_content['raw_content'])
     #         profile_url = raw_content_bs.find('a',  itemprop='url')['href']
     #         profile_urls.append(profile_url)
 
@@ -220,7 +219,7 @@ class DarkwebCrawler(BaseCrawler):
 
     # ------ Main methods to scrape the content ------
 
-    def _scrape_post(self, post):
+    def _scrape_post(self, post, i=None, context=None):
         try:
             username = self._get_member_username(post)
             user_title, date_joined, additional = self._get_member_detail(post)
@@ -249,8 +248,7 @@ class DarkwebCrawler(BaseCrawler):
             return None
 
     def scrape(self, url, idpost):
-        self.driver.get(url)
-        time.sleep(10)
+        self._load_page(url)
 
         soup = self._get_body_html()
         all_page_numbers = self._get_all_page_numbers(soup)
@@ -259,8 +257,7 @@ class DarkwebCrawler(BaseCrawler):
             page_url = url + f'/page{page_number}'
             logging.info(f'Navigating to page: {page_url}')
 
-            self.driver.get(page_url)
-            time.sleep(15)
+            self._load_page(page_url)
 
             posts = self._get_posts(self._get_body_html())
             
@@ -278,7 +275,6 @@ class DarkwebCrawler(BaseCrawler):
     def run(self, url, idpost):
         print("Profile")
         logging.info(f"Starting the scraper for {url}")
-        time.sleep(5)
         total = self.scrape(url, idpost)
         logging.info(f"Scraping finished for {url}!")
         return total
@@ -0,0 +1,154 @@
+import atexit
+import logging
+import threading
+import time
+
+from config import DRIVER_POOL_MAX_PAGES, DRIVER_POOL_SIZE
+
+
+class PooledDriver:
+    """
+    Thin proxy around a WebDriver borrowed from a ``DriverPool``.
+
+    Everything is forwarded to the real driver except ``get``, which counts
+    page loads so the pool can recycle the browser, and ``quit``, which hands
+    the driver back to the pool instead of closing Firefox.
+    """
+
+    def __init__(self, pool, driver, site):
+        self._pool = pool
+        self._driver = driver
+        self.site = site
+        self.pages = 0
+        self.released = False
+
+    def get(self, url):
+        self.pages += 1
+        return self._driver.get(url)
+
+    def quit(self):
+        self._pool.release(self)
+
+    def __getattr__(self, name):
+        return getattr(self._driver, name)
+
+
+class DriverPool:
+    """
+    Keeps Tor Browser instances warm across crawls.
+
+    ``acquire`` prefers an idle driver that last served the same site, then
+    any idle driver, and only starts a new browser when the pool is below
+    ``max_size``. Released drivers are left on ``about:blank``, so an idle
+    browser keeps no page, scripts or connections of its last crawl; drivers
+    that fail that reset or have loaded ``max_pages`` pages are quit instead
+    of being returned to the pool.
+    """
+
+    def __init__(self, max_size=DRIVER_POOL_SIZE, max_pages=DRIVER_POOL_MAX_PAGES):
+        self.max_size = max_size
+        self.max_pages = max_pages
+
+        self._idle = []
+        self._size = 0
+        self._condition = threading.Condition()
+        self._closed = False
+        atexit.register(self.close)
+
+    def acquire(self, site, factory, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while True:
+            with self._condition:
+                pooled = self._take_idle(site)
+                if pooled is None and self._size >= self.max_size:
+                    remaining = (
+                        None if deadline is None else deadline - time.monotonic()
+                    )
+                    if remaining is not None and remaining <= 0:
+                        raise TimeoutError("No browser available in the driver pool")
+                    self._condition.wait(remaining)
+                    continue
+                if pooled is None:
+                    self._size += 1
+
+            if pooled is None:
+                try:
+                    logging.info(f"Starting a new browser for {site}")
+                    driver = factory()
+                except Exception:
+                    self._discard_slot()
+                    raise
+                pooled = PooledDriver(self, driver, site)
+            elif not self._is_healthy(pooled):
+                logging.warning(
+                    f"Dropping unhealthy browser last used for {pooled.site}"
+                )
+                self._quit(pooled)
+                continue
+
+            pooled.site = site
+            pooled.released = False
+            return pooled
+
+    def release(self, pooled):
+        if pooled.released:
+            return
+        pooled.released = True
+
+        if self._closed or pooled.pages >= self.max_pages or not self._reset(pooled):
+            logging.info(f"Recycling browser after {pooled.pages} pages")
+            self._quit(pooled)
+            return
+
+        with self._condition:
+            self._idle.append(pooled)
+            self._condition.notify()
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            idle, self._idle = self._idle, []
+
+        for pooled in idle:
+            self._quit(pooled)
+
+    def _take_idle(self, site):
+        for index, pooled in enumerate(self._idle):
+            if pooled.site == site:
+                return self._idle.pop(index)
+        if self._idle:
+            # Oldest idle browser first so the others keep their site affinity
+            return self._idle.pop(0)
+        return None
+
+    @classmethod
+    def _reset(cls, pooled):
+        try:
+            # Through the real driver, so the reset is not counted as a page
+            pooled._driver.get("about:blank")
+        except Exception as e:
+            logging.warning(f"Could not reset browser last used for {pooled.site}: {e}")
+            return False
+        return cls._is_healthy(pooled)
+
+    @staticmethod
+    def _is_healthy(pooled):
+        try:
+            pooled._driver.execute_script("return document.readyState")
+            return True
+        except Exception:
+            return False
+
+    def _quit(self, pooled):
+        try:
+            pooled._driver.quit()
+        except Exception as e:
+            logging.error(f"Error while closing browser: {e}")
+        finally:
+            self._discard_slot()
+
+    def _discard_slot(self):
+        with self._condition:
+            self._size -= 1
+            self._condition.notify()
@@ -1,8 +1,7 @@
 import logging
 import re
-import time
 import traceback
-from bs4 import BeautifulSoup
+from src.parsing import parse_html
 from pymongo import MongoClient
 from bson.objectid import ObjectId
 
@@ -16,6 +15,7 @@ from config import (
     PROFILE_PATH,
 )
 from src.base import BaseCrawler, DarkProfile
+from src.blob_store import load_raw_content
 from src.mongo import MongoDBClient
 from src.selenium_config import SeleniumConfig
 from utils import fill_date_profile
@@ -31,8 +31,8 @@ collection = db['testing']
 class DarkwebCrawler(BaseCrawler):
     base_url = "http://enxx3byspwsdo446jujc52ucy2pf5urdbhqw3kbsfhlfjwmbpj5smdad.onion"
 
-    def __init__(self):
-        super().__init__()
+    def __init__(self, driver_pool=None):
+        super().__init__(driver_pool)
         self.mongodb_client = MongoDBClient(
             host=MONGO_HOST, port=MONGO_PORT, username=MONGO_USER, password=MONGO_PASS, database_name="allnewdarkweb"
         )
@@ -49,7 +49,7 @@ class DarkwebCrawler(BaseCrawler):
         bbad_body = self.driver.find_element_by_tag_name("body").get_attribute(
             "innerHTML"
         )
-        return BeautifulSoup(bbad_body, "html.parser")
+        return parse_html(bbad_body)
 
     # def _get_member_header(self, soup):
     #     print("ini MEMBER", soup.find("div", {"class": "memberHeader-content"}))
@@ -143,8 +143,8 @@ class DarkwebCrawler(BaseCrawler):
         profile_urls = []
         for doc in distinct_docs:
             raw_content = self.mongodb_client.find_one(
-                'darkweb', {'poster': doc}, {'raw_content': 1, '_id': 0})
-            raw_content_bs = BeautifulSoup(raw_content['raw_content'], "html.parser")
+                'darkweb', {'poster': doc}, {'raw_content': 1, 'raw_content_ref': 1, '_id': 0})
+            raw_content_bs = parse_html(load_raw_content(self.mongodb_client, raw_content))
             profile_url = raw_content_bs.find("a", class_="imgLink")
             profile_urls.append(profile_url['href'])
 
@@ -154,7 +154,7 @@ class DarkwebCrawler(BaseCrawler):
     def _get_posts(self, soup):
         return soup.find_all("div", {"class": "postCell"})
     
-    def _scrape_post(self, post, i):
+    def _scrape_post(self, post, i=None, context=None):
         try:
             username = self._get_member_username(post)
 
@@ -192,13 +192,11 @@ class DarkwebCrawler(BaseCrawler):
 
     def scrape(self, url, idpost):
         logging.info(f"Scraping profile for {url}")
-        self.driver.get(url)
-        time.sleep(10)
+        self._load_page(url)
 
         # usernames = self._get_distinct_usernames({"thread_url": url})
         # logging.info(f"{len(usernames)} profiles will be scraped from {url} thread")   
         # for thread in usernames:
-        time.sleep(15)
         total = 0
 
         posts = self._get_posts(self._get_body_html())
@@ -224,7 +222,6 @@ class DarkwebCrawler(BaseCrawler):
             {"_id": ObjectId(idpost)},
             {"$set": {"status": '3'}}
         )
-        time.sleep(5)
         total = self.scrape(url, idpost)
         logging.info(f"Scraping finished for {url}!")
         return total
\ No newline at end of file
@@ -1,8 +1,7 @@
 import datetime
 import logging
 import re
-import time
-from bs4 import BeautifulSoup
+from src.parsing import parse_html
 from pymongo import MongoClient
 from bson.objectid import ObjectId
 
@@ -16,9 +15,9 @@ from config import (
     PROFILE_PATH,
 )
 from src.base import BaseCrawler, DarkPost
-from src.mongo import MongoDBClient
+from src.mongo import BulkPostWriter, MongoDBClient
 from src.selenium_config import SeleniumConfig
-from utils import clean_html, fill_date
+from utils import clean_html
 
 
 logging.basicConfig(
@@ -27,12 +26,15 @@ logging.basicConfig(
 
 class DarkwebCrawler(BaseCrawler):
     base_url = "http://rcuhe6pk7mbmsjk7bwyja5etvjhjvzmc724rnf3piamemvawoi44z7qd.onion"
+    thread_section_source = "url"
+    ready_selector = "div.op, td.reply"
 
-    def __init__(self):
-        super().__init__()
+    def __init__(self, driver_pool=None):
+        super().__init__(driver_pool)
         self.mongodb_client = MongoDBClient(
             host=MONGO_HOST, port=MONGO_PORT, username=MONGO_USER, password=MONGO_PASS, database_name="allnewdarkweb"
         )
+        self.post_writer = BulkPostWriter(self.mongodb_client, website=self.base_url)
 
     def init_driver(self):
         driver_config = SeleniumConfig(GECKO_DRIVER_PATH, BINARY_PATH, PROFILE_PATH)
@@ -46,7 +48,7 @@ class DarkwebCrawler(BaseCrawler):
         leftychan_body = self.driver.find_element_by_tag_name("body").get_attribute(
             "innerHTML"
         )
-        return BeautifulSoup(leftychan_body, "html.parser")
+        return parse_html(leftychan_body)
 
     def _get_thread_topic(self, soup):
     
@@ -112,27 +114,21 @@ class DarkwebCrawler(BaseCrawler):
     
 
     def _save_post(self, data):
-        query = {"post_id": data.post_id}
-
-        data_dict = fill_date(data.__dict__, data.post_id, self.mongodb_client)
-        # logging.error(f"data_dict: {data_dict}")
-
-        self.mongodb_client.upsert_document('darkweb', data_dict, query)
+        self.post_writer.add(data.__dict__)
 
     # ------ Main methods to scrape the content ------
 
-    def _scrape_post(self, post, i):
+    def _scrape_post(self, post, i=None, context=None):
         try:
             # Get thread info first with error handling
-            soup = self._get_body_html()
-            thread_topic = self._get_thread_topic(soup)
+            thread_topic = context.thread_topic
             if not thread_topic:
                 logging.warning("Could not find thread topic, using default")
                 thread_topic_text = "Unknown Topic"
             else:
                 thread_topic_text = thread_topic
 
-            thread_section = self._get_thread_section(self.driver.current_url)
+            thread_section = context.thread_section
 
             # Find post elements with null checks
             poster = post.find("span", {"class": re.compile(r"postername")})
@@ -167,7 +163,7 @@ class DarkwebCrawler(BaseCrawler):
             elif post_reply:
                 post_id = post_reply.get('id', '')
             else:
-                post_id = f"{self.driver.current_url}_{i}"
+                post_id = f"{context.url}_{i}"
                 logging.warning(f"Could not find post_op or post_reply div, using fallback ID: {post_id}")
 
             div_post_head = post.find('div', class_='post_head')
@@ -182,7 +178,7 @@ class DarkwebCrawler(BaseCrawler):
 
             return DarkPost(
                 website=self.base_url,
-                thread_url=self.driver.current_url,
+                thread_url=context.url,
                 thread_topic=thread_topic_text,
                 thread_section=thread_section,
                 poster=poster_text,
@@ -224,31 +220,27 @@ class DarkwebCrawler(BaseCrawler):
             logging.info(f"Navigating to page: {page_url}")
 
             # Navigate to the page
-            self.driver.get(page_url)
-            time.sleep(10)
+            self._load_page(page_url)
 
             # Get posts from the current page
-            posts = self._get_posts(self._get_body_html())
+            context = self._get_page_context()
+            posts = self._get_posts(context.soup)
             logging.info(f"Posts found: {len(posts)}")
 
             for i, post in enumerate(posts):
-                data = self._scrape_post(post, i)
+                data = self._scrape_post(post, i, context)
                 if data:
                     logging.info(f"Saving post: {data.post_id}")
                     self._save_post(data)
                     logging.info(f"Data saved: {data}")
                     total += 1
                     logging.info(f"Total posts scraped so far: {total}")
+            self.post_writer.flush()
 
-            # Close and quit the current driver instance
+            # Close the current driver and, if there are more pages, start a
+            # fresh one; the circuit goes back to the manager in between
             logging.info(f"Closing current page: {page_url}")
-            self.driver.quit()  # Ensure the driver is completely closed
-            self.driver = None  # Reset the driver instance to ensure it's not reused
-
-            # Reinitialize the driver only if there are more pages
-            if page < last_page:
-                logging.info("Reinitializing the driver for the next page")
-                self.driver = self.init_driver()
+            self._recycle_driver(more_pages=page < last_page)
 
         logging.info(f"Total posts scraped: {total}")
         return total
@@ -256,7 +248,6 @@ class DarkwebCrawler(BaseCrawler):
     def run(self, url, idpost):
         print("Post")
         logging.info(f"Starting the scraper for {url}")
-        time.sleep(5)
         total = self.scrape(url, idpost)
         logging.info(f"Scraping finished for {url}!")
         return total
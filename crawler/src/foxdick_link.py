@@ -4,7 +4,7 @@ import time
 import traceback
 import csv
 
-from bs4 import BeautifulSoup
+from src.parsing import parse_html
 from config import (
     BINARY_PATH,
     GECKO_DRIVER_PATH,
@@ -68,7 +68,7 @@ class DarkwebCrawler(BaseCrawler):
         Get the innerHTML of the body and parse with BeautifulSoup
         """
         bbad_body = self.driver.find_element(By.TAG_NAME, "body").get_attribute("innerHTML")
-        return BeautifulSoup(bbad_body, "html.parser")
+        return parse_html(bbad_body)
 
     def _format_page_url(self, base_url, page):
         # Remove any trailing slash from base url
@@ -91,16 +91,14 @@ class DarkwebCrawler(BaseCrawler):
         for attempt in range(max_retries):
             try:
                 # Navigate to base URL first to handle any site-wide checks
-                self.driver.get(self.base_url)
-                time.sleep(5)
+                self._load_page(self.base_url, wait_for_content=False)
 
                 # Check and handle potential captcha (now bypassed)
                 if self._handle_captcha():
                     logging.warning("Captcha detection triggered")
 
                 # Navigate to specific URL
-                self.driver.get(url)
-                time.sleep(10)
+                self._load_page(url)
 
                 # Get initial soup to check pagination
                 soup = self._get_body_html()
@@ -120,8 +118,7 @@ class DarkwebCrawler(BaseCrawler):
                         # If not first iteration, navigate to specific page URL
                         if page > 1:
                             page_url = self._format_page_url(url, page)
-                            self.driver.get(page_url)
-                            time.sleep(5)
+                            self._load_page(page_url)
                             soup = self._get_body_html()
 
                         # Find all div elements with class 'opHead title'
@@ -167,8 +164,7 @@ class DarkwebCrawler(BaseCrawler):
         Visit a link and count the number of posts on the page
         """
         try:
-            self.driver.get(link)
-            time.sleep(5)
+            self._load_page(link)
             soup = self._get_body_html()
 
             # Assuming posts are inside elements with class 'innerPost'
@@ -187,7 +183,7 @@ class DarkwebCrawler(BaseCrawler):
         try:
             # Initialize the driver if not already done
             if not self.driver:
-                self.init_driver()
+                self.driver = self._acquire_driver()
 
             total = self.scrape(url)
             logging.info(f"Crawler completed for {url}!")
@@ -0,0 +1,147 @@
+import logging
+import re
+import threading
+
+import requests
+import urllib3
+from config import HTTP_POOL_SIZE, HTTP_TIMEOUT, HTTP_USER_AGENT, TOR_SOCKS_PROXY
+from requests.adapters import HTTPAdapter
+from wait import page_waiter
+
+# .onion TLS certificates are self-signed; Firefox runs with
+# --ignore-certificate-errors for the same reason
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+_BODY_PATTERN = re.compile(r"<body[^>]*>(.*)</body>", re.IGNORECASE | re.DOTALL)
+
+
+class HtmlElement:
+    def __init__(self, html):
+        self._html = html
+
+    def get_attribute(self, name):
+        if name in ("innerHTML", "outerHTML"):
+            return self._html
+        return None
+
+    @property
+    def text(self):
+        return re.sub(r"<[^>]+>", "", self._html)
+
+
+class HttpDriver:
+    """
+    WebDriver-shaped fetcher for sites that serve their posts as static HTML.
+
+    Pages are fetched with a ``requests`` session through the Tor SOCKS proxy
+    (``socks5h`` so .onion names resolve inside Tor). The session keeps
+    connections alive across pages and holds the cookie jar, which can be
+    seeded from a browser session. Only the part of the WebDriver API the
+    crawlers use is implemented: ``get``, ``current_url``, ``page_source``,
+    ``find_element``/``find_element_by_tag_name`` for the body, cookies, the
+    readiness probe and the window and lifecycle no-ops.
+    """
+
+    def __init__(
+        self, proxy=TOR_SOCKS_PROXY, timeout=HTTP_TIMEOUT, user_agent=HTTP_USER_AGENT
+    ):
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.proxies = {"http": proxy, "https": proxy}
+        self.session.headers["User-Agent"] = user_agent
+        self.session.verify = False
+
+        adapter = HTTPAdapter(
+            pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.current_url = None
+        self.page_source = ""
+        self.status_code = None
+
+    def _request(self, url):
+        response = self.session.get(url, timeout=self.timeout)
+        if response.status_code >= 400:
+            # A browser would render the error page too; let the extractors
+            # find nothing instead of aborting the crawl
+            logging.warning(f"HTTP {response.status_code} for {url}")
+        return response
+
+    def get(self, url):
+        response = self._request(url)
+        self.current_url = response.url
+        self.page_source = response.text
+        self.status_code = response.status_code
+
+    def fetch_body(self, url):
+        # Stateless variant of get() for concurrent fetches: (url, body innerHTML)
+        response = self._request(url)
+        return response.url, self._body(response.text)
+
+    @staticmethod
+    def _body(html):
+        match = _BODY_PATTERN.search(html)
+        return match.group(1) if match else html
+
+    def find_element(self, by=None, value=None):
+        return HtmlElement(self._body(self.page_source))
+
+    def find_element_by_tag_name(self, name):
+        return self.find_element("tag name", name)
+
+    def execute_script(self, script, *args):
+        # The response is complete once get() returns
+        return ["complete", True, len(self.page_source)]
+
+    def add_cookie(self, cookie):
+        self.session.cookies.set(
+            cookie["name"],
+            cookie["value"],
+            domain=cookie.get("domain"),
+            path=cookie.get("path", "/"),
+        )
+
+    def get_cookies(self):
+        return [
+            {"name": c.name, "value": c.value, "domain": c.domain, "path": c.path}
+            for c in self.session.cookies
+        ]
+
+    def delete_all_cookies(self):
+        self.session.cookies.clear()
+
+    def implicitly_wait(self, seconds):
+        pass
+
+    def minimize_window(self):
+        pass
+
+    def quit(self):
+        self.session.close()
+
+
+_browser_cookies = {}
+_browser_cookies_lock = threading.Lock()
+
+
+def browser_cookies(site, url, acquire_browser):
+    """
+    Cookies a real browser session gets from ``url``, fetched once per site.
+
+    For sites that set a session or anti-bot cookie with JavaScript before
+    serving static pages.
+    """
+    with _browser_cookies_lock:
+        if site not in _browser_cookies:
+            browser = acquire_browser()
+            try:
+                browser.get(url)
+                page_waiter.wait_until_ready(browser, site)
+                _browser_cookies[site] = browser.get_cookies()
+                count = len(_browser_cookies[site])
+                logging.info(f"Seeded {count} cookies for {site} from the browser")
+            finally:
+                browser.quit()
+        return _browser_cookies[site]
@@ -0,0 +1,221 @@
+import logging
+import os
+import socket
+import threading
+from datetime import datetime, timedelta
+
+from config import (
+    QUEUE_LEASE_SECONDS,
+    QUEUE_MAX_ATTEMPTS,
+    QUEUE_RETRY_BASE_SECONDS,
+    QUEUE_RETRY_MAX_SECONDS,
+)
+from pymongo import ReturnDocument
+
+# Record status values in the `crawling` collection
+STATUS_POSTS_PENDING = "0"
+STATUS_PROFILES_PENDING = "1"
+STATUS_PROFILES_DONE = "2"
+STATUS_RUNNING = "3"
+STATUS_DEAD = "4"
+
+ACTIONS = {
+    # action: (pending status, status once done)
+    "update_posts": (STATUS_POSTS_PENDING, STATUS_PROFILES_PENDING),
+    "update_profiles": (STATUS_PROFILES_PENDING, STATUS_PROFILES_DONE),
+}
+
+LEASE_FIELDS = ("lease_owner", "lease_expires", "queue_action")
+# Fields only meaningful while a record is being worked on; the crawl
+# checkpoint survives failed attempts so a retry resumes from it
+JOB_FIELDS = LEASE_FIELDS + ("available_at", "last_error", "checkpoint")
+
+
+class CrawlQueue:
+    """
+    Work queue on top of the ``crawling`` collection.
+
+    ``claim`` atomically leases the oldest pending record, or a running record
+    whose lease has expired because its worker died. While a record is being
+    crawled a heartbeat thread keeps pushing ``lease_expires`` forward, so a
+    record is only reclaimed once nobody renews it. Records left running by
+    the runner before this queue have no lease at all and are reclaimed right
+    away, by the profile action once their post summary is set. Failures go
+    back to the pending status with an exponential ``available_at`` delay,
+    and records that fail ``max_attempts`` times are moved to the dead-letter
+    status.
+    """
+
+    def __init__(
+        self,
+        collection,
+        action_type,
+        lease_seconds=QUEUE_LEASE_SECONDS,
+        max_attempts=QUEUE_MAX_ATTEMPTS,
+        retry_base=QUEUE_RETRY_BASE_SECONDS,
+        retry_max=QUEUE_RETRY_MAX_SECONDS,
+    ):
+        self.collection = collection
+        self.action_type = action_type
+        self.pending_status, self.done_status = ACTIONS[action_type]
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._held = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._heartbeat = None
+
+        self.collection.create_index([("status", 1), ("created_date", 1)])
+        self.collection.create_index([("status", 1), ("lease_expires", 1)])
+
+    def start(self):
+        self._stop.clear()
+        self._heartbeat = threading.Thread(
+            target=self._heartbeat_loop, name="crawl-queue-heartbeat", daemon=True
+        )
+        self._heartbeat.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._heartbeat is not None:
+            self._heartbeat.join()
+
+    def claim(self, userid, site=None):
+        while True:
+            now = datetime.utcnow()
+            pending = {
+                "status": self.pending_status,
+                "available_at": {"$not": {"$gt": now}},
+            }
+            if self.action_type == "update_posts":
+                pending["completed"] = {"$ne": True}
+            expired = {
+                "status": STATUS_RUNNING,
+                "queue_action": self.action_type,
+                "lease_expires": {"$lt": now},
+            }
+            legacy = {
+                "status": STATUS_RUNNING,
+                "lease_expires": {"$exists": False},
+                "send_post_summary": (
+                    True if self.action_type == "update_profiles" else {"$ne": True}
+                ),
+            }
+            query = {"$or": [pending, expired, legacy]}
+            if site:
+                query["name_site"] = site
+
+            owner = f"{self.worker_id}:{threading.get_ident()}"
+            record = self.collection.find_one_and_update(
+                query,
+                {
+                    "$set": {
+                        "status": STATUS_RUNNING,
+                        "running_user_id": userid,
+                        "lease_owner": owner,
+                        "lease_expires": now + timedelta(seconds=self.lease_seconds),
+                        "queue_action": self.action_type,
+                    },
+                    "$inc": {"attempts": 1},
+                },
+                sort=[("created_date", 1)],
+                return_document=ReturnDocument.AFTER,
+            )
+            if record is None:
+                return None
+
+            # A record whose worker keeps crashing is never failed explicitly
+            if record.get("attempts", 0) > self.max_attempts:
+                self._dead_letter(record, owner, "Lease expired too many times")
+                continue
+
+            with self._lock:
+                self._held[record["_id"]] = owner
+            return record
+
+    def complete(self, record, fields=None):
+        """Mark ``record`` done, setting ``fields`` in the same update."""
+        owner = self._release(record)
+        result = self.collection.update_one(
+            {"_id": record["_id"], "lease_owner": owner},
+            {
+                "$set": dict(fields or {}, status=self.done_status, attempts=0),
+                "$unset": {field: "" for field in JOB_FIELDS},
+            },
+        )
+        if not result.matched_count:
+            logging.warning(f"Lease on {record['_id']} was lost before it completed")
+
+    def fail(self, record, error):
+        owner = self._release(record)
+        attempts = record.get("attempts", 1)
+        if attempts >= self.max_attempts:
+            self._dead_letter(record, owner, error)
+            return
+
+        delay = min(self.retry_max, self.retry_base * 2 ** (attempts - 1))
+        self.collection.update_one(
+            {"_id": record["_id"], "lease_owner": owner},
+            {
+                "$set": {
+                    "status": self.pending_status,
+                    "available_at": datetime.utcnow() + timedelta(seconds=delay),
+                    "last_error": str(error),
+                },
+                "$unset": {field: "" for field in LEASE_FIELDS},
+            },
+        )
+        logging.info(f"Retrying {record['_id']} in {delay}s (attempt {attempts})")
+
+    def _dead_letter(self, record, owner, error):
+        self.collection.update_one(
+            {"_id": record["_id"], "lease_owner": owner},
+            {
+                "$set": {
+                    "status": STATUS_DEAD,
+                    "dead_letter_action": self.action_type,
+                    "last_error": str(error),
+                },
+                "$unset": {field: "" for field in LEASE_FIELDS},
+            },
+        )
+        logging.error(
+            f"Moved {record['_id']} to dead letter "
+            f"after {record.get('attempts')} attempts: {error}"
+        )
+
+    def _release(self, record):
+        with self._lock:
+            return self._held.pop(record["_id"], None)
+
+    def _heartbeat_loop(self):
+        interval = max(1, self.lease_seconds / 3)
+        while not self._stop.wait(interval):
+            with self._lock:
+                held = list(self._held.items())
+
+            for record_id, owner in held:
+                try:
+                    result = self.collection.update_one(
+                        {
+                            "_id": record_id,
+                            "lease_owner": owner,
+                            "status": STATUS_RUNNING,
+                        },
+                        {
+                            "$set": {
+                                "lease_expires": datetime.utcnow()
+                                + timedelta(seconds=self.lease_seconds)
+                            }
+                        },
+                    )
+                    if not result.matched_count:
+                        logging.warning(
+                            f"Lease on {record_id} was taken over by another worker"
+                        )
+                except Exception as e:
+                    logging.error(f"Heartbeat for {record_id} failed: {e}")
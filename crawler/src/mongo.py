@@ -1,4 +1,14 @@
+import atexit
+import datetime
+import hashlib
+import json
+import logging
 import os
+import re
+import threading
+import time
+import weakref
+
 from config import (
     MONGO_HOST,
     MONGO_PASS,
@@ -7,10 +17,54 @@ from config import (
 )
 
 try:
-    from pymongo import MongoClient
+    from pymongo import MongoClient, UpdateOne
+    from pymongo.errors import DuplicateKeyError
 except ImportError:
     raise ImportError('PyMongo is not installed in your machine.')
 
+from src.blob_store import get_blob_store
+from src.seen_index import post_id_key, post_index, post_version_key
+
+# Bookkeeping fields that change on every write and are left out of the hash
+_UNHASHED_FIELDS = ("_id", "created_at", "created_date", "updated_at", "content_hash")
+
+
+def content_hash(document):
+    """Hash of the scraped fields of ``document``, stored as ``content_hash``."""
+    fields = {key: value for key, value in document.items() if key not in _UNHASHED_FIELDS}
+    encoded = json.dumps(fields, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha1(encoded.encode("utf-8")).hexdigest()
+
+
+_TERM_PATTERN = re.compile(r"\w+")
+# Longer tokens are hashes and base64 runs nobody searches by prefix, and
+# index keys have a size limit on MongoDB 3.6
+_MAX_TERM_LENGTH = 64
+_MAX_TERMS = 2000
+
+
+def content_terms(content):
+    """
+    Distinct lowercased words of ``content``, stored as ``content_terms``.
+
+    The API answers prefix queries (``pref*``) with an anchored regex on
+    the index of this array.
+    """
+    terms = dict.fromkeys(
+        term
+        for term in _TERM_PATTERN.findall(content.lower())
+        if 1 < len(term) <= _MAX_TERM_LENGTH
+    )
+    return list(terms)[:_MAX_TERMS]
+
+
+# Query fields of the collections written with ``upsert_document``, which
+# migrate_unique_keys.py backs with unique indexes
+UNIQUE_KEYS = {
+    "darkweb_profiles": [("avatar", "username", "website")],
+    "zone1b": [("post_id",)],
+}
+
 class MongoDBClient:
     def __init__(
         self,
@@ -22,10 +76,57 @@ class MongoDBClient:
     ):
         self.client = MongoClient(f"mongodb://{MONGO_USER}:{MONGO_PASS}@{MONGO_HOST}:{MONGO_PORT}/allnewdarkweb?directConnection=true")
         self.database = self.client[database_name]
+        self._unique_keys = {}
+        self._unique_keys_lock = threading.Lock()
+
+    def _has_unique_key(self, collection, fields):
+        # Looked up once per process; the indexes are created by
+        # migrate_unique_keys.py, never while crawling
+        key = (collection.name, fields)
+        with self._unique_keys_lock:
+            if key not in self._unique_keys:
+                self._unique_keys[key] = any(
+                    index.get("unique") and sorted(field for field, _ in index["key"]) == list(fields)
+                    for index in collection.index_information().values()
+                )
+                if not self._unique_keys[key]:
+                    logging.warning(f"No unique index on {collection.name} {fields}, writing every upsert")
+            return self._unique_keys[key]
 
     def upsert_document(self, collection_name, document, query):
         collection = self.database[collection_name]
-        collection.update_one(query, {"$set": document}, upsert=True)
+        document = dict(document)
+        document["content_hash"] = content_hash(document)
+        # An unchanged document is not rewritten, which would only bump
+        # updated_at and add an oplog entry. The hash check is part of the
+        # update filter: a stored document with the same hash does not
+        # match, and the upsert's insert is refused by the unique index of
+        # the query fields instead of creating a copy.
+        filter = dict(query)
+        skip_unchanged = self._has_unique_key(collection, tuple(sorted(query)))
+        if skip_unchanged:
+            filter["content_hash"] = {"$ne": document["content_hash"]}
+        # Creation dates only apply to new documents, so a caller that could
+        # not look the document up first never overwrites the original ones
+        on_insert = {
+            field: document.pop(field)
+            for field in ("created_at", "created_date")
+            if field in document
+        }
+        update = {"$set": document}
+        if on_insert:
+            update["$setOnInsert"] = on_insert
+        try:
+            collection.update_one(filter, update, upsert=True)
+        except DuplicateKeyError:
+            # Either the stored document is unchanged, or it was written by
+            # someone else in between with other content; only the first
+            # is expected
+            unchanged = dict(query, content_hash=document["content_hash"])
+            if skip_unchanged and collection.find_one(unchanged, {"_id": 1}) is not None:
+                return False
+            raise
+        return True
 
     def find_document(self, collection_name, query, distinct_field=None):
         collection = self.database[collection_name]
@@ -34,3 +135,222 @@ class MongoDBClient:
     def find_one(self, collection_name, *args):
         collection = self.database[collection_name]
         return collection.find_one(*args)
+
+
+# Writers that may hold buffered posts. One thread flushes the ones that are
+# due and the interpreter exit closes them; the set holds them weakly, so a
+# writer dropped with its crawler costs nothing afterwards.
+_live_writers = weakref.WeakSet()
+_live_writers_lock = threading.Lock()
+_flusher = None
+
+
+def _register_writer(writer):
+    global _flusher
+    with _live_writers_lock:
+        _live_writers.add(writer)
+        if _flusher is None:
+            _flusher = threading.Thread(target=_flush_due_writers, daemon=True)
+            _flusher.start()
+
+
+def _unregister_writer(writer):
+    with _live_writers_lock:
+        _live_writers.discard(writer)
+
+
+def _flush_due_writers():
+    while True:
+        time.sleep(1)
+        # A separate call, so no writer stays referenced while sleeping
+        _flush_due()
+
+
+def _flush_due():
+    with _live_writers_lock:
+        writers = list(_live_writers)
+    for writer in writers:
+        try:
+            writer.flush_if_due()
+        except Exception as e:
+            logging.error(f"Error while flushing {writer.collection_name} writes: {e}")
+
+
+@atexit.register
+def _close_writers():
+    with _live_writers_lock:
+        writers = list(_live_writers)
+    for writer in writers:
+        writer.close()
+
+
+class BulkPostWriter:
+    """
+    Buffers upserts for one collection and writes them with a single
+    ``bulk_write`` instead of a ``find_one`` plus ``update_one`` per document.
+
+    ``created_at``/``created_date`` are only written when the document is
+    inserted (``$setOnInsert``), ``updated_at`` on every write, so nothing has
+    to be read back before writing. The buffer is flushed when it reaches
+    ``max_batch_size``, when its oldest entry is older than
+    ``max_wait_seconds`` (checked by a shared background thread, so posts
+    of a stalled crawl are not held back), on ``flush()``/``close()`` and at
+    interpreter exit.
+
+    Every post is written with a ``content_hash`` of its scraped fields and
+    the ``content_terms`` the API's prefix search uses.
+    Given the ``website`` of the posts, the writer keeps that site's seen
+    index up to date and drops posts whose hash is already stored; only
+    posts the index has possibly seen are checked against Mongo, with one
+    ``$in`` query per flush that reads back the hashes only.
+
+    With a blob store configured (``BLOB_STORE``), ``raw_content`` is
+    written to it compressed and only ``raw_content_ref`` is kept in the
+    document; see ``load_raw_content`` for reading it back.
+    """
+
+    def __init__(
+        self,
+        mongodb_client,
+        collection_name="darkweb",
+        key_fields=("post_id",),
+        max_batch_size=500,
+        max_wait_seconds=30,
+        website=None,
+        blob_store=None,
+    ):
+        self.mongodb_client = mongodb_client
+        self.collection_name = collection_name
+        self.key_fields = key_fields
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_seconds
+        self.seen_index = post_index(mongodb_client, website) if website else None
+        self.blob_store = blob_store or get_blob_store(mongodb_client)
+
+        self._buffer = {}
+        self._first_buffered_at = None
+        self._lock = threading.RLock()
+        _register_writer(self)
+
+    def add(self, document):
+        document = dict(document)
+        document["content_hash"] = content_hash(document)
+        key = tuple(document.get(field) for field in self.key_fields)
+
+        with self._lock:
+            if not self._buffer:
+                self._first_buffered_at = time.monotonic()
+            # Later copies of the same post within one batch win
+            self._buffer[key] = document
+
+            if self._should_flush():
+                self.flush()
+
+    def _should_flush(self):
+        if len(self._buffer) >= self.max_batch_size:
+            return True
+        waited = time.monotonic() - self._first_buffered_at
+        return waited >= self.max_wait_seconds
+
+    def flush_if_due(self):
+        with self._lock:
+            if self._buffer and self._should_flush():
+                return self.flush()
+        return 0
+
+    def _build_operation(self, document, now):
+        query = {field: document[field] for field in self.key_fields}
+        for field in ("created_at", "created_date", "updated_at"):
+            document.pop(field, None)
+        document["updated_at"] = now
+        if isinstance(document.get("content"), str):
+            document["content_terms"] = content_terms(document["content"])
+
+        update = {
+            "$set": document,
+            "$setOnInsert": {
+                "created_at": now,
+                "created_date": now.strftime("%Y-%m-%d"),
+            },
+        }
+        if "raw_content_ref" in document:
+            # Drop the inline copy of posts stored before the blob store
+            update["$unset"] = {"raw_content": ""}
+        return UpdateOne(query, update, upsert=True)
+
+    def _offload_raw_content(self, documents):
+        offloaded = [doc for doc in documents if isinstance(doc.get("raw_content"), str)]
+        if not offloaded:
+            return
+        refs = self.blob_store.put_many([doc["raw_content"] for doc in offloaded])
+        for doc, ref in zip(offloaded, refs):
+            doc["raw_content_ref"] = ref
+            del doc["raw_content"]
+
+    def flush(self):
+        with self._lock:
+            if not self._buffer:
+                return 0
+
+            documents = list(self._buffer.values())
+            self._buffer = {}
+            self._first_buffered_at = None
+
+            collection = self.mongodb_client.database[self.collection_name]
+            if self.seen_index is not None:
+                documents = self._drop_unchanged(collection, documents)
+                if not documents:
+                    return 0
+
+            if self.blob_store is not None:
+                self._offload_raw_content(documents)
+
+            now = datetime.datetime.now()
+            operations = [self._build_operation(dict(doc), now) for doc in documents]
+            result = collection.bulk_write(operations, ordered=False)
+
+            logging.info(
+                f"Flushed {len(operations)} documents to {self.collection_name} "
+                f"(upserted: {result.upserted_count}, modified: {result.modified_count})"
+            )
+            if self.seen_index is not None:
+                for doc in documents:
+                    self.seen_index.add(post_id_key(doc.get("post_id")))
+                    self.seen_index.add(post_version_key(doc.get("post_id"), doc.get("content")))
+            return len(operations)
+
+    def _drop_unchanged(self, collection, documents):
+        maybe_seen = [
+            doc.get("post_id") for doc in documents
+            if self.seen_index.might_contain(post_version_key(doc.get("post_id"), doc.get("content")))
+        ]
+        if not maybe_seen:
+            return documents
+
+        # Posts stored before hashes were written have none and are
+        # rewritten once
+        stored = {
+            row["post_id"]: row.get("content_hash")
+            for row in collection.find(
+                {"post_id": {"$in": maybe_seen}}, {"post_id": 1, "content_hash": 1, "_id": 0}
+            )
+        }
+        changed = [
+            doc for doc in documents
+            if stored.get(doc.get("post_id")) != doc["content_hash"]
+        ]
+        if len(changed) < len(documents):
+            logging.info(f"Skipped {len(documents) - len(changed)} unchanged posts")
+        return changed
+
+    def close(self):
+        _unregister_writer(self)
+        try:
+            self.flush()
+        except Exception as e:
+            logging.error(f"Error while flushing {self.collection_name} writes: {e}")
+        if self.seen_index is not None:
+            try:
+                self.seen_index.save()
+            except Exception as e:
+                logging.error(f"Error while saving seen index {self.seen_index.name}: {e}")
@@ -0,0 +1,177 @@
+import asyncio
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from config import (
+    PIPELINE_EXTRACT_WORKERS,
+    PIPELINE_MAX_PER_CIRCUIT,
+    PIPELINE_MAX_PER_HOST,
+    PIPELINE_PREFETCH,
+)
+
+# Connection limits shared by every pipeline of the process, so crawlers
+# running side by side (scheduler, job queue workers) stay within them
+_limits = {}
+_limits_lock = threading.Lock()
+
+
+def shared_limit(kind, key, size):
+    """Process-wide ``BoundedSemaphore`` of ``size`` for a host or circuit ``key``."""
+    with _limits_lock:
+        if (kind, key) not in _limits:
+            _limits[(kind, key)] = threading.BoundedSemaphore(size)
+        return _limits[(kind, key)]
+
+
+class PagePipeline:
+    """
+    Fetches the pages of one thread ahead of the page being processed.
+
+    Up to ``prefetch`` pages are in flight while earlier pages are parsed by
+    the crawler's own extractors (``_get_posts``/``_scrape_post`` through
+    ``_extract_page``) in a worker pool, so Tor latency overlaps with parsing.
+    Fetches are bounded per onion host and per circuit across all pipelines
+    of the process; a browser is a single circuit that loads one page at a
+    time, an HTTP driver shares its SOCKS circuit between ``max_per_circuit``
+    requests. Results are handed to
+    ``handle_page`` in page order on the calling thread; returning False from
+    it, or any exception, cancels the pages still in flight.
+    """
+
+    def __init__(
+        self,
+        crawler,
+        prefetch=PIPELINE_PREFETCH,
+        extract_workers=PIPELINE_EXTRACT_WORKERS,
+        max_per_host=PIPELINE_MAX_PER_HOST,
+        max_per_circuit=PIPELINE_MAX_PER_CIRCUIT,
+        retries=3,
+        retry_empty=True,
+    ):
+        self.crawler = crawler
+        self.prefetch = max(1, prefetch)
+        self.extract_workers = extract_workers
+        self.max_per_host = max_per_host
+        self.max_per_circuit = max_per_circuit
+        self.retries = retries
+        self.retry_empty = retry_empty
+
+    def run(self, pages, handle_page, preloaded=None, fingerprints=None):
+        """
+        Process ``pages``, an iterable of ``(key, url)``.
+
+        ``handle_page(key, posts)`` gets the scraped posts of each page as an
+        ``ExtractedPage``, or None when the page could not be scraped in
+        ``retries`` attempts (with ``retry_empty``, a page without posts
+        counts as a failure). ``preloaded`` maps a url to an already fetched
+        ``(url, body_html)``. ``fingerprints`` maps a key to the fingerprint
+        its page had on the last crawl; a page that still matches is handed
+        over ``unchanged`` without being extracted.
+        """
+        return asyncio.run(
+            self._run(pages, handle_page, preloaded or {}, fingerprints or {})
+        )
+
+    def _circuit(self):
+        driver = self.crawler.driver
+        if hasattr(driver, "fetch_body"):
+            return driver.session.proxies.get("http"), self.max_per_circuit
+        return f"browser:{id(driver)}", 1
+
+    async def _run(self, pages, handle_page, preloaded, fingerprints):
+        loop = asyncio.get_running_loop()
+        circuit, circuit_limit = self._circuit()
+        self._circuit_limit = shared_limit("circuit", circuit, circuit_limit)
+        self._stopping = threading.Event()
+        self._fetch_executor = ThreadPoolExecutor(max(self.prefetch, circuit_limit))
+        self._extract_executor = ThreadPoolExecutor(self.extract_workers)
+        logging.info(
+            f"Pipelining pages over circuit {circuit} (prefetch {self.prefetch})"
+        )
+
+        pages = iter(pages)
+        in_flight = deque()
+
+        def schedule_next():
+            page = next(pages, None)
+            if page is not None:
+                key, url = page
+                task = self._page(loop, url, preloaded.get(url), fingerprints.get(key))
+                in_flight.append((key, loop.create_task(task)))
+
+        try:
+            for _ in range(self.prefetch):
+                schedule_next()
+
+            while in_flight:
+                key, task = in_flight.popleft()
+                posts = await task
+                schedule_next()
+                if handle_page(key, posts) is False:
+                    logging.info(f"Stopping the pipeline after page {key}")
+                    break
+        finally:
+            self._stopping.set()
+            for _, task in in_flight:
+                task.cancel()
+            await asyncio.gather(
+                *(task for _, task in in_flight), return_exceptions=True
+            )
+            # Let a page load already running finish before the driver is released
+            self._fetch_executor.shutdown(wait=True, cancel_futures=True)
+            self._extract_executor.shutdown(wait=True, cancel_futures=True)
+
+    def _acquire(self, limit):
+        # Polls, so a fetch waiting for a slot gives up once the pipeline stops
+        while not limit.acquire(timeout=0.5):
+            if self._stopping.is_set():
+                raise asyncio.CancelledError()
+
+    def _fetch_limited(self, url):
+        # Runs on a fetch thread: the limits are threading semaphores shared
+        # with other pipelines, always taken host first, then circuit
+        host_limit = shared_limit("host", urlparse(url).netloc, self.max_per_host)
+        self._acquire(host_limit)
+        try:
+            self._acquire(self._circuit_limit)
+            try:
+                return self.crawler._fetch_body(url)
+            finally:
+                self._circuit_limit.release()
+        finally:
+            host_limit.release()
+
+    async def _fetch(self, loop, url):
+        return await loop.run_in_executor(
+            self._fetch_executor, self._fetch_limited, url
+        )
+
+    async def _page(self, loop, url, preloaded, known_fingerprint):
+        for attempt in range(self.retries):
+            try:
+                if preloaded is not None and attempt == 0:
+                    final_url, body = preloaded
+                else:
+                    final_url, body = await self._fetch(loop, url)
+                posts = await loop.run_in_executor(
+                    self._extract_executor,
+                    self.crawler._extract_page,
+                    final_url,
+                    body,
+                    known_fingerprint,
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Error on {url}, attempt {attempt + 1}: {e}")
+                continue
+
+            if posts or posts.unchanged or not self.retry_empty:
+                return posts
+            logging.warning(f"No posts found on {url}, attempt {attempt + 1}")
+
+        logging.error(f"Failed to scrape {url} after {self.retries} attempts")
+        return None
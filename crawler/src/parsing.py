@@ -0,0 +1,56 @@
+import importlib.util
+import logging
+
+from bs4 import BeautifulSoup
+from config import HTML_PARSER
+
+# bs4 tree builders in order of preference for HTML_PARSER = "auto"
+_AUTO_PARSERS = ("lxml", "html.parser")
+_PARSER_MODULES = {"lxml": "lxml", "html5lib": "html5lib", "html.parser": None}
+
+_selectolax = None
+if importlib.util.find_spec("selectolax") is not None:
+    from selectolax.parser import HTMLParser as _selectolax
+
+
+def selectolax_available():
+    return _selectolax is not None
+
+
+def parser_available(name):
+    module = _PARSER_MODULES.get(name)
+    return module is None or importlib.util.find_spec(module) is not None
+
+
+def resolve_parser(name=HTML_PARSER):
+    """Return the bs4 tree builder for ``name`` ("auto": the fastest installed)."""
+    if name == "auto":
+        return next(parser for parser in _AUTO_PARSERS if parser_available(parser))
+    if not parser_available(name):
+        logging.warning(
+            f"HTML parser {name} is not installed, falling back to html.parser"
+        )
+        return "html.parser"
+    return name
+
+
+_default_parser = resolve_parser()
+
+
+def parse_html(markup, parser=None):
+    """
+    Parse ``markup`` into a BeautifulSoup tree.
+
+    The tree builder is a C-backed one (lxml) when installed, so site
+    extractors keep their ``find``/``find_all`` calls while parsing runs
+    outside the interpreter.
+    """
+    return BeautifulSoup(markup, resolve_parser(parser) if parser else _default_parser)
+
+
+def html_to_text(markup):
+    """Text content of ``markup``, through selectolax when it is installed."""
+    if _selectolax is not None:
+        tree = _selectolax(markup)
+        return tree.body.text(deep=True) if tree.body is not None else ""
+    return parse_html(markup).get_text()
@@ -5,7 +5,7 @@ import selenium_utils
 import re
 import sys
 import time
-from bs4 import BeautifulSoup
+from src.parsing import parse_html
 from pymongo import MongoClient
 from bson.objectid import ObjectId
 
@@ -19,9 +19,10 @@ from config import (
     PROFILE_PATH,
 )
 from src.base import BaseCrawler, DarkPost
-from src.mongo import MongoDBClient
+from src.mongo import BulkPostWriter, MongoDBClient
+from src.page_pipeline import PagePipeline
 from src.selenium_config import SeleniumConfig
-from utils import clean_html, fill_date
+from utils import clean_html
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
@@ -32,12 +33,15 @@ logging.basicConfig(
 
 class DarkwebCrawler(BaseCrawler):
     base_url = "http://pitchprash4aqilfr7sbmuwve3pnkpylqwxjbj2q5o4szcfeea6d27yd.onion"
+    thread_section_source = "url"
+    ready_selector = "div.mContent"
 
-    def __init__(self):
-        super().__init__()
+    def __init__(self, driver_pool=None):
+        super().__init__(driver_pool)
         self.mongodb_client = MongoDBClient(
             host=MONGO_HOST, port=MONGO_PORT, username=MONGO_USER, password=MONGO_PASS, database_name="allnewdarkweb"
         )
+        self.post_writer = BulkPostWriter(self.mongodb_client, website=self.base_url)
 
     def init_driver(self):
         driver_config = SeleniumConfig(GECKO_DRIVER_PATH, BINARY_PATH, PROFILE_PATH)
@@ -51,7 +55,7 @@ class DarkwebCrawler(BaseCrawler):
         bbad_body = self.driver.find_element_by_tag_name("body").get_attribute(
             "innerHTML"
         )
-        return BeautifulSoup(bbad_body, "html.parser")
+        return parse_html(bbad_body)
 
     def _get_thread_topic(self, soup):
         return soup.find("div", {"class": "blue bold fs-28 mt-15 mb-10"})
@@ -105,17 +109,12 @@ class DarkwebCrawler(BaseCrawler):
     # ------ Utility methods for saving the data ------
 
     def _save_post(self, data):
-        query = {"post_id": data.post_id}
-
-        data_dict = fill_date(data.__dict__, data.post_id, self.mongodb_client)
-        # logging.error(f"data_dict: {data_dict}")
-
-        self.mongodb_client.upsert_document('darkweb', data_dict, query)
+        self.post_writer.add(data.__dict__)
 
     # ------ Main methods to scrape the content ------
         
    
-    def _scrape_post(self, post):
+    def _scrape_post(self, post, i=None, context=None):
         try:
             # Initialize list to store post IDs
             post_ids = []
@@ -211,7 +210,7 @@ class DarkwebCrawler(BaseCrawler):
 
             # Extract thread info
             try:
-                thread_topic = self._get_thread_topic(self._get_body_html())
+                thread_topic = context.thread_topic
                 thread_topic = thread_topic.text if thread_topic else "Unknown Topic"
                 logging.info(f"Extracted thread topic: {thread_topic}")
             except Exception as e:
@@ -219,7 +218,7 @@ class DarkwebCrawler(BaseCrawler):
                 thread_topic = "Unknown Topic"
 
             try:
-                thread_section = self._get_thread_section(self.driver.current_url)
+                thread_section = context.thread_section
                 logging.info(f"Extracted thread section: {thread_section}")
             except Exception as e:
                 logging.error(f"Error extracting thread section: {e}")
@@ -250,7 +249,7 @@ class DarkwebCrawler(BaseCrawler):
             # Create DarkPost object
             return DarkPost(
                 website=self.base_url,
-                thread_url=self.driver.current_url,
+                thread_url=context.url,
                 thread_topic=thread_topic,
                 thread_section=thread_section,
                 poster=clean_html(poster),
@@ -297,26 +296,22 @@ class DarkwebCrawler(BaseCrawler):
 
         total = 0
 
-        for page in range(int(last_page)):
-            page_url = url + f"?p={page+1}"
-            logging.info(f"Navigating to page: {page_url}")
-
-            self.driver.get(page_url)
-            time.sleep(15)
+        def save_page(page, posts):
+            nonlocal total
+            logging.info(f"page {page} posts: {len(posts or [])}")
 
-            posts = self._get_posts(self._get_body_html())
-           
-            logging.info(f" posts: {len(posts)}")
+            for data in posts or []:
+                logging.info(f"Saving post: {data.post_id}")
+                self._save_post(data)
+                logging.info(f"data: {data}")
 
-            for post in posts:
-                data = self._scrape_post(post)
-                if data:
-                    logging.info(f"Saving post: {data.post_id}")
-                    self._save_post(data)
-                    logging.info(f"data: {data}")
+                total += 1
+                logging.info(f"Total posts: {total}")
+            self.post_writer.flush()
 
-                    total += 1
-                    logging.info(f"Total posts: {total}")
+        # Page N+1 loads while page N is parsed and saved
+        pages = ((page, url + f"?p={page}") for page in range(1, int(last_page) + 1))
+        PagePipeline(self, retry_empty=False).run(pages, save_page)
 
         logging.info(f"Total posts scraped: {total}")
         return total
@@ -324,7 +319,6 @@ class DarkwebCrawler(BaseCrawler):
     def run(self, url, idpost):
         print("Post")
         logging.info(f"Starting the scraper for {url}")
-        time.sleep(5)
         total = self.scrape(url, idpost)
         logging.info(f"Scraping finished for {url}!")
         return total
\ No newline at end of file
@@ -5,7 +5,7 @@ import re
 import sys
 import time
 import traceback
-from bs4 import BeautifulSoup
+from src.parsing import parse_html
 
 from config import (
     BINARY_PATH,
@@ -32,8 +32,8 @@ logging.basicConfig(
 class DarkwebCrawler(BaseCrawler):
     base_url = "http://pitchprash4aqilfr7sbmuwve3pnkpylqwxjbj2q5o4szcfeea6d27yd.onion"
 
-    def __init__(self):
-        super().__init__()
+    def __init__(self, driver_pool=None):
+        super().__init__(driver_pool)
         self.mongodb_client = MongoDBClient(
             host=MONGO_HOST, port=MONGO_PORT, username=MONGO_USER, password=MONGO_PASS, database_name="allnewdarkweb"
         )
@@ -52,7 +52,7 @@ class DarkwebCrawler(BaseCrawler):
         bbad_body = self.driver.find_element_by_tag_name("body").get_attribute(
             "innerHTML"
         )
-        return BeautifulSoup(bbad_body, "html.parser")
+        return parse_html(bbad_body)
 
     def _get_member_username(self, soup):
         username_div = soup.find("div", style="font-size:16px;font-weight:bold;")
@@ -191,7 +191,7 @@ class DarkwebCrawler(BaseCrawler):
     # ------ Main methods to scrape the content ------
 
    
-    def _scrape_post(self, post):
+    def _scrape_post(self, post, i=None, context=None):
         try:
 
         # Clean raw_content and content
@@ -265,8 +265,7 @@ class DarkwebCrawler(BaseCrawler):
             page_url = url + f"?p={page+1}"
             logging.info(f"Navigating to page: {page_url}")
 
-            self.driver.get(page_url)
-            time.sleep(15)
+            self._load_page(page_url)
 
             posts = self._get_posts(self._get_body_html())
             
@@ -286,7 +285,6 @@ class DarkwebCrawler(BaseCrawler):
     def run(self, url, idpost):
         print("Profile")
         logging.info(f"Starting the scraper for {url}")
-        time.sleep(5)
         total = self.scrape(url, idpost)
         logging.info(f"Scraping finished for {url}!")
         return total
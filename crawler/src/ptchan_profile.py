@@ -1,8 +1,7 @@
 import logging
 import re
-import time
 import traceback
-from bs4 import BeautifulSoup
+from src.parsing import parse_html
 from pymongo import MongoClient
 from bson.objectid import ObjectId
 from urllib.parse import urljoin
@@ -28,8 +27,8 @@ logging.basicConfig(
 class DarkwebCrawler(BaseCrawler):
     base_url = "http://jieq75a6uwqbj5sjzaxlnd7xwgs35audjmkk4g3gfjwosfrz7cp47xid.onion"
 
-    def __init__(self):
-        super().__init__()
+    def __init__(self, driver_pool=None):
+        super().__init__(driver_pool)
         self.mongodb_client = MongoDBClient(
             host=MONGO_HOST, port=MONGO_PORT, username=MONGO_USER, password=MONGO_PASS, database_name="allnewdarkweb"
         )
@@ -46,7 +45,7 @@ class DarkwebCrawler(BaseCrawler):
         leftychan_body = self.driver.find_element_by_tag_name("body").get_attribute(
             "innerHTML"
         )
-        return BeautifulSoup(leftychan_body, "html.parser")
+        return parse_html(leftychan_body)
 
     def _get_member_username(self, post):
         try:
@@ -104,7 +103,7 @@ class DarkwebCrawler(BaseCrawler):
     def _get_last_page_number(self, soup):
         return 1
         
-    def _scrape_post(self, post, i):
+    def _scrape_post(self, post, i=None, context=None):
         try:
             username = self._get_member_username(post)
             avatars = self._get_avatars(post)
@@ -135,8 +134,7 @@ class DarkwebCrawler(BaseCrawler):
         return f"{base_url}/{page}.html"
 
     def scrape(self, url, idpost):
-        self.driver.get(url)
-        time.sleep(10)
+        self._load_page(url)
         
         soup = self._get_body_html()
         last_page = self._get_last_page_number(soup)
@@ -144,8 +142,7 @@ class DarkwebCrawler(BaseCrawler):
 
         for page in range(1, last_page + 1):
             page_url = self._format_page_url(url, page)
-            self.driver.get(page_url)
-            time.sleep(15)
+            self._load_page(page_url)
 
             soup = self._get_body_html()
             posts = self._get_posts(soup)
@@ -162,7 +159,6 @@ class DarkwebCrawler(BaseCrawler):
     def run(self, url, idpost):
         print("Profile")
         logging.info(f"Starting the scraper for {url}")
-        time.sleep(5)
         total = self.scrape(url, idpost)
         logging.info(f"Scraping finished for {url}!")
         return total
\ No newline at end of file
@@ -0,0 +1,166 @@
+import datetime
+import json
+import logging
+import os
+import re
+import threading
+
+# Corpus layout, one directory per site module:
+#
+#   <corpus>/<site>/manifest.json
+#       {"site": ..., "pages": [{"url", "file", "recorded_at"}]}
+#   <corpus>/<site>/0001.html
+#       body innerHTML of the page, as _get_body_html reads it
+#   <corpus>/<site>/expected.json   golden extraction output written by bench_extract.py
+MANIFEST = "manifest.json"
+EXPECTED = "expected.json"
+
+
+class PageNotRecorded(Exception):
+    pass
+
+
+def load_manifest(site_dir):
+    with open(os.path.join(site_dir, MANIFEST), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_pages(site_dir):
+    """Return ``[(url, body_html), ...]`` in recording order."""
+    pages = []
+    for page in load_manifest(site_dir)["pages"]:
+        with open(os.path.join(site_dir, page["file"]), encoding="utf-8") as f:
+            pages.append((page["url"], f.read()))
+    return pages
+
+
+class ReplayElement:
+    def __init__(self, html):
+        self._html = html
+
+    def get_attribute(self, name):
+        if name in ("innerHTML", "outerHTML"):
+            return self._html
+        return None
+
+    @property
+    def text(self):
+        return re.sub(r"<[^>]+>", "", self._html)
+
+
+class ReplayDriver:
+    """
+    Stand-in for the WebDriver that serves recorded pages.
+
+    Implements the part of the API the crawlers and the wait engine use:
+    ``get``, ``current_url``, ``find_element``/``find_element_by_tag_name``
+    for the body, ``execute_script`` for readiness probes and the window and
+    lifecycle no-ops. Loading a URL that was not recorded raises
+    ``PageNotRecorded``.
+    """
+
+    def __init__(self, pages):
+        self.pages = dict(pages)
+        self.current_url = None
+        self.page_source = ""
+        self.loads = 0
+
+    def get(self, url):
+        if url not in self.pages:
+            raise PageNotRecorded(url)
+        self.current_url = url
+        self.page_source = self.pages[url]
+        self.loads += 1
+
+    def find_element(self, by=None, value=None):
+        return ReplayElement(self.page_source)
+
+    def find_element_by_tag_name(self, name):
+        return self.find_element("tag name", name)
+
+    def execute_script(self, script, *args):
+        # Answers the readiness probe of wait.READY_STATE_SCRIPT
+        return ["complete", True, len(self.page_source)]
+
+    def implicitly_wait(self, seconds):
+        pass
+
+    def minimize_window(self):
+        pass
+
+    def quit(self):
+        pass
+
+
+class _RecordingElement:
+    def __init__(self, recorder, element):
+        self._recorder = recorder
+        self._element = element
+
+    def get_attribute(self, name):
+        value = self._element.get_attribute(name)
+        if name == "innerHTML":
+            self._recorder.record(value)
+        return value
+
+    def __getattr__(self, name):
+        return getattr(self._element, name)
+
+
+class RecordingDriver:
+    """
+    Proxy around a live driver that saves every body the crawler reads.
+
+    Pages are written to the corpus the moment ``_get_body_html`` reads the
+    body's innerHTML, so the corpus holds exactly what the extractors saw.
+    """
+
+    _lock = threading.Lock()
+
+    def __init__(self, driver, corpus_dir, site):
+        self._driver = driver
+        self.site_dir = os.path.join(corpus_dir, site)
+        self.site = site
+
+    def find_element(self, by=None, value=None):
+        element = self._driver.find_element(by, value)
+        return _RecordingElement(self, element) if value == "body" else element
+
+    def find_element_by_tag_name(self, name):
+        element = self._driver.find_element_by_tag_name(name)
+        return _RecordingElement(self, element) if name == "body" else element
+
+    def record(self, html):
+        url = self._driver.current_url
+        with self._lock:
+            os.makedirs(self.site_dir, exist_ok=True)
+            try:
+                manifest = load_manifest(self.site_dir)
+            except FileNotFoundError:
+                manifest = {"site": self.site, "pages": []}
+
+            existing = next(
+                (page for page in manifest["pages"] if page["url"] == url), None
+            )
+            if existing is None:
+                existing = {
+                    "url": url,
+                    "file": f"{len(manifest['pages']) + 1:04d}.html",
+                }
+                manifest["pages"].append(existing)
+            existing["recorded_at"] = datetime.datetime.now().isoformat(
+                timespec="seconds"
+            )
+
+            with open(
+                os.path.join(self.site_dir, existing["file"]), "w", encoding="utf-8"
+            ) as f:
+                f.write(html)
+            with open(
+                os.path.join(self.site_dir, MANIFEST), "w", encoding="utf-8"
+            ) as f:
+                json.dump(manifest, f, indent=2)
+        logging.info(f"Recorded {url} to {self.site_dir}")
+
+    def __getattr__(self, name):
+        return getattr(self._driver, name)
@@ -0,0 +1,255 @@
+import atexit
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import threading
+from urllib.parse import urlsplit
+
+from config import SEEN_INDEX_CAPACITY, SEEN_INDEX_DIR, SEEN_INDEX_ERROR_RATE
+
+
+class BloomFilter:
+    """Fixed-size bloom filter over strings (no false negatives)."""
+
+    def __init__(self, capacity, error_rate, bits=None, count=0):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bits if bits is not None else bytearray((self.size + 7) // 8)
+        self.count = count
+
+    def _positions(self, key):
+        # Double hashing: k positions out of one 128-bit digest
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        added = False
+        for position in self._positions(key):
+            mask = 1 << (position & 7)
+            if not self.bits[position >> 3] & mask:
+                self.bits[position >> 3] |= mask
+                added = True
+        if added:
+            self.count += 1
+        return added
+
+    def __contains__(self, key):
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(key)
+        )
+
+    def merge(self, other):
+        for index, byte in enumerate(other.bits):
+            self.bits[index] |= byte
+        self.count = max(self.count, other.count)
+
+    def header(self):
+        return {
+            "capacity": self.capacity,
+            "error_rate": self.error_rate,
+            "count": self.count,
+        }
+
+
+class SeenIndex:
+    """
+    Persistent, per-site membership index of keys already written to Mongo.
+
+    ``might_contain`` answering False means the key was never written, so
+    the caller can skip its Mongo lookup. True only means "possibly seen" and
+    must be confirmed against Mongo. The filter lives in
+    ``SEEN_INDEX_DIR/<name>.bloom``; when the file is missing or has outgrown
+    its capacity it is rebuilt once from the keys yielded by ``warm``. Saving
+    ORs the bits already on disk in, so processes sharing a file do not drop
+    each other's keys.
+    """
+
+    def __init__(
+        self,
+        name,
+        warm=None,
+        capacity=SEEN_INDEX_CAPACITY,
+        error_rate=SEEN_INDEX_ERROR_RATE,
+    ):
+        self.name = name
+        self.path = os.path.join(SEEN_INDEX_DIR, f"{name}.bloom")
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._disabled = False
+
+        self.filter = self._read(self.path)
+        if self.filter is None or self.filter.count > self.filter.capacity:
+            if self.filter is not None:
+                capacity = max(capacity, self.filter.capacity * 2)
+            self.filter = BloomFilter(capacity, error_rate)
+            if warm is not None:
+                self._warm(warm)
+
+    @staticmethod
+    def _read(path):
+        try:
+            with open(path, "rb") as f:
+                header = json.loads(f.readline())
+                bits = bytearray(f.read())
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logging.error(f"Ignoring unreadable seen index {path}: {e}")
+            return None
+
+        bloom = BloomFilter(
+            header["capacity"], header["error_rate"], count=header["count"]
+        )
+        if len(bits) != len(bloom.bits):
+            logging.error(f"Ignoring seen index {path} with an unexpected size")
+            return None
+        bloom.bits = bits
+        return bloom
+
+    def _warm(self, warm):
+        try:
+            for key in warm():
+                self.filter.add(key)
+        except Exception as e:
+            # A partial filter would answer "never seen" for stored keys
+            logging.error(f"Could not build seen index {self.name}: {e}")
+            self.filter = BloomFilter(self.filter.capacity, self.filter.error_rate)
+            self._disabled = True
+            return
+        logging.info(f"Built seen index {self.name} with {self.filter.count} keys")
+        self._dirty = True
+        self.save()
+
+    def might_contain(self, key):
+        if self._disabled:
+            return True
+        with self._lock:
+            return key in self.filter
+
+    def add(self, key):
+        with self._lock:
+            if self.filter.add(key):
+                self._dirty = True
+
+    def save(self):
+        with self._lock:
+            if not self._dirty or self._disabled:
+                return
+            on_disk = self._read(self.path)
+            if on_disk is not None and len(on_disk.bits) == len(self.filter.bits):
+                self.filter.merge(on_disk)
+
+            os.makedirs(SEEN_INDEX_DIR, exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(json.dumps(self.filter.header()).encode("utf-8") + b"\n")
+                f.write(self.filter.bits)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+_build_locks = {}
+
+
+def site_of(website):
+    """Scheme and host of ``website``; seen indexes are kept per site."""
+    parts = urlsplit(website)
+    return f"{parts.scheme}://{parts.netloc}" if parts.netloc else website
+
+
+def _site_documents(site):
+    # Every document of the site, whatever path its website carries
+    return {"website": {"$regex": f"^{re.escape(site)}(/|$)"}}
+
+
+def get_seen_index(kind, site, warm=None):
+    """
+    Return the process-wide ``SeenIndex`` of ``kind`` keys for ``site``.
+
+    ``warm`` must yield the keys of every document of the site. The first
+    caller builds the index outside the registry lock, so other sites are
+    not held up; callers of the same index wait for that build.
+    """
+    key = (site, kind)
+    with _indexes_lock:
+        if key in _indexes:
+            return _indexes[key]
+        building = _build_locks.setdefault(key, threading.Lock())
+
+    with building:
+        with _indexes_lock:
+            if key in _indexes:
+                return _indexes[key]
+
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", site.split("//")[-1]).strip("_")[:40]
+        digest = hashlib.sha1(site.encode("utf-8")).hexdigest()[:8]
+        index = SeenIndex(f"{slug}-{digest}.{kind}", warm)
+        with _indexes_lock:
+            _indexes[key] = index
+            _build_locks.pop(key, None)
+        return index
+
+
+def save_all():
+    for index in list(_indexes.values()):
+        try:
+            index.save()
+        except Exception as e:
+            logging.error(f"Error while saving seen index {index.name}: {e}")
+
+
+atexit.register(save_all)
+
+
+def post_id_key(post_id):
+    return f"id:{post_id}"
+
+
+def post_version_key(post_id, content):
+    digest = hashlib.sha1((content or "").encode("utf-8")).hexdigest()
+    return f"v:{post_id}:{digest}"
+
+
+def profile_key(username, website):
+    # Profiles are looked up by (username, website), and some crawlers store
+    # a per-profile website under the site
+    return f"user:{website}:{username}"
+
+
+def post_index(mongodb_client, website):
+    """Seen index of the post ids and versions in ``darkweb``, per site."""
+    site = site_of(website)
+
+    def warm():
+        cursor = mongodb_client.database["darkweb"].find(
+            _site_documents(site), {"post_id": 1, "content": 1, "_id": 0}
+        )
+        for doc in cursor:
+            yield post_id_key(doc.get("post_id"))
+            yield post_version_key(doc.get("post_id"), doc.get("content"))
+
+    return get_seen_index("posts", site, warm)
+
+
+def profile_index(mongodb_client, website):
+    """Seen index of the profiles in ``darkweb_profiles``, per site."""
+    site = site_of(website)
+
+    def warm():
+        cursor = mongodb_client.database["darkweb_profiles"].find(
+            _site_documents(site), {"username": 1, "website": 1, "_id": 0}
+        )
+        for doc in cursor:
+            yield profile_key(doc.get("username"), doc.get("website"))
+
+    return get_seen_index("profiles", site, warm)
@@ -2,6 +2,8 @@ from selenium import webdriver
 from selenium.webdriver.firefox.firefox_binary import FirefoxBinary
 from selenium.webdriver.firefox.firefox_profile import FirefoxProfile
 
+from tor_circuits import assigned_circuit
+
 
 class SeleniumConfig:
     def __init__(self, geckodriver_path, binary_path, profile_path):
@@ -28,9 +30,14 @@ class SeleniumConfig:
     def create_firefox_driver(self):
         binary = FirefoxBinary(self.binary_path)
         profile = FirefoxProfile(self.profile_path)
+        circuit = assigned_circuit()
+        if circuit is not None:
+            for name, value in circuit.firefox_preferences().items():
+                profile.set_preference(name, value)
         driver = webdriver.Firefox(
             profile, binary, executable_path=self.geckodriver_path, options=self.options
         )
+        driver.tor_circuit = circuit
 
         driver.minimize_window()
 
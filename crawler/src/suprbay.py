@@ -2,15 +2,16 @@ import logging
 import time
 import re
 import datetime
-from bs4 import BeautifulSoup
+from src.parsing import parse_html
 from pymongo import MongoClient
 from bson.objectid import ObjectId
 
 from src.selenium_config import SeleniumConfig
 from src.base import DarkPost
 from src.base import BaseCrawler
-from src.mongo import MongoDBClient
-from utils import fill_date
+from src.checkpoint import JobCheckpoint
+from src.crawl_state import ThreadCrawlState
+from src.mongo import BulkPostWriter, MongoDBClient
 from config import GECKO_DRIVER_PATH, BINARY_PATH, PROFILE_PATH, MONGO_HOST, MONGO_PORT, MONGO_USER, MONGO_PASS
 
 logging.basicConfig(level=logging.INFO, format='[%(asctime)s] [%(levelname)s] %(message)s')
@@ -18,9 +19,10 @@ logging.basicConfig(level=logging.INFO, format='[%(asctime)s] [%(levelname)s] %(
 
 class DarkwebCrawler(BaseCrawler):
     base_url = "http://suprbaydvdcaynfo4dgdzgxb4zuso7rftlil5yg5kqjefnw4wq4ulcad.onion"
+    ready_selector = "div.post.classic"
 
-    def __init__(self):
-        super().__init__()
+    def __init__(self, driver_pool=None):
+        super().__init__(driver_pool)
         self.mongodb_client = MongoDBClient(
             host=MONGO_HOST,
             port=MONGO_PORT,
@@ -28,6 +30,8 @@ class DarkwebCrawler(BaseCrawler):
             password=MONGO_PASS,
             database_name="allnewdarkweb"
         )
+        self.post_writer = BulkPostWriter(self.mongodb_client, website=self.base_url)
+        self.crawl_state = ThreadCrawlState(self.mongodb_client)
 
     def init_driver(self):
         driver_config = SeleniumConfig(GECKO_DRIVER_PATH, BINARY_PATH, PROFILE_PATH)
@@ -40,7 +44,7 @@ class DarkwebCrawler(BaseCrawler):
     
     def _get_body_html(self):
         bbad_body = self.driver.find_element_by_tag_name("body").get_attribute("innerHTML")
-        return BeautifulSoup(bbad_body, 'html.parser')
+        return parse_html(bbad_body)
 
     def _get_thread_topic(self, soup):
         return soup.find('span', {"class": "active"})
@@ -95,25 +99,17 @@ class DarkwebCrawler(BaseCrawler):
     # ------ Utility methods for saving the data ------
 
     def _save_post(self, data):
-        # Create a unique query using both thread URL and post ID
-        query = {
-            "post_id": data.post_id
-        }
-        
-        data_dict = fill_date(
-            data.__dict__, data.post_id, self.mongodb_client)
-        
-        self.mongodb_client.upsert_document('darkweb', data_dict, query)
+        self.post_writer.add(data.__dict__)
         # ------ Main methods to scrape the content ------
 
-    def _scrape_post(self, post):
+    def _scrape_post(self, post, i=None, context=None):
         try:
             poster = post.find('span', class_='largetext').text
             # print("ini poster", poster)
             post_id= post.find('div', class_='post_body scaleimages').get('id', '')
             if not post_id:
                 # Fallback if no ID found
-                post_id = f"{self.driver.current_url}_{number}"
+                post_id = f"{context.url}_{number}"
         
             # if not poster:
             #     poster = postpost_id.find('span', {"class": "post-name"})
@@ -143,10 +139,10 @@ class DarkwebCrawler(BaseCrawler):
             post_content = post.find('div', class_="post_body scaleimages").text
             # print("ini post content", post_content)
 
-            thread_topic = self._get_thread_topic(self._get_body_html())
+            thread_topic = context.thread_topic
             # print("ini topik", thread_topic)
             
-            thread_section = self._get_thread_section(self._get_body_html())
+            thread_section = context.thread_section
             # print("ini section", thread_section)
             
             section_rapi = thread_section[:3]
@@ -167,7 +163,7 @@ class DarkwebCrawler(BaseCrawler):
             
             return DarkPost(
                 website=self.base_url,
-                thread_url=self.driver.current_url,
+                thread_url=context.url,
                 thread_topic=thread_topic.text,
                 thread_section=section_rapi,
                 poster=poster,
@@ -183,39 +179,63 @@ class DarkwebCrawler(BaseCrawler):
             logging.error(f"Error while scraping post: {e}")
             return None
 
+    def _page_url(self, url, page):
+        return url + f'?page={page}'
+
     def scrape(self, url, idpost):
+        # Pick up where the last crawl of this thread stopped
+        state = self.crawl_state.load(url)
+        checkpoint = JobCheckpoint(self.mongodb_client, idpost, url)
+        start_page = checkpoint.resume_page(self.crawl_state.start_page(state))
+
         # Initialize Tor connection once at the start
-        self.driver.get(self.base_url)
-        time.sleep(10)
-        self.driver.get(url)
-        time.sleep(15)
+        self._load_page(self.base_url, wait_for_content=False)
+        self._load_page(url if start_page == 1 else self._page_url(url, start_page))
 
         try:
             soup = self._get_body_html()
             last_page = self._get_last_page_number(soup)
-            logging.info(f"total page: {last_page}")
-            total = 0
+            logging.info(f"total page: {last_page}, resuming from page {start_page}")
+            loaded_page, start_page = start_page, min(start_page, int(last_page))
+            # Posts saved by earlier attempts of this job count too
+            total = checkpoint.posts_saved
 
-            for page in range(int(last_page)):
-                page_url = url + f'?page={page + 1}'
+            for page in range(start_page, int(last_page) + 1):
+                page_url = self._page_url(url, page)
                 logging.info(f'Navigating to page: {page_url}')
 
-                if page > 0:  # Only need to navigate if not on first page
-                    self.driver.get(page_url)
-                    time.sleep(15)
+                if page != loaded_page:  # The first page is already loaded
+                    self._load_page(page_url)
 
-                posts = self._get_posts(self._get_body_html())
+                context = self._get_page_context()
+                posts = self._get_posts(context.soup)
                 logging.info(f" posts: {len(posts)}")
 
-                for post in posts:
-                    data = self._scrape_post(post)
-                    if data:
+                fingerprint = self.crawl_state.page_fingerprint(posts)
+                if fingerprint == self.crawl_state.known_fingerprint(state, page):
+                    logging.info(f"Page {page} markup unchanged since the last crawl, skipped extraction")
+                    checkpoint.save(page, page_url, total)
+                    continue
+
+                scraped = [data for data in (self._scrape_post(post, context=context) for post in posts) if data]
+                page_hash = self.crawl_state.page_hash(scraped)
+                if self.crawl_state.is_unchanged(state, page, page_hash):
+                    logging.info(f"Page {page} unchanged since the last crawl")
+                else:
+                    for data in scraped:
                         logging.info(f"Saving post: {data.post_id}")
                         self._save_post(data)
                         logging.info(f"data: {data}")
 
                         total += 1
                         logging.info(f"Total posts: {total}")
+                    self.post_writer.flush()
+                # Also stores a new fingerprint of a page whose posts did not change
+                self.crawl_state.record_page(
+                    state, self.site_name, url, page, page_hash,
+                    scraped[-1].post_id if scraped else None, fingerprint,
+                )
+                checkpoint.save(page, page_url, total, scraped[-1].post_id if scraped else None)
 
             logging.info(f"Total posts scraped: {total}")
             return total
@@ -223,14 +243,11 @@ class DarkwebCrawler(BaseCrawler):
         finally:
             # Close Tor only once after all scraping is complete
             logging.info("Closing Tor browser")
-            if self.driver:
-                self.driver.quit()
-                self.driver = None
+            self.release_driver()
 
     def run(self, url, idpost):
         print("Post")
         logging.info(f"Starting the scraper for {url}")
-        time.sleep(5)
         total = self.scrape(url, idpost)
         logging.info(f"Scraping finished for {url}!")
         return total
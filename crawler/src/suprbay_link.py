@@ -4,7 +4,7 @@ import time
 import traceback
 import csv
 
-from bs4 import BeautifulSoup
+from src.parsing import parse_html
 from config import (
     BINARY_PATH,
     GECKO_DRIVER_PATH,
@@ -30,8 +30,8 @@ logging.basicConfig(
 class DarkwebCrawler(BaseCrawler):
     base_url = "http://suprbaydvdcaynfo4dgdzgxb4zuso7rftlil5yg5kqjefnw4wq4ulcad.onion"
 
-    def __init__(self):
-        super().__init__()
+    def __init__(self, driver_pool=None):
+        super().__init__(driver_pool)
         self.mongodb_client = MongoDBClient(
             host=MONGO_HOST, port=MONGO_PORT, username=MONGO_USER, password=MONGO_PASS, database_name="allnewdarkweb"
         )
@@ -68,7 +68,7 @@ class DarkwebCrawler(BaseCrawler):
         Get the innerHTML of the body and parse with BeautifulSoup
         """
         bbad_body = self.driver.find_element(By.TAG_NAME, "body").get_attribute("innerHTML")
-        return BeautifulSoup(bbad_body, "html.parser")
+        return parse_html(bbad_body)
 
     def scrape(self, url):
         """
@@ -78,16 +78,14 @@ class DarkwebCrawler(BaseCrawler):
         for attempt in range(max_retries):
             try:
                 # Navigate to base URL first to handle any site-wide checks
-                self.driver.get(self.base_url)
-                time.sleep(5)
+                self._load_page(self.base_url, wait_for_content=False)
 
                 # Check and handle potential captcha (now bypassed)
                 if self._handle_captcha():
                     logging.warning("Captcha detection triggered")
 
                 # Navigate to specific URL
-                self.driver.get(url)
-                time.sleep(10)
+                self._load_page(url)
 
                 # Get initial soup to check pagination
                 soup = self._get_body_html()
@@ -107,8 +105,7 @@ class DarkwebCrawler(BaseCrawler):
                         # If not first iteration, navigate to specific page URL
                         if current_page > 1:
                             page_url = f"{url}&page={current_page}"
-                            self.driver.get(page_url)
-                            time.sleep(5)
+                            self._load_page(page_url)
                             soup = self._get_body_html()
 
                         # Find all tr with class inline_row
@@ -179,7 +176,7 @@ class DarkwebCrawler(BaseCrawler):
         try:
             # Initialize the driver if not already done
             if not self.driver:
-                self.init_driver()
+                self.driver = self._acquire_driver()
 
             total = self.scrape(url)
             logging.info(f"Crawler completed for {url}!")
@@ -1,8 +1,7 @@
 import logging
 import re
-import time
 import traceback
-from bs4 import BeautifulSoup
+from src.parsing import parse_html
 from pymongo import MongoClient
 from bson.objectid import ObjectId
 
@@ -16,7 +15,9 @@ from config import (
     PROFILE_PATH,
 )
 from src.base import BaseCrawler, DarkProfile
+from src.blob_store import load_raw_content
 from src.mongo import MongoDBClient
+from src.page_pipeline import PagePipeline
 from src.selenium_config import SeleniumConfig
 from utils import fill_date_profile
 
@@ -28,8 +29,8 @@ logging.basicConfig(
 class DarkwebCrawler(BaseCrawler):
     base_url = "http://suprbaydvdcaynfo4dgdzgxb4zuso7rftlil5yg5kqjefnw4wq4ulcad.onion"
 
-    def __init__(self):
-        super().__init__()
+    def __init__(self, driver_pool=None):
+        super().__init__(driver_pool)
         self.mongodb_client = MongoDBClient(
             host=MONGO_HOST, port=MONGO_PORT, username=MONGO_USER, password=MONGO_PASS, database_name="allnewdarkweb"
         )
@@ -49,7 +50,7 @@ class DarkwebCrawler(BaseCrawler):
         bbad_body = self.driver.find_element_by_tag_name("body").get_attribute(
             "innerHTML"
         )
-        return BeautifulSoup(bbad_body, "html.parser")
+        return parse_html(bbad_body)
 
     def _get_member_header(self, soup):
         return soup.find("div", {"class": "memberHeader-content"})
@@ -185,8 +186,8 @@ class DarkwebCrawler(BaseCrawler):
         profile_urls = []
         for doc in distinct_docs:
             raw_content = self.mongodb_client.find_one(
-                'test', {'poster': doc}, {'raw_content': 1, '_id': 0})
-            raw_content_bs = BeautifulSoup(raw_content['raw_content'], "html.parser")
+                'test', {'poster': doc}, {'raw_content': 1, 'raw_content_ref': 1, '_id': 0})
+            raw_content_bs = parse_html(load_raw_content(self.mongodb_client, raw_content))
             profile = raw_content_bs.find("div", class_="author_information")
             profile_url = profile.find("span", class_="largetext")
             profile_urls.append(profile_url.find('a')["href"])
@@ -195,7 +196,7 @@ class DarkwebCrawler(BaseCrawler):
 
     # ------ Main methods to scrape the content ------
 
-    def _scrape_post(self, post):
+    def _scrape_post(self, post, i=None, context=None):
         try:
             username_extract = self._get_member_username(post)
             username = username_extract.find("a").text
@@ -230,29 +231,22 @@ class DarkwebCrawler(BaseCrawler):
 
     
     def scrape(self, url, idpost):  # Added idpost parameter
-        self.driver.get(url)
-        time.sleep(10)
+        self._load_page(url)
 
         soup = self._get_body_html()
         last_page = self._get_last_page_number(soup)
         logging.info(f"total page: {last_page}")
 
-        for page in range(int(last_page)):
-            page_url = url + f'?page={page + 1}'
-            logging.info(f'Navigating to page: {page_url}')
+        def save_page(page, profiles):
+            logging.info(f"page {page} profiles: {len(profiles or [])}")
 
-            self.driver.get(page_url)
-            time.sleep(15)
+            for data in profiles or []:
+                self._save_post(data)
+                logging.info(f"data: {data}")
 
-            posts = self._get_posts(self._get_body_html())
-            
-            logging.info(f"posts: {len(posts)}")
-
-            for post in posts:
-                data = self._scrape_post(post)
-                if data:
-                    self._save_post(data)
-                    logging.info(f"data: {data}")
+        # Page N+1 loads while page N is parsed and saved
+        pages = ((page, url + f'?page={page}') for page in range(1, int(last_page) + 1))
+        PagePipeline(self, retry_empty=False).run(pages, save_page)
 
         logging.info(f"Finished scraping. Total unique profiles saved: {self.saved_profiles}")
         return self.saved_profiles
@@ -260,7 +254,6 @@ class DarkwebCrawler(BaseCrawler):
     def run(self, url, idpost):
         print("Profile")
         logging.info(f"Starting the scraper for {url}")
-        time.sleep(5)
         total = self.scrape(url, idpost)
         logging.info(f"Scraping finished for {url}!")
         return total
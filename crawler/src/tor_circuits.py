@@ -0,0 +1,368 @@
+import atexit
+import contextlib
+import logging
+import os
+import re
+import socket
+import subprocess
+import threading
+import time
+
+from config import (
+    TOR_BINARY,
+    TOR_BOOTSTRAP_TIMEOUT,
+    TOR_CIRCUIT_FAILURE_RATE,
+    TOR_CIRCUIT_MIN_ROTATE_SECONDS,
+    TOR_CIRCUIT_SLOW_FACTOR,
+    TOR_DATA_DIR,
+    TOR_INSTANCES,
+)
+
+
+class TorControlError(Exception):
+    pass
+
+
+class Circuit:
+    """
+    One tor instance: a SOCKS port, optionally a control port, and its stats.
+
+    Latency and failure rate are exponentially weighted so a circuit that
+    degrades shows up within a few pages.
+    """
+
+    def __init__(
+        self, name, socks, control=None, password=None, cookie_path=None, alpha=0.3
+    ):
+        self.name = name
+        self.socks_host, self.socks_port = _split_address(socks)
+        self.control = _split_address(control) if control else None
+        self.password = password
+        self.cookie_path = cookie_path
+        self.alpha = alpha
+
+        self.in_use = 0
+        self.reset_stats()
+        self.last_rotated = 0
+
+    def reset_stats(self):
+        self.latency = None
+        self.failure_rate = 0.0
+        self.samples = 0
+
+    def record(self, seconds, ok):
+        self.samples += 1
+        self.failure_rate = (1 - self.alpha) * self.failure_rate + self.alpha * (
+            0 if ok else 1
+        )
+        if ok:
+            self.latency = (
+                seconds
+                if self.latency is None
+                else (1 - self.alpha) * self.latency + self.alpha * seconds
+            )
+
+    @property
+    def proxy_url(self):
+        return f"socks5h://{self.socks_host}:{self.socks_port}"
+
+    def firefox_preferences(self):
+        # Point Firefox (or Tor Browser with its own tor disabled) at this
+        # instance; DNS goes through the proxy so .onion names resolve
+        return {
+            "network.proxy.type": 1,
+            "network.proxy.socks": self.socks_host,
+            "network.proxy.socks_port": self.socks_port,
+            "network.proxy.socks_version": 5,
+            "network.proxy.socks_remote_dns": True,
+            "extensions.torlauncher.start_tor": False,
+        }
+
+    def new_identity(self):
+        """Ask tor for fresh circuits with ``SIGNAL NEWNYM`` over the control port."""
+        if self.control is None:
+            raise TorControlError(f"{self.name} has no control port")
+
+        with socket.create_connection(self.control, timeout=10) as conn:
+            stream = conn.makefile("rwb")
+            _control_command(stream, f"AUTHENTICATE {self._auth_token()}")
+            _control_command(stream, "SIGNAL NEWNYM")
+            _control_command(stream, "QUIT", expect_reply=False)
+        self.last_rotated = time.monotonic()
+        self.reset_stats()
+
+    def bootstrap_progress(self):
+        """Bootstrap percentage tor reports on the control port (100 when ready)."""
+        if self.control is None:
+            raise TorControlError(f"{self.name} has no control port")
+
+        with socket.create_connection(self.control, timeout=10) as conn:
+            stream = conn.makefile("rwb")
+            _control_command(stream, f"AUTHENTICATE {self._auth_token()}")
+            stream.write(b"GETINFO status/bootstrap-phase\r\n")
+            stream.flush()
+            progress = None
+            while True:
+                reply = stream.readline().decode("utf-8", "replace").strip()
+                if not reply.startswith("250"):
+                    raise TorControlError(f"GETINFO failed: {reply}")
+                match = re.search(r"PROGRESS=(\d+)", reply)
+                if match:
+                    progress = int(match.group(1))
+                if reply.startswith("250 "):
+                    break
+            _control_command(stream, "QUIT", expect_reply=False)
+        return progress or 0
+
+    def _auth_token(self):
+        if self.cookie_path:
+            with open(self.cookie_path, "rb") as f:
+                return f.read().hex()
+        if self.password:
+            return '"' + self.password.replace("\\", "\\\\").replace('"', '\\"') + '"'
+        return ""
+
+    def __repr__(self):
+        return (
+            f"Circuit({self.name}, latency={self.latency}, "
+            f"failures={self.failure_rate:.2f}, in_use={self.in_use})"
+        )
+
+
+def _split_address(address):
+    host, _, port = str(address).rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+def _control_command(stream, command, expect_reply=True):
+    stream.write(command.encode("utf-8") + b"\r\n")
+    stream.flush()
+    if not expect_reply:
+        return
+    reply = stream.readline().decode("utf-8", "replace").strip()
+    if not reply.startswith("250"):
+        raise TorControlError(f"{command.split()[0]} failed: {reply}")
+
+
+class TorCircuitManager:
+    """
+    Spreads crawl workers over several local tor instances.
+
+    Instances come from ``TOR_INSTANCES``: each entry either attaches to a
+    running tor (``socks``/``control`` addresses) or, with ``"launch": True``,
+    starts a tor process with its own data directory and cookie-authenticated
+    control port. Instances are opened on first use, and launched ones are
+    waited for until tor reports a complete bootstrap, so importing the
+    module starts nothing and no proxy is handed out before it can carry
+    traffic. ``acquire`` hands out the least loaded circuit, weighted by
+    measured latency and failure rate. ``record`` feeds page timings back; a
+    circuit much slower than the others, or failing too often, is rotated
+    with NEWNYM (at most once per ``min_rotate_seconds``, Tor rate-limits it).
+
+    Both fetch paths use it: ``Circuit.proxy_url`` for the HTTP driver and
+    ``Circuit.firefox_preferences`` for Selenium. Any SOCKS5 proxy works as
+    a stand-in instance, which is how the manager can be exercised without
+    Tor.
+    """
+
+    def __init__(
+        self,
+        instances=TOR_INSTANCES,
+        slow_factor=TOR_CIRCUIT_SLOW_FACTOR,
+        failure_threshold=TOR_CIRCUIT_FAILURE_RATE,
+        min_rotate_seconds=TOR_CIRCUIT_MIN_ROTATE_SECONDS,
+        bootstrap_timeout=TOR_BOOTSTRAP_TIMEOUT,
+    ):
+        self.instances = list(instances)
+        self.slow_factor = slow_factor
+        self.failure_threshold = failure_threshold
+        self.min_rotate_seconds = min_rotate_seconds
+        self.bootstrap_timeout = bootstrap_timeout
+
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._processes = []
+        self._circuits = None
+
+    @property
+    def enabled(self):
+        return bool(self.instances)
+
+    @property
+    def circuits(self):
+        if self._circuits is None:
+            with self._start_lock:
+                if self._circuits is None:
+                    self._circuits = self._start()
+        return self._circuits
+
+    def _start(self):
+        if self.instances:
+            atexit.register(self.close)
+        circuits = [
+            self._open(index, instance) for index, instance in enumerate(self.instances)
+        ]
+        for circuit, instance in zip(circuits, self.instances):
+            if instance.get("launch"):
+                self._wait_for_bootstrap(circuit)
+        return circuits
+
+    def _wait_for_bootstrap(self, circuit):
+        deadline = time.monotonic() + self.bootstrap_timeout
+        progress, error = 0, None
+        while time.monotonic() < deadline:
+            try:
+                progress = circuit.bootstrap_progress()
+                if progress >= 100:
+                    logging.info(f"Tor instance {circuit.name} bootstrapped")
+                    return
+            except (OSError, TorControlError) as e:
+                # The control port and auth cookie appear a moment after start
+                error = e
+            time.sleep(1)
+        raise TorControlError(
+            f"{circuit.name} did not bootstrap within {self.bootstrap_timeout}s "
+            f"(progress {progress}%, last error: {error})"
+        )
+
+    def _open(self, index, instance):
+        name = instance.get("name", f"tor{index}")
+        if not instance.get("launch"):
+            return Circuit(
+                name,
+                instance["socks"],
+                instance.get("control"),
+                instance.get("password"),
+                instance.get("cookie_path"),
+            )
+
+        data_dir = os.path.join(TOR_DATA_DIR, name)
+        os.makedirs(data_dir, exist_ok=True)
+        socks_port, control_port = (
+            _split_address(instance["socks"])[1],
+            _split_address(instance["control"])[1],
+        )
+        process = subprocess.Popen(
+            [
+                TOR_BINARY,
+                "--SocksPort",
+                str(socks_port),
+                "--ControlPort",
+                str(control_port),
+                "--CookieAuthentication",
+                "1",
+                "--DataDirectory",
+                data_dir,
+            ],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        self._processes.append(process)
+        logging.info(
+            f"Started tor instance {name} (SOCKS {socks_port}, control {control_port})"
+        )
+        return Circuit(
+            name,
+            instance["socks"],
+            instance["control"],
+            cookie_path=os.path.join(data_dir, "control_auth_cookie"),
+        )
+
+    def _score(self, circuit):
+        # Unmeasured circuits look fast so every circuit gets sampled
+        latency = circuit.latency if circuit.latency is not None else 0
+        return (circuit.in_use + 1) * (latency + 1) * (1 + 4 * circuit.failure_rate)
+
+    def acquire(self):
+        circuits = self.circuits
+        with self._lock:
+            circuit = min(circuits, key=self._score)
+            circuit.in_use += 1
+            return circuit
+
+    def claim(self, circuit):
+        with self._lock:
+            circuit.in_use += 1
+
+    def release(self, circuit):
+        with self._lock:
+            circuit.in_use = max(0, circuit.in_use - 1)
+
+    def record(self, circuit, seconds, ok=True):
+        with self._lock:
+            circuit.record(seconds, ok)
+            reason = self._rotation_reason(circuit)
+            if reason:
+                # Claim the rotation so concurrent workers do not repeat it
+                circuit.last_rotated = time.monotonic()
+        if reason:
+            self.rotate(circuit, reason)
+
+    def _rotation_reason(self, circuit):
+        if circuit.samples < 5 or circuit.control is None:
+            return None
+        if time.monotonic() - circuit.last_rotated < self.min_rotate_seconds:
+            return None
+        if circuit.failure_rate > self.failure_threshold:
+            return f"failure rate {circuit.failure_rate:.2f}"
+
+        others = sorted(
+            c.latency
+            for c in self.circuits
+            if c is not circuit and c.latency is not None
+        )
+        if others and circuit.latency is not None:
+            median = others[len(others) // 2]
+            if circuit.latency > self.slow_factor * median:
+                return f"latency {circuit.latency:.1f}s vs median {median:.1f}s"
+        return None
+
+    def rotate(self, circuit, reason=""):
+        try:
+            circuit.new_identity()
+            logging.info(f"Rotated {circuit.name}: {reason}")
+        except Exception as e:
+            # Do not retry on every page when the control port is unusable
+            circuit.last_rotated = time.monotonic()
+            logging.error(f"Could not rotate {circuit.name}: {e}")
+
+    def stats(self):
+        circuits = self.circuits
+        with self._lock:
+            return [
+                {
+                    "name": c.name,
+                    "proxy": c.proxy_url,
+                    "latency": c.latency,
+                    "failure_rate": c.failure_rate,
+                    "in_use": c.in_use,
+                    "samples": c.samples,
+                }
+                for c in circuits
+            ]
+
+    def close(self):
+        for process in self._processes:
+            process.terminate()
+        self._processes = []
+
+
+circuit_manager = TorCircuitManager()
+
+# The circuit a browser about to be created in this thread should use;
+# SeleniumConfig reads it so the ~30 init_driver implementations stay as is.
+_assigned = threading.local()
+
+
+@contextlib.contextmanager
+def assign_circuit(circuit):
+    previous = getattr(_assigned, "circuit", None)
+    _assigned.circuit = circuit
+    try:
+        yield circuit
+    finally:
+        _assigned.circuit = previous
+
+
+def assigned_circuit():
+    return getattr(_assigned, "circuit", None)
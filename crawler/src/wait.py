@@ -0,0 +1,130 @@
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+
+from config import PAGE_WAIT_MAX_TIMEOUT, PAGE_WAIT_MIN_TIMEOUT, SITE_MIN_INTERVAL
+
+READY_STATE_SCRIPT = """
+return [
+    document.readyState,
+    arguments[0] ? document.querySelector(arguments[0]) !== null : false,
+    document.body ? document.body.innerHTML.length : 0
+];
+"""
+
+
+class LatencyTracker:
+    """Rolling window of page load times for one site."""
+
+    def __init__(self, window=200):
+        self._samples = deque(maxlen=window)
+
+    def record(self, seconds):
+        self._samples.append(seconds)
+
+    def __len__(self):
+        return len(self._samples)
+
+    def percentile(self, pct):
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+
+class PageWaiter:
+    """
+    Replaces fixed ``time.sleep`` pacing after ``driver.get``.
+
+    ``throttle`` keeps at least ``SITE_MIN_INTERVAL`` seconds between two
+    page loads on the same host. ``wait_until_ready`` returns as soon as the
+    site's ready selector is in the DOM, or, without a selector, once the
+    document is complete and the body has stopped changing. Its timeout is
+    learned from the site's own p95 load time.
+    """
+
+    def __init__(
+        self,
+        min_intervals=SITE_MIN_INTERVAL,
+        min_timeout=PAGE_WAIT_MIN_TIMEOUT,
+        max_timeout=PAGE_WAIT_MAX_TIMEOUT,
+        poll_interval=0.25,
+        stable_polls=3,
+    ):
+        self.min_intervals = min_intervals
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.poll_interval = poll_interval
+        self.stable_polls = stable_polls
+
+        self._latency = defaultdict(LatencyTracker)
+        self._last_request = {}
+        self._lock = threading.Lock()
+
+    def throttle(self, site, host):
+        interval = self.min_intervals.get(site, self.min_intervals.get("default", 0))
+
+        # Tracked per host so thread, profile and link crawlers of one forum
+        # share the same budget
+        with self._lock:
+            now = time.monotonic()
+            next_allowed = self._last_request.get(host, 0) + interval
+            delay = max(0, next_allowed - now)
+            self._last_request[host] = now + delay
+
+        if delay:
+            time.sleep(delay)
+
+    def timeout_for(self, site):
+        tracker = self._latency[site]
+        if len(tracker) < 5:
+            return self.max_timeout
+        # Leave room for a slow circuit without waiting out the worst case
+        return min(self.max_timeout, max(self.min_timeout, tracker.percentile(95) * 2))
+
+    def percentiles(self, site):
+        tracker = self._latency[site]
+        return {pct: tracker.percentile(pct) for pct in (50, 90, 95)}
+
+    def wait_until_ready(self, driver, site, selector=None):
+        started = time.monotonic()
+        deadline = started + self.timeout_for(site)
+        last_length = None
+        unchanged = 0
+
+        while True:
+            try:
+                ready_state, found, length = driver.execute_script(
+                    READY_STATE_SCRIPT, selector
+                )
+            except Exception as e:
+                logging.debug(f"Readiness probe failed on {site}: {e}")
+                ready_state, found, length = None, False, None
+
+            if found:
+                break
+
+            if selector is None and ready_state == "complete":
+                unchanged = unchanged + 1 if length == last_length else 0
+                if unchanged >= self.stable_polls:
+                    break
+            last_length = length
+
+            if time.monotonic() >= deadline:
+                logging.warning(
+                    f"Page on {site} not ready after {time.monotonic() - started:.1f}s"
+                )
+                return time.monotonic() - started
+
+            time.sleep(self.poll_interval)
+
+        elapsed = time.monotonic() - started
+        self._latency[site].record(elapsed)
+        return elapsed
+
+
+# Shared by every crawler in the process so politeness and latency stats
+# hold across crawler instances of the same site.
+page_waiter = PageWaiter()
@@ -1,6 +1,5 @@
 import datetime
 import logging
-import time
 
 from bs4 import BeautifulSoup
 from config import (
@@ -25,8 +24,8 @@ logging.basicConfig(
 class DarkwebCrawler(BaseCrawler):
     base_url = "http://zone1b.com"
 
-    def __init__(self):
-        super().__init__()
+    def __init__(self, driver_pool=None):
+        super().__init__(driver_pool)
         self.mongodb_client = MongoDBClient(
             host=MONGO_HOST, port=MONGO_PORT, username=MONGO_USER, password=MONGO_PASS, database_name="allnewdarkweb"
         )
@@ -130,7 +129,7 @@ class DarkwebCrawler(BaseCrawler):
 
     # ---- Main methods to scrape the content -----
 
-    def _scrape_post(self, post):
+    def _scrape_post(self, post, i=None, context=None):
         try:
             title = post.find_element_by_xpath("//div[@class='p-title ']/h1").text
 
@@ -174,9 +173,7 @@ class DarkwebCrawler(BaseCrawler):
             return None
 
     def scrape(self, url):
-        self.driver.get(url)
-
-        time.sleep(10)
+        self._load_page(url)
 
         total = 0
 
@@ -197,6 +194,5 @@ class DarkwebCrawler(BaseCrawler):
 
     def run(self, url):
         logging.info(f"Starting the scraper for {url}")
-        time.sleep(7)
         self.scrape(url)
         logging.info(f"Scraping finished for {url}!")
@@ -0,0 +1,223 @@
+"""
+TorCircuitManager against local stand-ins for tor: a minimal SOCKS5 proxy
+that answers every request with a fixed HTTP response, and a control port
+that acknowledges commands and records them.
+
+    $ python -m unittest discover -s tests
+"""
+import os
+import socketserver
+import sys
+import threading
+import time
+import unittest
+from unittest import mock
+
+CRAWLER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [CRAWLER_DIR, os.path.join(CRAWLER_DIR, "src")]
+
+import requests  # noqa: E402
+from src import base  # noqa: E402
+from src.tor_circuits import TorCircuitManager  # noqa: E402
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class SocksHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        # Greeting: version, method count, methods; answer "no auth"
+        _, methods = self.rfile.read(2)
+        self.rfile.read(methods)
+        self.wfile.write(b"\x05\x00")
+
+        # CONNECT: version, command, reserved, address type, address, port
+        _, command, _, address_type = self.rfile.read(4)
+        if address_type == 3:
+            self.rfile.read(self.rfile.read(1)[0])
+        else:
+            self.rfile.read(4 if address_type == 1 else 16)
+        self.rfile.read(2)
+        self.server.connects += 1
+        self.wfile.write(b"\x05\x00\x00\x01\x7f\x00\x00\x01\x00\x00")
+
+        while self.rfile.readline() not in (b"\r\n", b""):
+            pass
+        body = b"<html><body><div class='post'>ok</div></body></html>"
+        self.wfile.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: text/html\r\n"
+            + f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode()
+            + body
+        )
+
+
+class ControlHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            command = line.decode().strip()
+            self.server.commands.append(command)
+            if command == "QUIT":
+                return
+            if command == "GETINFO status/bootstrap-phase":
+                self.wfile.write(
+                    b"250-status/bootstrap-phase=NOTICE BOOTSTRAP PROGRESS=100 "
+                    b'TAG=done SUMMARY="Done"\r\n'
+                )
+            self.wfile.write(b"250 OK\r\n")
+
+
+def start(handler, **attributes):
+    server = _Server(("127.0.0.1", 0), handler)
+    for name, value in attributes.items():
+        setattr(server, name, value)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class StubTorTestCase(unittest.TestCase):
+    """Two stand-in tor instances and a manager over them."""
+
+    def setUp(self):
+        self.servers = []
+        instances = []
+        for index in range(2):
+            socks = start(SocksHandler, connects=0)
+            control = start(ControlHandler, commands=[])
+            self.servers += [socks, control]
+            instances.append(
+                {
+                    "name": f"stub{index}",
+                    "socks": f"127.0.0.1:{socks.server_address[1]}",
+                    "control": f"127.0.0.1:{control.server_address[1]}",
+                    "password": "secret",
+                }
+            )
+        self.socks = self.servers[0::2]
+        self.controls = self.servers[1::2]
+        self.manager = TorCircuitManager(
+            instances, slow_factor=2.0, failure_threshold=0.5, min_rotate_seconds=0
+        )
+
+    def tearDown(self):
+        for server in self.servers:
+            server.shutdown()
+            server.server_close()
+
+
+class TorCircuitManagerTest(StubTorTestCase):
+    def test_instances_open_on_first_use(self):
+        manager = TorCircuitManager(
+            [{"socks": "127.0.0.1:1", "control": "127.0.0.1:2", "launch": True}]
+        )
+        self.assertTrue(manager.enabled)
+        self.assertIsNone(manager._circuits)
+
+    def test_waits_for_bootstrap(self):
+        circuit = self.manager.circuits[0]
+        self.assertEqual(circuit.bootstrap_progress(), 100)
+        self.manager._wait_for_bootstrap(circuit)
+
+    def test_acquire_spreads_and_release_frees_circuits(self):
+        first = self.manager.acquire()
+        second = self.manager.acquire()
+        self.assertIsNot(first, second)
+        self.assertEqual([c["in_use"] for c in self.manager.stats()], [1, 1])
+
+        self.manager.release(first)
+        self.assertEqual(first.in_use, 0)
+        self.assertIs(self.manager.acquire(), first)
+
+    def test_fetches_go_through_the_assigned_circuit(self):
+        circuit = self.manager.acquire()
+        proxies = {"http": circuit.proxy_url, "https": circuit.proxy_url}
+        response = requests.get(
+            "http://example.onion/thread", proxies=proxies, timeout=10
+        )
+        self.assertIn("ok", response.text)
+
+        used = self.socks[self.manager.circuits.index(circuit)]
+        self.assertEqual(used.connects, 1)
+        self.assertEqual(sum(server.connects for server in self.socks), 1)
+
+    def test_record_updates_ewma_stats(self):
+        circuit = self.manager.circuits[0]
+        self.manager.record(circuit, 2.0)
+        self.assertEqual(circuit.latency, 2.0)
+        self.manager.record(circuit, 4.0)
+        self.assertAlmostEqual(circuit.latency, 0.7 * 2.0 + 0.3 * 4.0)
+        self.manager.record(circuit, 1.0, ok=False)
+        self.assertAlmostEqual(circuit.latency, 0.7 * 2.0 + 0.3 * 4.0)
+        self.assertAlmostEqual(circuit.failure_rate, 0.3)
+        self.assertEqual(circuit.samples, 3)
+
+    def test_slow_circuit_is_rotated_with_newnym(self):
+        fast, slow = self.manager.circuits
+        for _ in range(5):
+            self.manager.record(fast, 1.0)
+        for _ in range(5):
+            self.manager.record(slow, 10.0)
+
+        # QUIT is sent without waiting for a reply
+        deadline = time.monotonic() + 5
+        while "QUIT" not in self.controls[1].commands and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(
+            self.controls[1].commands,
+            ['AUTHENTICATE "secret"', "SIGNAL NEWNYM", "QUIT"],
+        )
+        self.assertEqual(self.controls[0].commands, [])
+        # Fresh circuits are measured from scratch
+        self.assertIsNone(slow.latency)
+        self.assertEqual(slow.samples, 0)
+
+
+class HttpCrawler(base.BaseCrawler):
+    base_url = "http://example.onion"
+    fetch_backend = "http"
+
+    def init_driver(self):
+        raise AssertionError("an http crawler never starts a browser")
+
+    def scrape(self):
+        pass
+
+    def run(self):
+        pass
+
+
+class CrawlerCircuitTest(StubTorTestCase):
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(base, "circuit_manager", self.manager)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def in_use(self):
+        return [circuit.in_use for circuit in self.manager.circuits]
+
+    def test_drivers_give_their_circuit_back(self):
+        crawler = HttpCrawler()
+        self.assertEqual(sum(self.in_use()), 1)
+        self.assertEqual(
+            crawler.driver.session.proxies["http"], crawler.circuit.proxy_url
+        )
+        url, body = crawler.driver.fetch_body("http://example.onion/thread")
+        self.assertIn("ok", body)
+
+        # Replacing the driver keeps one circuit; between pages an http
+        # driver is kept for its session
+        crawler.driver = crawler._acquire_driver()
+        driver = crawler.driver
+        crawler._recycle_driver(more_pages=True)
+        self.assertIs(crawler.driver, driver)
+        self.assertEqual(sum(self.in_use()), 1)
+
+        crawler.release_driver()
+        self.assertEqual(self.in_use(), [0, 0])
+        self.assertIsNone(crawler.driver)
+
+
+if __name__ == "__main__":
+    unittest.main()
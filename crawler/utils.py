@@ -1,6 +1,8 @@
 import re
 import datetime
 
+from src.seen_index import post_id_key, post_index, profile_index, profile_key
+
 
 def clean_html(html_content):
     cleanr = re.compile('<.*?>')
@@ -23,9 +25,15 @@ def if_exists_profile(username, website, mongo_client):
 def fill_date(data, post_id, mongo_conn):
     now = datetime.datetime.now()
     collection = mongo_conn.database['darkweb']
+    seen = post_index(mongo_conn, data['website']) if data.get('website') else None
     
-    # Check if record exists
-    existing_record = collection.find_one({"post_id": post_id})
+    # Check if record exists, unless the seen index knows it is new
+    if seen is not None and not seen.might_contain(post_id_key(post_id)):
+        existing_record = None
+    else:
+        existing_record = collection.find_one({"post_id": post_id})
+    if seen is not None:
+        seen.add(post_id_key(post_id))
     
     if existing_record is None:
         # New record - set both timestamps
@@ -45,9 +53,14 @@ def fill_date(data, post_id, mongo_conn):
 def fill_date_profile(data, username, website, mongo_conn):
     now = datetime.datetime.now()
     collection = mongo_conn.database['darkweb_profiles']
+    seen = profile_index(mongo_conn, website)
     
-    # Check if profile exists
-    existing_profile = collection.find_one({"username": username, "website": website})
+    # Check if profile exists, unless the seen index knows it is new
+    if not seen.might_contain(profile_key(username, website)):
+        existing_profile = None
+    else:
+        existing_profile = collection.find_one({"username": username, "website": website})
+    seen.add(profile_key(username, website))
     
     if existing_profile is None:
         # New profile - set both timestamps